@@ -13,9 +13,10 @@ from data.data_loader import ParkingDataLoader
 from data.booking_system import BookingSystem
 from components.map_view import render_map_view
 from components.section_selector import render_section_selector
-from components.slot_selector import render_slot_selector
+from components.slot_selector import render_slot_selector, cancel_prefetch
 from components.user_inputs import render_user_inputs, get_user_inputs
 from utils.helpers import initialize_session_state, get_navigation_state
+from ml.model_registry import get_model_registry
 
 # Page configuration
 st.set_page_config(
@@ -94,6 +95,12 @@ def main():
         # Load parking data
         data_loader = ParkingDataLoader()
         
+        # Load the shared ML model in the background (once per process)
+        # and roll out versions published by model_proper.py without a restart
+        model_registry = get_model_registry()
+        model_registry.preload('models', data_loader)
+        model_registry.start_watcher('models', data_loader)
+        
         # Initialize booking system ONCE per session (cached)
         # This ensures bookings don't change randomly when user interacts
         if 'booking_system' not in st.session_state:
@@ -108,16 +115,21 @@ def main():
         # Navigation logic
         nav_state = get_navigation_state()
         
+        # Background prediction prefetch only runs while the slot view is open
+        if not (nav_state['show_slots'] and nav_state['section']):
+            cancel_prefetch()
+        
         # Show appropriate view based on navigation state
         if nav_state['show_slots'] and nav_state['section']:
-            # Show slot selector with booking system
+            # Show slot selector with booking system (same arrival day as the section view)
             spots = data_loader.get_spots_by_section(nav_state['section'])
             render_slot_selector(
                 spots, 
                 nav_state['section'], 
                 data_loader, 
                 booking_system, 
-                selected_hour
+                selected_hour,
+                day_of_week=user_inputs.get('day_of_week') if user_inputs else None
             )
         
         elif nav_state['show_sections'] and nav_state['area']:
@@ -133,7 +145,8 @@ def main():
                 booking_system,
                 selected_hour,
                 entry_time=entry_time,
-                exit_time=exit_time
+                exit_time=exit_time,
+                day_of_week=user_inputs.get('day_of_week') if user_inputs else None
             )
         
         else:
@@ -0,0 +1,54 @@
+"""
+BUILD PRECOMPUTED AVAILABILITY TABLE
+Scores every spot x weekday x hour x vehicle type x EV combination with the
+trained model and saves the results next to it for O(1) lookups in the app
+model_proper.py builds the current month when it publishes a version;
+run this at the start of each month (or for other months) to rebuild it
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, 'src')
+
+from data.data_loader import ParkingDataLoader
+from ml.predictor_prebooking import PrebookingPredictor
+from ml.availability_table import build_availability_table, TABLE_FILE
+from ml.model_versions import resolve_model_path
+
+print("="*70)
+print("SMART PARKING - AVAILABILITY TABLE BUILD")
+print("="*70)
+
+# Table belongs to the current model version (see models/manifest.json)
+version, model_dir = resolve_model_path('models')
+data_loader = ParkingDataLoader()
+predictor = PrebookingPredictor(model_dir=model_dir, data_loader=data_loader)
+
+if not predictor.is_loaded:
+    print("\n[ERROR] No trained model found. Run model_proper.py first.")
+    sys.exit(1)
+
+# Month can be passed on the command line, e.g. "python build_availability_table.py 1 2 3"
+months = [int(m) for m in sys.argv[1:]] or None
+
+print("\n[1] SCORING ALL COMBINATIONS")
+print("-" * 70)
+start = time.time()
+table = build_availability_table(predictor, months=months)
+elapsed = time.time() - start
+
+print(f"  [OK] Spots: {len(table.spot_ids)}")
+print(f"  [OK] Months: {', '.join(str(m) for m in table.months)}")
+print(f"  [OK] Entries: {table.probabilities.size:,}")
+print(f"  [OK] Built in {elapsed:.1f}s")
+
+print("\n[2] SAVING TABLE")
+print("-" * 70)
+table_path = os.path.join(model_dir, TABLE_FILE)
+table.save(table_path)
+print(f"  [OK] Table saved to: {table_path} ({os.path.getsize(table_path) / 1024:.0f} KB)")
+
+print("\n" + "="*70)
+print("AVAILABILITY TABLE READY!")
+print("="*70)
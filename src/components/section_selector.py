@@ -5,7 +5,56 @@ Shows real-time occupancy percentage for each zone based on selected time
 """
 import streamlit as st
 
-def render_section_selector(sections, area_name, booking_system=None, selected_hour=None, entry_time=None, exit_time=None):
+def _get_forecaster(booking_system):
+    """Section forecaster of the live model version, or None"""
+    from ml.section_forecaster import get_section_forecaster
+    
+    if booking_system is None:
+        return None
+    try:
+        return get_section_forecaster(booking_system.data_loader)
+    except Exception as e:
+        print(f"[ERROR] Section forecaster unavailable: {e}")
+        return None
+
+
+def _get_section_forecasts(booking_system, day_of_week, selected_hour, entry_time=None, exit_time=None):
+    """
+    Forecast occupancy rate per section for the selected hour or stay
+
+    Returns:
+        dict: {section: rate in [0, 1]}, empty if no forecaster is available
+    """
+    from data.booking_system import DAYS_OF_WEEK
+    from datetime import datetime
+    
+    try:
+        forecaster = _get_forecaster(booking_system)
+        if forecaster is None:
+            return {}
+        
+        if day_of_week in DAYS_OF_WEEK:
+            day_index = DAYS_OF_WEEK.index(day_of_week)
+        else:
+            day_index = datetime.now().weekday()
+        
+        if entry_time is not None and exit_time is not None:
+            # Hours overlapped by the stay (wrapping past midnight)
+            n_hours = ((exit_time.hour - entry_time.hour) % 24) + (1 if exit_time.minute > 0 else 0)
+            hours = [(entry_time.hour + h) % 24 for h in range(max(n_hours, 1))]
+        elif selected_hour is not None:
+            hours = selected_hour
+        else:
+            return {}
+        
+        return forecaster.all_sections(day_index, hours)
+    except Exception as e:
+        print(f"[ERROR] Section forecast failed: {e}")
+        return {}
+
+
+def render_section_selector(sections, area_name, booking_system=None, selected_hour=None, entry_time=None, exit_time=None,
+                            day_of_week=None):
     """
     Render section selector as a popup-style interface with occupancy data
     
@@ -14,6 +63,9 @@ def render_section_selector(sections, area_name, booking_system=None, selected_h
         area_name: Name of the selected parking area
         booking_system: BookingSystem instance for occupancy data
         selected_hour: Hour selected by user (0-23) for time-based occupancy
+        entry_time: Entry time (datetime.time) for stay-based occupancy
+        exit_time: Exit time (datetime.time) for stay-based occupancy
+        day_of_week: Arrival day name for demand forecasts, defaults to today
     """
     
     st.markdown(f"### 🅿️ Select Parking Section - {area_name}")
@@ -73,7 +125,7 @@ def render_section_selector(sections, area_name, booking_system=None, selected_h
                 occupancy_data = booking_system.get_all_sections_occupancy_range(entry_time, exit_time)
             except Exception:
                 # Fallback: use entry_time.hour for single-hour occupancy
-                occupancy_data = booking_system.get_all_sections_occupancy(entry_time.hour)
+                occupancy_data = booking_system.get_all_sections_occupancy(entry_time.hour, day_of_week)
 
             # Format display for entry-exit
             def fmt_time(t):
@@ -89,11 +141,20 @@ def render_section_selector(sections, area_name, booking_system=None, selected_h
 
             st.info(f"📊 Showing occupancy for **{fmt_time(entry_time)} → {fmt_time(exit_time)}**")
         elif selected_hour is not None:
-            occupancy_data = booking_system.get_all_sections_occupancy(selected_hour)
+            occupancy_data = booking_system.get_all_sections_occupancy(selected_hour, day_of_week)
             # Show time context for single hour
             hour_display = f"{selected_hour}:00" if selected_hour < 12 or selected_hour == 0 else f"{selected_hour-12 if selected_hour > 12 else selected_hour}:00 {'AM' if selected_hour < 12 else 'PM'}"
             st.info(f"📊 Showing occupancy for **{hour_display}**")
     
+    # Learned demand forecast per section (all sections from one precomputed array)
+    forecasts = _get_section_forecasts(booking_system, day_of_week, selected_hour, entry_time, exit_time) if booking_system else {}
+    if forecasts:
+        quietest = min(forecasts, key=forecasts.get)
+        st.caption(
+            f"🔮 Demand forecast: **{quietest}** is usually the quietest zone at this time "
+            f"({forecasts[quietest] * 100:.0f}% expected occupancy)"
+        )
+    
     # Display sections in a grid layout
     cols = st.columns(min(len(sections), 4))
     
@@ -118,6 +179,11 @@ def render_section_selector(sections, area_name, booking_system=None, selected_h
                     color = "#f56565"  # Red
                     status = "High"
                 
+                forecast_line = (
+                    f"<br><small>Forecast: {forecasts[section] * 100:.0f}% typical demand</small>"
+                    if section in forecasts else ""
+                )
+                
                 # Create a visually appealing card with occupancy info
                 st.markdown(f"""
                 <div class="section-card" style="border-left: 5px solid {color};">
@@ -125,7 +191,7 @@ def render_section_selector(sections, area_name, booking_system=None, selected_h
                     <div class="section-info">
                         <strong style="color: {color};">{occ_pct}% Occupied</strong><br>
                         {available} spots available<br>
-                        <small>Occupancy: {status}</small>
+                        <small>Occupancy: {status}</small>{forecast_line}
                     </div>
                 </div>
                 """, unsafe_allow_html=True)
@@ -147,7 +213,7 @@ def render_section_selector(sections, area_name, booking_system=None, selected_h
                 if section in occupancy_data and booking_system:
                     occ_pct = occupancy_data[section]['occupancy_percentage']
                     if occ_pct > 60:  # If more than 60% occupied
-                        least_occupied, least_pct = booking_system.get_least_occupied_section(selected_hour)
+                        least_occupied, least_pct = booking_system.get_least_occupied_section(selected_hour, day_of_week)
                         if least_occupied != section and least_pct < occ_pct - 15:
                             # Store suggestion to show later
                             st.session_state.occupancy_suggestion = {
@@ -171,4 +237,19 @@ def render_section_selector(sections, area_name, booking_system=None, selected_h
         
         *Select a zone to view real-time availability and book your spot*
         """)
+        
+        # Typical occupancy through the day, from the same forecaster as the cards
+        forecaster = _get_forecaster(booking_system)
+        if forecaster is not None:
+            import pandas as pd
+            from data.booking_system import DAYS_OF_WEEK
+            
+            profile = forecaster.as_profile()
+            day_index = DAYS_OF_WEEK.index(day_of_week) if day_of_week in DAYS_OF_WEEK else None
+            curves = pd.DataFrame(
+                {section: profile.hourly_curve(section, day_index) * 100 for section in profile.sections},
+                index=pd.Index(range(24), name='Hour')
+            )
+            st.markdown(f"**Typical occupancy (%) by hour{' on ' + day_of_week + 's' if day_index is not None else ''}:**")
+            st.line_chart(curves)
 
@@ -8,7 +8,7 @@ import streamlit as st
 import math
 from datetime import datetime, timedelta
 
-def render_slot_selector(spots, section_name, data_loader, booking_system=None, selected_hour=None):
+def render_slot_selector(spots, section_name, data_loader, booking_system=None, selected_hour=None, day_of_week=None):
     """
     Render parking slots in a 2D grid layout similar to bus booking UI
     Shows real-time booking status based on selected time
@@ -19,14 +19,18 @@ def render_slot_selector(spots, section_name, data_loader, booking_system=None,
         data_loader: ParkingDataLoader instance for getting spot info
         booking_system: BookingSystem instance for time-based availability
         selected_hour: Hour selected by user (0-23)
+        day_of_week: Arrival day name (same as the section view), defaults to today
     """
     
     st.markdown(f"### 🚗 Select Parking Slot - {section_name}")
     
     # Debug info to show occupancy (temporary - for testing)
     if booking_system and selected_hour is not None:
-        current_occ = booking_system.get_section_occupancy(section_name, selected_hour)
+        current_occ = booking_system.get_section_occupancy(section_name, selected_hour, day_of_week)
         st.caption(f"🔍 Debug: This zone is {current_occ['occupancy_percentage']:.0f}% occupied at hour {selected_hour}")
+        
+        # Warm the prediction cache for this section while the user picks a slot
+        _prefetch_section_predictions(section_name, data_loader, booking_system, selected_hour, day_of_week)
     
     # Custom CSS for slot grid
     st.markdown("""
@@ -150,12 +154,12 @@ def render_slot_selector(spots, section_name, data_loader, booking_system=None,
     # Show occupancy warning if current zone is busy (unless user dismissed it)
     dismiss_key = f"dismiss_{section_name}_{selected_hour}"
     if booking_system and selected_hour is not None:
-        current_occupancy = booking_system.get_section_occupancy(section_name, selected_hour)
+        current_occupancy = booking_system.get_section_occupancy(section_name, selected_hour, day_of_week)
         current_occ_pct = current_occupancy['occupancy_percentage']
         
         # If zone is busy (>60%), show prominent warning with suggestion
         if current_occ_pct > 60 and not st.session_state.get(dismiss_key, False):
-            least_occupied_section, least_occ_pct = booking_system.get_least_occupied_section(selected_hour)
+            least_occupied_section, least_occ_pct = booking_system.get_least_occupied_section(selected_hour, day_of_week)
             
             # Only suggest if there's a significant difference (>15%)
             if least_occupied_section != section_name and least_occ_pct < current_occ_pct - 15:
@@ -164,12 +168,13 @@ def render_slot_selector(spots, section_name, data_loader, booking_system=None,
                     least_occupied_section, 
                     selected_hour,
                     data_loader,
-                    prefer_close_to_exit=True
+                    prefer_close_to_exit=True,
+                    day_of_week=day_of_week
                 )
                 
                 if recommended_spot:
                     rec_spot_info = data_loader.get_spot_info(recommended_spot, least_occupied_section)
-                    available_count = booking_system.get_section_occupancy(least_occupied_section, selected_hour)['available_spots']
+                    available_count = booking_system.get_section_occupancy(least_occupied_section, selected_hour, day_of_week)['available_spots']
                     
                     st.error(f"""
                     ⚠️ **WARNING: {section_name} is {current_occ_pct:.0f}% occupied!**
@@ -217,7 +222,9 @@ def render_slot_selector(spots, section_name, data_loader, booking_system=None,
             st.warning(f"📊 **{section_name}** is {current_occ_pct:.0f}% occupied - Moderate traffic")
         else:
             st.success(f"✅ **{section_name}** is only {current_occ_pct:.0f}% occupied - Plenty of spaces!")
-    
+
+        _render_group_search(section_name, booking_system, selected_hour)
+
     st.markdown("---")
     
     # Legend
@@ -264,7 +271,7 @@ def render_slot_selector(spots, section_name, data_loader, booking_system=None,
                 if spot_info:
                     # Check if spot is booked at selected hour (from booking system)
                     if booking_system and selected_hour is not None:
-                        is_occupied = booking_system.is_spot_booked(spot_id, section_name, selected_hour)
+                        is_occupied = booking_system.is_spot_booked(spot_id, section_name, selected_hour, day_of_week)
                     else:
                         # Fallback to CSV data
                         is_occupied = spot_info.get('Occupancy_Status', 'Vacant') == 'Occupied'
@@ -299,7 +306,7 @@ def render_slot_selector(spots, section_name, data_loader, booking_system=None,
                         try:
                             if spot_info and spot_info.get('Electric_Vehicle', 0) == 1:
                                 # small lightning bolt emoji as EV indicator
-                                ev_html = f"<span class='ev-icon'>⚡ EV</span>"
+                                ev_html = "<span class='ev-icon'>⚡ EV</span>"
                         except Exception:
                             ev_html = ""
 
@@ -351,12 +358,12 @@ def render_slot_selector(spots, section_name, data_loader, booking_system=None,
             
             # Show reminder about the recommendation at the bottom
             if booking_system and selected_hour is not None:
-                current_occupancy = booking_system.get_section_occupancy(section_name, selected_hour)
+                current_occupancy = booking_system.get_section_occupancy(section_name, selected_hour, day_of_week)
                 current_occ_pct = current_occupancy['occupancy_percentage']
                 
                 # If zone is still busy, show a gentle reminder
                 if current_occ_pct > 60:
-                    least_occupied_section, least_occ_pct = booking_system.get_least_occupied_section(selected_hour)
+                    least_occupied_section, least_occ_pct = booking_system.get_least_occupied_section(selected_hour, day_of_week)
                     if least_occupied_section != section_name and least_occ_pct < current_occ_pct - 15:
                         st.caption(f"💡 Reminder: {least_occupied_section} has {least_occ_pct:.0f}% occupancy (less crowded). See recommendation above.")
             
@@ -369,11 +376,12 @@ def render_slot_selector(spots, section_name, data_loader, booking_system=None,
                 st.session_state.selected_slot,
                 section_name,
                 selected_hour,
-                data_loader
+                data_loader,
+                day_of_week
             )
             
             if ml_prediction and ml_prediction.get('available'):
-                _display_ml_insights(ml_prediction, section_name, selected_hour, booking_system, data_loader)
+                _display_ml_insights(ml_prediction, section_name, selected_hour, booking_system, data_loader, day_of_week)
             
             # Additional spot details
             with st.expander("📋 Detailed Spot Information"):
@@ -418,43 +426,174 @@ def render_slot_selector(spots, section_name, data_loader, booking_system=None,
             pass
 
 
-def _get_ml_insights(spot_id, section, hour, data_loader):
-    """Get ML insights for selected spot"""
+def _render_group_search(section_name, booking_system, selected_hour):
+    """Let groups look for several adjacent spots free for their whole stay"""
+    with st.expander("👥 Group Booking - Find Adjacent Spots"):
+        group_size = st.number_input(
+            "Number of adjacent spots",
+            min_value=2,
+            max_value=10,
+            value=3,
+            key=f"group_size_{section_name}"
+        )
+        
+        # Window from entry hour to exit hour (at least one hour, same day)
+        user_inputs = st.session_state.get('user_inputs', {})
+        exit_hour = user_inputs.get('exit_hour', selected_hour + 1)
+        end_hour = exit_hour if exit_hour > selected_hour else min(selected_hour + 1, 24)
+        
+        groups = booking_system.find_adjacent_spots(
+            int(group_size), selected_hour, end_hour, section=section_name
+        ).get(section_name, [])
+        
+        if groups:
+            st.write(f"**{len(groups)} option(s) free from {selected_hour}:00 to {end_hour}:00:**")
+            for group in groups[:5]:
+                st.write(f"- Spots {', '.join(str(spot) for spot in group)}")
+        else:
+            st.write(f"No {int(group_size)} adjacent spots are free for the whole stay in {section_name}.")
+            other_sections = booking_system.find_adjacent_spots(int(group_size), selected_hour, end_hour)
+            if other_sections:
+                st.caption(f"💡 Try: {', '.join(other_sections)}")
+
+
+def _booking_datetime(hour, day_of_week=None):
+    """
+    Booking datetime for the selected hour
+    
+    On the next day_of_week (a day name) if given, otherwise today; moved a
+    week (or a day) ahead if that time has already passed.
+    """
+    from data.booking_system import DAYS_OF_WEEK
+    
+    now = datetime.now()
+    booking_datetime = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if day_of_week in DAYS_OF_WEEK:
+        booking_datetime += timedelta(days=(DAYS_OF_WEEK.index(day_of_week) - now.weekday()) % 7)
+        if booking_datetime < now:
+            booking_datetime += timedelta(days=7)
+    elif booking_datetime < now:
+        booking_datetime += timedelta(days=1)
+    return booking_datetime
+
+
+def _get_predictor_handle(data_loader):
+    """Session handle to the shared ML predictor (the model is loaded once per process)"""
+    from ml.model_registry import get_model_registry
+    
+    if 'ml_predictor' not in st.session_state:
+        st.session_state.ml_predictor = get_model_registry().get_handle(
+            model_dir='models',
+            data_loader=data_loader
+        )
+    return st.session_state.ml_predictor
+
+
+def _prefetch_section_predictions(section_name, data_loader, booking_system, selected_hour, day_of_week=None):
+    """
+    Score the section's available spots for the selected and adjacent hours
+    in the background, so a slot click finds its insights in the prediction cache
+    """
+    import uuid
+    from ml.prefetcher import get_prefetcher
+    
     try:
-        # Import predictor
-        from ml.predictor_prebooking import PrebookingPredictor
+        if 'prefetch_session_id' not in st.session_state:
+            st.session_state.prefetch_session_id = uuid.uuid4().hex
         
-        # Initialize predictor (cached in session state)
-        if 'ml_predictor' not in st.session_state:
-            st.session_state.ml_predictor = PrebookingPredictor(
-                model_dir='models',
-                data_loader=data_loader
-            )
+        user_inputs = st.session_state.get('user_inputs', {})
+        vehicle_type = user_inputs.get('vehicle_type', 'Sedan')
+        is_ev = user_inputs.get('electric_vehicle', 0) == 1
+        user_id = st.session_state.get('user_id')
+        
+        # Availability is read here on the script thread; workers only run the model
+        work = []
+        for hour in (selected_hour, selected_hour - 1, selected_hour + 1):
+            if 0 <= hour <= 23:
+                booking_datetime = _booking_datetime(hour, day_of_week)
+                spot_ids = booking_system.get_available_spots_in_section(
+                    section_name, hour, booking_datetime.weekday()
+                )
+                work.append((section_name, booking_datetime, spot_ids))
         
-        predictor = st.session_state.ml_predictor
+        get_prefetcher().prefetch(
+            st.session_state.prefetch_session_id,
+            _get_predictor_handle(data_loader),
+            work, vehicle_type=vehicle_type, is_ev=is_ev, user_id=user_id
+        )
+    except Exception as e:
+        print(f"[ERROR] Prediction prefetch failed to start: {e}")
+
+
+def cancel_prefetch():
+    """Cancel this session's background prediction prefetch (user left the slot view)"""
+    if 'prefetch_session_id' in st.session_state:
+        from ml.prefetcher import get_prefetcher
+        get_prefetcher().cancel(st.session_state.prefetch_session_id)
+
+
+def _get_ml_insights(spot_id, section, hour, data_loader, day_of_week=None):
+    """
+    Get ML insights for selected spot
+    
+    The live prediction runs under a latency budget; if it misses the
+    deadline (or fails) a cached/precomputed estimate marked 'fallback' is
+    shown and the live call finishes in the background for the next rerun.
+    """
+    from ml.latency_budget import get_latency_budget
+    from ml.model_registry import get_model_registry
+    
+    try:
+        handle = _get_predictor_handle(data_loader)
         
         # Get user inputs
         user_inputs = st.session_state.get('user_inputs', {})
-        day_of_week = user_inputs.get('day_of_week', datetime.now().strftime('%A'))
         vehicle_type = user_inputs.get('vehicle_type', 'Sedan')
         is_ev = user_inputs.get('electric_vehicle', 0) == 1
+        exit_time = user_inputs.get('exit_time')
+        user_id = st.session_state.get('user_id')
         
-        # Calculate booking datetime (current day at selected hour)
-        now = datetime.now()
-        booking_datetime = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+        booking_datetime = _booking_datetime(hour, day_of_week)
         
-        # If selected hour is in the past today, assume next day
-        if booking_datetime < now:
-            booking_datetime += timedelta(days=1)
+        def live_prediction():
+            # Runs on a worker thread: uses only captured values, not st.session_state
+            with handle.acquire() as predictor:
+                prediction = predictor.predict_for_prebooking(
+                    spot_id=spot_id,
+                    section=section,
+                    booking_datetime=booking_datetime,
+                    vehicle_type=vehicle_type,
+                    is_ev=is_ev,
+                    user_id=user_id
+                )
+                
+                # Multi-hour stays: score every hour of the stay in one batch
+                if exit_time is not None:
+                    exit_datetime = datetime.combine(booking_datetime.date(), exit_time)
+                    window = predictor.predict_window(
+                        spot_id, section, booking_datetime, exit_datetime,
+                        vehicle_type=vehicle_type, is_ev=is_ev, user_id=user_id
+                    )
+                    if len(window['hour_starts']) > 1:
+                        prediction['stay'] = window
+            return prediction
         
-        # Get prediction
-        prediction = predictor.predict_for_prebooking(
-            spot_id=spot_id,
-            section=section,
-            booking_datetime=booking_datetime,
-            vehicle_type=vehicle_type,
-            is_ev=is_ev
-        )
+        def fallback_prediction():
+            # Never waits for a model that is still loading
+            if not get_model_registry().is_loaded('models'):
+                return {
+                    'probability_vacant': 0.5,
+                    'recommendation': 'AI model is still loading - check again in a moment',
+                    'insights': {},
+                    'fallback_source': 'default'
+                }
+            return handle.predictor.fallback_prediction(
+                spot_id, section, booking_datetime, vehicle_type=vehicle_type, is_ev=is_ev,
+                user_id=user_id
+            )
+        
+        request_key = (spot_id, section, booking_datetime, vehicle_type, is_ev, exit_time, user_id)
+        prediction = get_latency_budget().run(request_key, live_prediction, fallback_prediction)
         
         prediction['available'] = True
         return prediction
@@ -464,11 +603,81 @@ def _get_ml_insights(spot_id, section, hour, data_loader):
         return {'available': False, 'error': str(e)}
 
 
-def _display_ml_insights(prediction, section, hour, booking_system, data_loader):
+def _get_prediction_drivers(spot_id, section, hour, data_loader, day_of_week=None):
+    """Top prediction drivers for the selected spot (computed only when asked for)"""
+    try:
+        user_inputs = st.session_state.get('user_inputs', {})
+        with _get_predictor_handle(data_loader).acquire() as predictor:
+            return predictor.explain_prediction(
+                spot_id, section, _booking_datetime(hour, day_of_week),
+                vehicle_type=user_inputs.get('vehicle_type', 'Sedan'),
+                is_ev=user_inputs.get('electric_vehicle', 0) == 1,
+                user_id=st.session_state.get('user_id')
+            )
+    except Exception as e:
+        print(f"[ERROR] Prediction drivers failed: {e}")
+        return []
+
+
+def _get_alternatives(section, hour, booking_system, data_loader, day_of_week=None):
+    """
+    Top alternative spots across the lot, within the latency budget
+    
+    A search that misses the deadline keeps running on the worker pool and
+    stores its result for this session, so the next rerun shows it; until
+    then the last stored result for the same request (or none) is served.
+    
+    Returns:
+        dict: {'spots': find_top_alternatives results}, plus 'fallback' = True
+              when the stored result was served
+    """
+    from ml.alternative_search import find_top_alternatives
+    from ml.latency_budget import get_latency_budget
+    
+    handle = _get_predictor_handle(data_loader)
+    
+    # Get user inputs
+    user_inputs = st.session_state.get('user_inputs', {})
+    vehicle_type = user_inputs.get('vehicle_type', 'Sedan')
+    is_ev = user_inputs.get('electric_vehicle', 0) == 1
+    user_id = st.session_state.get('user_id')
+    exclude = (st.session_state.selected_slot, section)  # Skip currently selected spot
+    
+    booking_datetime = _booking_datetime(hour, day_of_week)
+    request_key = ('alternatives', exclude, booking_datetime, vehicle_type, is_ev, user_id)
+    stored = st.session_state.setdefault('stored_alternatives', {})
+    
+    def live_alternatives():
+        # Runs on a worker thread: uses only captured values, not st.session_state
+        with handle.acquire() as predictor:
+            spots = find_top_alternatives(
+                predictor, booking_system, booking_datetime,
+                vehicle_type=vehicle_type, is_ev=is_ev, k=3, exclude=exclude, user_id=user_id
+            )
+        # Only the latest request per session is worth keeping
+        stored.clear()
+        stored[request_key] = spots
+        return {'spots': spots}
+    
+    def stored_alternatives():
+        return {'spots': stored.get(request_key, [])}
+    
+    return get_latency_budget().run(request_key, live_alternatives, stored_alternatives)
+
+
+def _display_ml_insights(prediction, section, hour, booking_system, data_loader, day_of_week=None):
     """Display ML insights in a beautiful format"""
     
     insights = prediction.get('insights', {})
     
+    if prediction.get('fallback'):
+        source = {
+            'cache': 'an earlier prediction',
+            'precomputed': 'the precomputed availability table',
+            'default': 'defaults'
+        }.get(prediction.get('fallback_source'), 'stored results')
+        st.caption(f"⏱️ Quick estimate from {source} - the live AI prediction is still running and will show on the next refresh")
+    
     # Main prediction card
     col1, col2, col3 = st.columns(3)
     
@@ -498,7 +707,39 @@ def _display_ml_insights(prediction, section, hour, booking_system, data_loader)
             f"{temp:.0f}°C",
             weather.get('tip', 'Good conditions')
         )
-    
+
+    # What the model actually weighed for this spot (path-based tree contributions);
+    # walked on demand unless a prefetch or live prediction already has them
+    drivers = prediction.get('drivers', [])
+    spot_id = st.session_state.get('selected_slot')
+    if drivers is None and st.toggle("🧭 Show prediction drivers", key=f"drivers_{section}_{spot_id}_{hour}"):
+        drivers = _get_prediction_drivers(spot_id, section, hour, data_loader, day_of_week)
+    if drivers:
+        total = sum(abs(driver['effect']) for driver in drivers) or 1.0
+        lines = []
+        for driver in drivers:
+            arrow = "🟢 ⬆️" if driver['direction'] == 'available' else "🔴 ⬇️"
+            leaning = "availability" if driver['direction'] == 'available' else "occupancy"
+            lines.append(
+                f"{arrow} **{driver['factor']}** points toward {leaning} "
+                f"({abs(driver['effect']) / total * 100:.0f}% of the top factors)"
+            )
+        st.markdown("**🧭 Top prediction drivers:**  \n" + "  \n".join(lines))
+
+    # Whole-stay outlook for multi-hour bookings
+    stay = prediction.get('stay')
+    if stay:
+        stay_pct = stay['probability_stay'] * 100
+        weakest_label = stay['weakest_hour'].strftime('%I:%M %p').lstrip('0')
+        message = (
+            f"🕒 **Whole stay ({len(stay['hour_starts'])} hours):** {stay_pct:.0f}% chance the spot stays free "
+            f"| weakest hour {weakest_label} ({stay['weakest_probability'] * 100:.0f}%)"
+        )
+        if stay['probability_stay'] >= 0.5:
+            st.info(message)
+        else:
+            st.warning(message)
+
     # Detailed insights in expandable sections
     with st.expander("🌤️ Weather & Environmental Conditions", expanded=True):
         weather_info = insights.get('weather', {})
@@ -555,62 +796,36 @@ def _display_ml_insights(prediction, section, hour, booking_system, data_loader)
     else:
         st.error(f"❌ **Recommendation:** {recommendation}")
     
-    # Smart alternatives suggestion
-    if prediction.get('probability_vacant', 0.5) < 0.6:
+    # Smart alternatives suggestion. Not for quick estimates: the expander body runs
+    # even while collapsed, and the live prediction (or model load) is still pending
+    if prediction.get('probability_vacant', 0.5) < 0.6 and not prediction.get('fallback'):
         with st.expander("🎯 Smart Alternative Suggestions"):
             st.write("Looking for better options with higher availability confidence...")
             
-            # Get user inputs
-            user_inputs = st.session_state.get('user_inputs', {})
-            day_of_week = user_inputs.get('day_of_week', datetime.now().strftime('%A'))
-            vehicle_type = user_inputs.get('vehicle_type', 'Sedan')
-            is_ev = user_inputs.get('electric_vehicle', 0) == 1
-            
-            # Calculate booking time
-            now = datetime.now()
-            booking_datetime = now.replace(hour=hour, minute=0, second=0, microsecond=0)
-            if booking_datetime < now:
-                booking_datetime += timedelta(days=1)
-            
             # Get alternatives
             try:
-                predictor = st.session_state.ml_predictor
+                # Best spots across the whole lot (batched scoring, pruned by upper bounds)
+                search = _get_alternatives(section, hour, booking_system, data_loader, day_of_week)
+                top_spots = search['spots']
                 
-                # Get available spots from booking system
-                available_spots = booking_system.get_available_spots_in_section(section, hour)
-                
-                # Get ML predictions for alternatives
                 alternatives = []
-                for spot_id in available_spots[:10]:  # Check top 10 available spots
-                    if spot_id == st.session_state.selected_slot:
-                        continue  # Skip currently selected spot
-                    
-                    alt_pred = predictor.predict_for_prebooking(
-                        spot_id=spot_id,
-                        section=section,
-                        booking_datetime=booking_datetime,
-                        vehicle_type=vehicle_type,
-                        is_ev=is_ev
-                    )
-                    
-                    spot_info = data_loader.get_spot_info(spot_id, section)
+                for spot in top_spots:
+                    spot_info = data_loader.get_spot_info(spot['spot_id'], spot['section'])
                     
                     alternatives.append({
-                        'spot_id': spot_id,
-                        'confidence': alt_pred.get('probability_vacant', 0.5),
-                        'distance': spot_info.get('Proximity_To_Exit', 10.0) if spot_info else 10.0,
+                        'spot_id': spot['spot_id'],
+                        'section': spot['section'],
+                        'confidence': spot['probability_vacant'],
+                        'distance': spot['proximity'],
                         'size': spot_info.get('Spot_Size', 'Standard') if spot_info else 'Standard',
-                        'compatible': alt_pred.get('size_compatible', True)
+                        'compatible': spot['size_compatible']
                     })
                 
-                # Sort by confidence (descending)
-                alternatives.sort(key=lambda x: x['confidence'], reverse=True)
-                
                 # Display top 3 alternatives
                 if alternatives:
-                    st.write("**Top 3 Alternative Spots:**")
+                    st.write("**Top 3 Alternative Spots (whole lot):**")
                     
-                    for i, alt in enumerate(alternatives[:3], 1):
+                    for i, alt in enumerate(alternatives, 1):
                         col_1, col_2, col_3, col_4 = st.columns([1, 2, 2, 1])
                         
                         with col_1:
@@ -618,18 +833,22 @@ def _display_ml_insights(prediction, section, hour, booking_system, data_loader)
                         
                         with col_2:
                             st.write(f"**Spot {alt['spot_id']}**")
-                            st.caption(f"{alt['size']} {'✓' if alt['compatible'] else '⚠️'}")
+                            st.caption(f"{alt['section']} · {alt['size']} {'✓' if alt['compatible'] else '⚠️'}")
                         
                         with col_3:
                             st.write(f"{alt['confidence']*100:.0f}% confidence")
                             st.caption(f"{alt['distance']:.1f}m from exit")
                         
                         with col_4:
-                            if st.button("Select", key=f"alt_{alt['spot_id']}"):
+                            if st.button("Select", key=f"alt_{alt['section']}_{alt['spot_id']}"):
+                                if alt['section'] != section:
+                                    st.session_state.selected_section = alt['section']
                                 st.session_state.selected_slot = alt['spot_id']
                                 if 'user_inputs' in st.session_state:
                                     st.session_state.user_inputs['parking_spot_id'] = alt['spot_id']
                                 st.rerun()
+                elif search.get('fallback'):
+                    st.write("Still searching the whole lot - alternatives will show on the next refresh.")
                 else:
                     st.write("No better alternatives found at this time.")
             
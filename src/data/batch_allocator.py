@@ -0,0 +1,204 @@
+"""
+Batch Allocator Module
+Assigns parking spots to many pending booking requests in one run
+Used for offline jobs such as event-day pre-allocation
+"""
+import numpy as np
+
+# Spot sizes ordered from smallest to largest ('Large' and 'Oversized' are the same class)
+SPOT_SIZE_RANK = {
+    'Compact': 0,
+    'Standard': 1,
+    'Large': 2,
+    'Oversized': 2
+}
+
+# Smallest spot size each vehicle type fits in
+VEHICLE_SIZE_NEEDS = {
+    'Motorcycle': 'Compact',
+    'Sedan': 'Standard',
+    'Car': 'Standard',
+    'Electric Vehicle': 'Standard',
+    'SUV': 'Large',
+    'Truck': 'Large'
+}
+
+HOURS_PER_DAY = 24
+
+
+class BatchAllocator:
+    """
+    Offline spot allocation engine for a batch of booking requests
+
+    Each request asks for a spot over an hour interval [start_hour, end_hour).
+    Requests are placed with interval partitioning (earliest start first,
+    longest stay first on ties). Every spot keeps a 24-bit busy mask, so
+    checking all spots for one request is a single vectorized AND.
+    Among the feasible spots the engine prefers, in order:
+    - spots where the stay packs tightly against existing bookings
+    - spots that are not over-qualified (EV charger or larger size left for those who need it)
+    - spots closest to the exit
+    """
+
+    def __init__(self, data_loader, booking_system=None):
+        """
+        Initialize allocator with spot metadata and current bookings
+
+        Args:
+            data_loader: ParkingDataLoader instance for spot metadata
+            booking_system: Optional BookingSystem whose existing bookings are respected
+        """
+        self.data_loader = data_loader
+        self.booking_system = booking_system
+
+        spot_table = data_loader.get_spot_table()
+        self.sections = spot_table['Parking_Lot_Section'].to_numpy()
+        self.spot_ids = spot_table['Parking_Spot_ID'].to_numpy()
+        self.size_rank = spot_table['Spot_Size'].map(SPOT_SIZE_RANK).fillna(1).to_numpy(dtype=np.int8)
+        self.has_ev = spot_table['Electric_Vehicle'].to_numpy() == 1
+        self.proximity = spot_table['Proximity_To_Exit'].fillna(10.0).to_numpy(dtype=float)
+
+    def _initial_busy_masks(self):
+        """
+        Build the busy-hour bitmask of every spot from the booking system
+
+        Returns:
+            np.ndarray: int64 array, bit h set when the spot is booked (or
+                        blocked by a recurring rule) at hour h
+        """
+        masks = np.zeros(len(self.spot_ids), dtype=np.int64)
+        if self.booking_system is None:
+            return masks
+
+        for i, (spot_id, section) in enumerate(zip(self.spot_ids, self.sections)):
+            masks[i] = self.booking_system.get_blocked_hours(spot_id, section)
+        return masks
+
+    @staticmethod
+    def _normalize_request(request):
+        """
+        Validate a request dict and fill in defaults
+
+        Returns:
+            dict or None: Normalized request, or None if the interval is invalid
+        """
+        start = int(request.get('start_hour', 0))
+        end = int(request.get('end_hour', start + 1))
+        if not (0 <= start < end <= HOURS_PER_DAY):
+            return None
+
+        size = request.get('spot_size') or VEHICLE_SIZE_NEEDS.get(request.get('vehicle_type'), 'Standard')
+        return {
+            'request_id': request['request_id'],
+            'start_hour': start,
+            'end_hour': end,
+            'size_rank': SPOT_SIZE_RANK.get(size, 1),
+            'needs_ev': bool(request.get('needs_ev', False)),
+            'section': request.get('section')
+        }
+
+    def allocate(self, requests, commit=False, user_id="Batch"):
+        """
+        Assign spots to a batch of pending booking requests
+
+        Args:
+            requests: List of dicts with keys
+                - request_id: Unique request identifier
+                - start_hour / end_hour: Stay interval, end exclusive (0-24)
+                - vehicle_type or spot_size: Used to derive the minimum spot size
+                - needs_ev: True if EV charging is required (optional)
+                - section: Restrict to one section (optional)
+            commit: If True, write the assignments into the booking system.
+                Each stay is booked all-or-nothing (book_interval); a stay the
+                booking system rejects is moved to 'unassigned'
+            user_id: Booking owner used when committing
+
+        Returns:
+            dict: {
+                'assignments': {request_id: {'spot_id', 'section', 'start_hour', 'end_hour', 'distance_to_exit'}},
+                'unassigned': [request_id, ...],
+                'utilization': float (booked spot-hours / total spot-hours, 0-1),
+                'total_walking_distance': float
+            }
+        """
+        busy = self._initial_busy_masks()
+
+        normalized = []
+        unassigned = []
+        for request in requests:
+            req = self._normalize_request(request)
+            if req is None:
+                unassigned.append(request['request_id'])
+            else:
+                normalized.append(req)
+
+        # Interval partitioning order: earliest start, then longest stay
+        normalized.sort(key=lambda r: (r['start_hour'], r['start_hour'] - r['end_hour']))
+
+        assignments = {}
+        assigned_rows = {}
+        total_distance = 0.0
+
+        for req in normalized:
+            start, end = req['start_hour'], req['end_hour']
+            req_mask = (1 << end) - (1 << start)
+
+            feasible = ((busy & req_mask) == 0) & (self.size_rank >= req['size_rank'])
+            if req['needs_ev']:
+                feasible &= self.has_ev
+            if req['section']:
+                feasible &= self.sections == req['section']
+
+            candidates = np.flatnonzero(feasible)
+            if len(candidates) == 0:
+                unassigned.append(req['request_id'])
+                continue
+
+            # Tight packing: reward stays that touch a busy hour (or the day edge) on each side
+            cand_busy = busy[candidates]
+            touches_left = (cand_busy >> (start - 1)) & 1 if start > 0 else np.ones(len(candidates), dtype=np.int64)
+            touches_right = (cand_busy >> end) & 1 if end < HOURS_PER_DAY else np.ones(len(candidates), dtype=np.int64)
+            touches = touches_left + touches_right
+
+            # Over-qualification: don't burn EV chargers or large spots on requests that don't need them
+            overqualified = (self.size_rank[candidates] - req['size_rank']) + \
+                (self.has_ev[candidates] & (not req['needs_ev'])).astype(np.int8)
+
+            order = np.lexsort((self.proximity[candidates], overqualified, -touches))
+            best = candidates[order[0]]
+
+            busy[best] |= req_mask
+            assigned_rows[req['request_id']] = best
+            distance = float(self.proximity[best])
+            total_distance += distance
+            assignments[req['request_id']] = {
+                'spot_id': int(self.spot_ids[best]),
+                'section': self.sections[best],
+                'start_hour': start,
+                'end_hour': end,
+                'distance_to_exit': distance
+            }
+
+        if commit and self.booking_system is not None:
+            for request_id, assignment in list(assignments.items()):
+                booked = self.booking_system.book_interval(
+                    assignment['spot_id'], assignment['section'],
+                    assignment['start_hour'], assignment['end_hour'], user_id=user_id
+                )
+                if not booked:
+                    # Nothing of this stay was written; give its hours back
+                    row = assigned_rows[request_id]
+                    busy[row] &= ~((1 << assignment['end_hour']) - (1 << assignment['start_hour']))
+                    total_distance -= assignment['distance_to_exit']
+                    del assignments[request_id]
+                    unassigned.append(request_id)
+
+        booked_hours = sum(bin(int(mask)).count('1') for mask in busy)
+        total_hours = len(busy) * HOURS_PER_DAY
+
+        return {
+            'assignments': assignments,
+            'unassigned': unassigned,
+            'utilization': booked_hours / total_hours if total_hours else 0.0,
+            'total_walking_distance': round(total_distance, 2)
+        }
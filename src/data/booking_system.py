@@ -2,9 +2,22 @@
 Booking System Module
 Generates and manages dummy booking data (will be replaced with database later)
 """
+import heapq
 import random
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
+
+from data.occupancy_profile import build_occupancy_profile
+from data.user_profiles import get_user_profile_store
+
+DAYS_OF_WEEK = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Placeholder owners of bookings not made by a known user (no profile is kept)
+ANONYMOUS_USERS = {'User', 'Batch'}
+
+# Spot size labels along the size axis of the occupancy cube
+CUBE_SPOT_SIZES = ['Compact', 'Standard', 'Oversized']
 
 class BookingSystem:
     """
@@ -25,7 +38,38 @@ class BookingSystem:
         """
         self.data_loader = data_loader
         self.seed = seed
+        
+        # Historical occupancy rates per (section, weekday, hour), used to simulate bookings
+        self.occupancy_profile = self._build_occupancy_profile()
+        
         self.bookings = self._generate_dummy_bookings()
+        
+        # Recurring (weekly) booking rules; each spot keeps the IDs of its rules
+        # and the union of their hour masks (hours a daily booking can't take)
+        self.recurring_rules = {}
+        self._spot_rules = {}
+        self._blocked_masks = {}
+        self._rules_by_weekday = [[] for _ in range(7)]
+        self._recurring_calendar = {}
+        self._next_rule_id = 1
+        # Date the cube's recurring counts and the expired-rule cleanup refer to
+        self._recurring_as_of = date.today()
+        
+        # Bookings whose user profile is updated once they end: heap of
+        # (end datetime, sequence, user_id, vehicle_type, hours)
+        self._pending_profile_updates = []
+        self._pending_sequence = 0
+        
+        # Per-spot free-interval lists and per-section gap index (for best-fit placement)
+        self.free_intervals = {}
+        self._gap_index = {}
+        self._build_gap_index()
+        
+        # Materialized booked counts by (section, day of week, hour, spot size, EV)
+        self._build_occupancy_cube()
+        
+        # Per-section, per-hour availability bitmaps (bit N = spot ID N is free)
+        self._build_availability_bitmaps()
     
     def _generate_dummy_bookings(self):
         """
@@ -52,7 +96,7 @@ class BookingSystem:
             for spot_id in spots:
                 for hour in range(24):  # 0-23 hours
                     # Generate occupancy pattern based on typical parking behavior
-                    occupancy_probability = self._get_occupancy_probability(hour)
+                    occupancy_probability = self._get_occupancy_probability(hour, section)
                     
                     # Randomly decide if spot is booked at this hour
                     is_booked = random.random() < occupancy_probability
@@ -68,10 +112,48 @@ class BookingSystem:
         
         return bookings
     
-    def _get_occupancy_probability(self, hour):
+    def _build_occupancy_profile(self):
+        """
+        Learn occupancy rates from the historical stays in the dataset
+        
+        Returns:
+            OccupancyProfile or None if the dataset can't provide one
+        """
+        try:
+            if self.data_loader.df is None:
+                return None
+            return build_occupancy_profile(self.data_loader.df)
+        except Exception as e:
+            print(f"[WARNING] Occupancy profile unavailable, using default hourly pattern: {e}")
+            return None
+    
+    def _get_occupancy_probability(self, hour, section=None, day_of_week=None):
+        """
+        Get probability of a spot being occupied
+        
+        Reads the historical occupancy profile (averaged over the week when
+        no day is given, since dummy bookings apply to every day). Falls
+        back to the typical hourly pattern if there is no profile or section.
+        
+        Args:
+            hour: Hour of day (0-23)
+            section: Parking section
+            day_of_week: Day of week (0-6 or name), or None for any day
+        
+        Returns:
+            float: Occupancy probability
+        """
+        if self.occupancy_profile is not None and section is not None:
+            day_idx = None if day_of_week is None else self._day_index(day_of_week)
+            rate = self.occupancy_profile.rate(section, hour, day_idx)
+            if rate is not None:
+                return rate
+        return self._default_occupancy_probability(hour)
+    
+    @staticmethod
+    def _default_occupancy_probability(hour):
         """
-        Get probability of a spot being occupied based on hour
-        Simulates realistic parking patterns
+        Typical occupancy by hour when no history is available
         
         Peak hours (8-10 AM, 5-7 PM): Higher occupancy
         Off-peak (11 PM - 6 AM): Lower occupancy
@@ -85,7 +167,7 @@ class BookingSystem:
         else:  # Night/early morning
             return 0.25  # 25% occupancy
     
-    def is_spot_booked(self, spot_id, section, hour):
+    def is_spot_booked(self, spot_id, section, hour, day_of_week=None):
         """
         Check if a specific spot is booked at a given hour
         
@@ -93,20 +175,139 @@ class BookingSystem:
             spot_id: Parking spot ID
             section: Parking section (Zone A, B, C, D)
             hour: Hour of day (0-23)
+            day_of_week: Day of week (0-6 or name) for recurring bookings, defaults to today;
+                recurring rules are checked on that day's next date (today included)
         
         Returns:
             bool: True if booked, False if available
         """
+        if self._is_hourly_booked(spot_id, section, hour):
+            return True
+        
+        self._refresh_recurring()
+        if (spot_id, section) not in self._spot_rules:
+            return False
+        on_date = self._occurrence_date(self._day_index(day_of_week))
+        return bool(self._recurring_hours(spot_id, section, on_date) >> hour & 1)
+    
+    def _is_hourly_booked(self, spot_id, section, hour):
+        """Check the daily hourly bookings only (ignores recurring rules)"""
         key = (spot_id, section, hour)
         return self.bookings.get(key, {}).get('is_booked', False)
     
-    def get_section_occupancy(self, section, hour):
+    def get_blocked_hours(self, spot_id, section):
+        """
+        Hours a daily booking can't take on a spot
+        
+        Daily bookings repeat every day, so they collide with the spot's
+        hourly bookings and with every current or future recurring rule.
+        
+        Returns:
+            int: 24-bit mask, bit N set if hour N is blocked
+        """
+        self._refresh_recurring()
+        mask = self._blocked_masks.get((spot_id, section), 0)
+        for hour in range(24):
+            if self._is_hourly_booked(spot_id, section, hour):
+                mask |= 1 << hour
+        return mask
+    
+    def _build_occupancy_cube(self):
+        """
+        Build the occupancy cube from the current bookings
+        
+        Axes: (section, day of week, hour, spot size, EV charger).
+        Hourly bookings are not tied to a weekday, so they count on every day.
+        """
+        spot_table = self.data_loader.get_spot_table()
+        self.cube_sections = list(self.data_loader.get_all_sections())
+        self._cube_section_index = {section: i for i, section in enumerate(self.cube_sections)}
+        
+        # Cube coordinates of each spot's static attributes
+        size_index = {size: i for i, size in enumerate(CUBE_SPOT_SIZES)}
+        self._spot_cube_coords = {}
+        self.capacity_cube = np.zeros(
+            (len(self.cube_sections), len(CUBE_SPOT_SIZES), 2), dtype=np.int32
+        )
+        for row in spot_table.itertuples(index=False):
+            coords = (
+                self._cube_section_index[row.Parking_Lot_Section],
+                size_index.get(row.Spot_Size, 1),
+                1 if row.Electric_Vehicle == 1 else 0
+            )
+            self._spot_cube_coords[(row.Parking_Spot_ID, row.Parking_Lot_Section)] = coords
+            self.capacity_cube[coords] += 1
+        
+        self.occupancy_cube = np.zeros(
+            (len(self.cube_sections), 7, 24, len(CUBE_SPOT_SIZES), 2), dtype=np.int32
+        )
+        for (spot_id, section, hour), booking in self.bookings.items():
+            if booking['is_booked']:
+                self._add_to_cube(spot_id, section, hour)
+    
+    def _add_to_cube(self, spot_id, section, hour, day_of_week=None, count=1):
+        """
+        Count one booked spot-hour in the occupancy cube
+        Without a day of week the booking counts on every day
+        """
+        coords = self._spot_cube_coords.get((spot_id, section))
+        if coords is None:
+            return
+        section_idx, size_idx, ev_idx = coords
+        day_idx = slice(None) if day_of_week is None else day_of_week
+        self.occupancy_cube[section_idx, day_idx, hour, size_idx, ev_idx] += count
+    
+    @staticmethod
+    def _occurrence_date(day_idx, today=None):
+        """Date of the next occurrence of a weekday (today if it is that day)"""
+        today = today or date.today()
+        return today + timedelta(days=(day_idx - today.weekday()) % 7)
+    
+    @staticmethod
+    def _day_index(day_of_week):
+        """
+        Normalize a day of week to 0-6 (0=Monday)
+        Accepts an int, a day name, or None for today
+        """
+        if day_of_week is None:
+            return datetime.now().weekday()
+        if isinstance(day_of_week, str):
+            return DAYS_OF_WEEK.index(day_of_week) if day_of_week in DAYS_OF_WEEK else 0
+        return int(day_of_week)
+    
+    def get_occupancy_slice(self, section=None, day_of_week=None, hour=None,
+                            spot_size=None, ev=None):
+        """
+        Slice the occupancy cube; any argument left as None keeps that axis
+        
+        Args:
+            section: Section name
+            day_of_week: Day of week (0-6 or name)
+            hour: Hour of day (0-23)
+            spot_size: One of CUBE_SPOT_SIZES
+            ev: True/False for spots with/without EV charging
+        
+        Returns:
+            np.ndarray: Booked counts with the selected axes indexed out
+        """
+        self._refresh_recurring()
+        index = (
+            slice(None) if section is None else self._cube_section_index[section],
+            slice(None) if day_of_week is None else self._day_index(day_of_week),
+            slice(None) if hour is None else hour,
+            slice(None) if spot_size is None else CUBE_SPOT_SIZES.index(spot_size),
+            slice(None) if ev is None else int(bool(ev))
+        )
+        return self.occupancy_cube[index]
+    
+    def get_section_occupancy(self, section, hour, day_of_week=None):
         """
         Calculate occupancy percentage for a section at a given hour
         
         Args:
             section: Parking section (Zone A, B, C, D)
             hour: Hour of day (0-23)
+            day_of_week: Day of week (0-6 or name), defaults to today
         
         Returns:
             dict: {
@@ -116,13 +317,18 @@ class BookingSystem:
                 'occupancy_percentage': float
             }
         """
-        spots = self.data_loader.get_spots_by_section(section)
-        total_spots = len(spots)
+        if section not in self._cube_section_index:
+            return {
+                'total_spots': 0,
+                'booked_spots': 0,
+                'available_spots': 0,
+                'occupancy_percentage': 0
+            }
         
-        booked_spots = sum(
-            1 for spot_id in spots 
-            if self.is_spot_booked(spot_id, section, hour)
-        )
+        self._refresh_recurring()
+        section_idx = self._cube_section_index[section]
+        total_spots = int(self.capacity_cube[section_idx].sum())
+        booked_spots = int(self.occupancy_cube[section_idx, self._day_index(day_of_week), hour].sum())
         
         available_spots = total_spots - booked_spots
         occupancy_percentage = (booked_spots / total_spots * 100) if total_spots > 0 else 0
@@ -134,33 +340,34 @@ class BookingSystem:
             'occupancy_percentage': round(occupancy_percentage, 1)
         }
     
-    def get_all_sections_occupancy(self, hour):
+    def get_all_sections_occupancy(self, hour, day_of_week=None):
         """
         Get occupancy data for all sections at a given hour
         
         Args:
             hour: Hour of day (0-23)
+            day_of_week: Day of week (0-6 or name), defaults to today
         
         Returns:
             dict: {section_name: occupancy_data}
         """
-        sections = self.data_loader.get_all_sections()
         return {
-            section: self.get_section_occupancy(section, hour)
-            for section in sections
+            section: self.get_section_occupancy(section, hour, day_of_week)
+            for section in self.cube_sections
         }
     
-    def get_least_occupied_section(self, hour):
+    def get_least_occupied_section(self, hour, day_of_week=None):
         """
         Find the least occupied section at a given hour
         
         Args:
             hour: Hour of day (0-23)
+            day_of_week: Day of week (0-6 or name), defaults to today
         
         Returns:
             tuple: (section_name, occupancy_percentage)
         """
-        all_occupancy = self.get_all_sections_occupancy(hour)
+        all_occupancy = self.get_all_sections_occupancy(hour, day_of_week)
         
         least_occupied = min(
             all_occupancy.items(),
@@ -169,7 +376,7 @@ class BookingSystem:
         
         return (least_occupied[0], least_occupied[1]['occupancy_percentage'])
     
-    def get_available_spots_in_section(self, section, hour):
+    def get_available_spots_in_section(self, section, hour, day_of_week=None):
         """
         Get list of available (not booked) spots in a section at a given hour
         Sorted by spot ID for consistency
@@ -177,20 +384,22 @@ class BookingSystem:
         Args:
             section: Parking section
             hour: Hour of day (0-23)
+            day_of_week: Day of week (0-6 or name), defaults to today
         
         Returns:
             list: List of available spot IDs (sorted)
         """
+        self.complete_due_bookings()
         spots = self.data_loader.get_spots_by_section(section)
         
         available = [
             spot_id for spot_id in spots
-            if not self.is_spot_booked(spot_id, section, hour)
+            if not self.is_spot_booked(spot_id, section, hour, day_of_week)
         ]
         
         return sorted(available)
     
-    def get_best_available_spot(self, section, hour, data_loader, prefer_close_to_exit=True):
+    def get_best_available_spot(self, section, hour, data_loader, prefer_close_to_exit=True, day_of_week=None):
         """
         Get the best available spot in a section based on criteria
         
@@ -199,11 +408,12 @@ class BookingSystem:
             hour: Hour of day (0-23)
             data_loader: ParkingDataLoader to get spot details
             prefer_close_to_exit: If True, prefer spots closer to exit
+            day_of_week: Day of week (0-6 or name), defaults to today
         
         Returns:
             int or None: Best available spot ID, or None if all booked
         """
-        available_spots = self.get_available_spots_in_section(section, hour)
+        available_spots = self.get_available_spots_in_section(section, hour, day_of_week)
         
         if not available_spots:
             return None
@@ -254,7 +464,7 @@ class BookingSystem:
         else:
             return 'stable'
     
-    def book_spot(self, spot_id, section, hour, user_id="User"):
+    def book_spot(self, spot_id, section, hour, user_id="User", vehicle_type=None):
         """
         Book a parking spot (for future use when booking is implemented)
         
@@ -263,6 +473,8 @@ class BookingSystem:
             section: Parking section
             hour: Hour to book (0-23)
             user_id: User making the booking
+            vehicle_type: Vehicle the user books with (kept in their profile
+                once the booking ends)
         
         Returns:
             bool: True if booking successful, False if already booked
@@ -273,12 +485,531 @@ class BookingSystem:
         if key in self.bookings and self.bookings[key]['is_booked']:
             return False  # Already booked
         
+        # Hourly bookings repeat daily, so any current or future recurring rule at this hour conflicts
+        if self.get_blocked_hours(spot_id, section) >> hour & 1:
+            return False
+        
         # Book the spot
         self.bookings[key] = {
             'is_booked': True,
             'booked_by': user_id,
             'booking_time': datetime.now()
         }
+        self._index_spot(spot_id, section)
+        self._add_to_cube(spot_id, section, hour)
+        self._mark_bitmap_booked(spot_id, section, hour)
+        self._schedule_profile_update(user_id, vehicle_type, hour, hour + 1)
         
         return True
-
+    
+    def _schedule_profile_update(self, user_id, vehicle_type, start_hour, end_hour):
+        """
+        Queue a profile update for when a booking ends
+        
+        Bookings are daily, so the stay is the next occurrence of the
+        window: today if it hasn't started yet, otherwise tomorrow.
+        """
+        self.complete_due_bookings()
+        if user_id is None or user_id in ANONYMOUS_USERS:
+            return
+        now = datetime.now()
+        stay_date = now.date() if start_hour >= now.hour else now.date() + timedelta(days=1)
+        ends_at = datetime.combine(stay_date, datetime.min.time()) + timedelta(hours=end_hour)
+        self._pending_sequence += 1
+        heapq.heappush(
+            self._pending_profile_updates,
+            (ends_at, self._pending_sequence, user_id, vehicle_type, end_hour - start_hour)
+        )
+    
+    def complete_due_bookings(self, now=None):
+        """
+        Record every booking that has ended in its user's profile
+        
+        Called lazily on booking operations; can also be called by a
+        periodic job.
+        
+        Args:
+            now: Current time (default: datetime.now())
+        
+        Returns:
+            int: Number of bookings recorded
+        """
+        now = now or datetime.now()
+        completed = 0
+        while self._pending_profile_updates and self._pending_profile_updates[0][0] <= now:
+            _, _, user_id, vehicle_type, hours = heapq.heappop(self._pending_profile_updates)
+            self._record_user_booking(user_id, vehicle_type, hours)
+            completed += 1
+        return completed
+    
+    def _record_user_booking(self, user_id, vehicle_type, hours):
+        """Update the user's profile after a completed booking (never raises)"""
+        if user_id is None or user_id in ANONYMOUS_USERS:
+            return
+        store = get_user_profile_store(self.data_loader)
+        if store is None:
+            return
+        try:
+            store.record_booking(user_id, vehicle_type, hours)
+        except Exception as e:
+            print(f"[WARNING] Could not update profile of {user_id}: {e}")
+    
+    def _build_gap_index(self):
+        """Build free-interval lists and the gap index for every spot"""
+        for section in self.data_loader.get_all_sections():
+            self._gap_index[section] = {}
+            for spot_id in self.data_loader.get_spots_by_section(section):
+                self._index_spot(spot_id, section)
+    
+    def _compute_free_intervals(self, spot_id, section):
+        """
+        Compute the free hour intervals of a spot
+        
+        Returns:
+            list: Sorted [(start_hour, end_hour), ...] with end exclusive
+        """
+        blocked = self.get_blocked_hours(spot_id, section)
+        intervals = []
+        start = None
+        for hour in range(24):
+            if blocked >> hour & 1:
+                if start is not None:
+                    intervals.append((start, hour))
+                    start = None
+            elif start is None:
+                start = hour
+        if start is not None:
+            intervals.append((start, 24))
+        return intervals
+    
+    def _index_spot(self, spot_id, section):
+        """Refresh a spot's free-interval list and its entries in the gap index"""
+        section_index = self._gap_index.setdefault(section, {})
+        
+        for gap in self.free_intervals.get((spot_id, section), []):
+            spots = section_index.get(gap)
+            if spots is not None:
+                spots.discard(spot_id)
+                if not spots:
+                    del section_index[gap]
+        
+        intervals = self._compute_free_intervals(spot_id, section)
+        self.free_intervals[(spot_id, section)] = intervals
+        for gap in intervals:
+            section_index.setdefault(gap, set()).add(spot_id)
+    
+    def find_best_fit_spot(self, section, start_hour, end_hour):
+        """
+        Find the spot whose free gap fits the requested window most tightly
+        
+        Looks up gaps by (start, end) in the section's gap index, so the cost
+        depends on the number of distinct gaps (at most 300), not on the
+        number of spots. Smaller leftover gaps are preferred; on ties, gaps
+        where the window sits against one edge win, so the remaining free
+        time stays in one piece.
+        
+        Args:
+            section: Parking section
+            start_hour: First hour of the stay (0-23)
+            end_hour: Hour the stay ends, exclusive (1-24)
+        
+        Returns:
+            int or None: Best-fit spot ID, or None if no spot is free for the window
+        """
+        return next(self._best_fit_candidates(section, start_hour, end_hour), None)
+    
+    def _best_fit_candidates(self, section, start_hour, end_hour):
+        """Yield the spots that fit a window, best fit first (see find_best_fit_spot)"""
+        if not (0 <= start_hour < end_hour <= 24):
+            return
+        
+        self._refresh_recurring()
+        section_index = self._gap_index.get(section, {})
+        candidates = sorted(
+            (gap for gap in section_index if gap[0] <= start_hour and gap[1] >= end_hour),
+            key=lambda gap: (
+                gap[1] - gap[0],
+                0 if gap[0] == start_hour or gap[1] == end_hour else 1,
+                gap[0]
+            )
+        )
+        for gap in candidates:
+            # Copy: booking a spot re-indexes it while we iterate
+            for spot_id in sorted(section_index.get(gap, ())):
+                yield spot_id
+    
+    def book_interval(self, spot_id, section, start_hour, end_hour, user_id="User", vehicle_type=None):
+        """
+        Book a spot for every hour in [start_hour, end_hour)
+        
+        Args:
+            spot_id: Parking spot ID
+            section: Parking section
+            start_hour: First hour of the stay (0-23)
+            end_hour: Hour the stay ends, exclusive (1-24)
+            user_id: User making the booking
+            vehicle_type: Vehicle the user books with (kept in their profile)
+        
+        Returns:
+            bool: True if booking successful, False if any hour is already booked
+        """
+        if not (0 <= start_hour < end_hour <= 24):
+            return False
+        
+        hours = range(start_hour, end_hour)
+        if self.get_blocked_hours(spot_id, section) & self._window_mask(start_hour, end_hour):
+            return False
+        
+        booking_time = datetime.now()
+        for hour in hours:
+            self.bookings[(spot_id, section, hour)] = {
+                'is_booked': True,
+                'booked_by': user_id,
+                'booking_time': booking_time
+            }
+            self._add_to_cube(spot_id, section, hour)
+            self._mark_bitmap_booked(spot_id, section, hour)
+        self._index_spot(spot_id, section)
+        self._schedule_profile_update(user_id, vehicle_type, start_hour, end_hour)
+        
+        return True
+    
+    def book_best_fit(self, section, start_hour, end_hour, user_id="User", vehicle_type=None):
+        """
+        Book the best-fit spot in a section for an hour window
+        
+        Args:
+            section: Parking section
+            start_hour: First hour of the stay (0-23)
+            end_hour: Hour the stay ends, exclusive (1-24)
+            user_id: User making the booking
+            vehicle_type: Vehicle the user books with (kept in their profile)
+        
+        Returns:
+            int or None: Booked spot ID, or None if no spot could be booked for the window
+        """
+        # Fall through to the next-best spot if a booking is refused
+        for spot_id in self._best_fit_candidates(section, start_hour, end_hour):
+            if self.book_interval(spot_id, section, start_hour, end_hour, user_id, vehicle_type):
+                return spot_id
+        return None
+    
+    def _build_availability_bitmaps(self):
+        """
+        Build one free-spot bitmap per (section, hour)
+        Bits are positioned by Parking_Spot_ID, so adjacent IDs are adjacent
+        bits and missing IDs are never free
+        """
+        self._free_bitmaps = {}
+        for section in self.data_loader.get_all_sections():
+            self._free_bitmaps[section] = [0] * 24
+            for spot_id in self.data_loader.get_spots_by_section(section):
+                self._refresh_spot_bitmaps(spot_id, section)
+    
+    def _refresh_spot_bitmaps(self, spot_id, section):
+        """Set a spot's bit in every hourly bitmap from its blocked hours"""
+        bitmaps = self._free_bitmaps.get(section)
+        if bitmaps is None:
+            return
+        blocked = self.get_blocked_hours(spot_id, section)
+        bit = 1 << int(spot_id)
+        for hour in range(24):
+            if blocked >> hour & 1:
+                bitmaps[hour] &= ~bit
+            else:
+                bitmaps[hour] |= bit
+    
+    def _mark_bitmap_booked(self, spot_id, section, hour):
+        """Clear a spot's bit in the availability bitmap for one hour"""
+        bitmaps = self._free_bitmaps.get(section)
+        if bitmaps is not None:
+            bitmaps[hour] &= ~(1 << int(spot_id))
+    
+    def find_adjacent_spots(self, group_size, start_hour, end_hour, section=None):
+        """
+        Find runs of adjacent spots that are all free for a whole window
+        
+        ANDs the section's hourly bitmaps over [start_hour, end_hour), then
+        folds the result with shifted copies of itself (doubling the run length
+        each step) so a remaining set bit marks the first spot of a free run.
+        
+        Args:
+            group_size: Number of adjacent spots needed (k)
+            start_hour: First hour of the stay (0-23)
+            end_hour: Hour the stay ends, exclusive (1-24)
+            section: Section to search, or None for every section
+        
+        Returns:
+            dict: {section_name: [[spot_id, ...], ...]} with one list of
+                  group_size consecutive spot IDs per possible group
+        """
+        if group_size < 1 or not (0 <= start_hour < end_hour <= 24):
+            return {}
+        
+        self._refresh_recurring()
+        sections = [section] if section is not None else list(self._free_bitmaps)
+        results = {}
+        
+        for name in sections:
+            bitmaps = self._free_bitmaps.get(name)
+            if bitmaps is None:
+                continue
+            
+            # Spots free for every hour in the window
+            free = -1
+            for hour in range(start_hour, end_hour):
+                free &= bitmaps[hour]
+            
+            # Keep bit i only if bits i..i+group_size-1 are all set
+            runs = free
+            length = 1
+            while length < group_size and runs:
+                step = min(length, group_size - length)
+                runs &= runs >> step
+                length += step
+            
+            groups = []
+            while runs:
+                lowest = runs & -runs
+                first_spot = lowest.bit_length() - 1
+                groups.append(list(range(first_spot, first_spot + group_size)))
+                runs ^= lowest
+            
+            if groups:
+                results[name] = groups
+        
+        return results
+    
+    @staticmethod
+    def _window_mask(start_hour, end_hour):
+        """24-bit mask with bits [start_hour, end_hour) set"""
+        return (1 << end_hour) - (1 << start_hour)
+    
+    def _rule_conflicts(self, spot_id, section, weekdays, window_mask, start_date, end_date):
+        """
+        Check a candidate weekly rule against existing bookings of the spot
+        
+        The spot's blocked-hours mask answers most checks in one AND; only
+        when it overlaps are the spot's rules and their date ranges compared.
+        """
+        # Daily hourly bookings collide on every weekday
+        for hour in range(24):
+            if window_mask >> hour & 1 and self._is_hourly_booked(spot_id, section, hour):
+                return True
+        
+        if not self._blocked_masks.get((spot_id, section), 0) & window_mask:
+            return False
+        
+        for rule_id in self._spot_rules.get((spot_id, section), ()):
+            rule = self.recurring_rules[rule_id]
+            if not (rule['weekdays'] & weekdays) or not (rule['mask'] & window_mask):
+                continue
+            rule_end = rule['end_date'] or date.max
+            if rule['start_date'] <= (end_date or date.max) and start_date <= rule_end:
+                return True
+        return False
+    
+    def add_recurring_booking(self, spot_id, section, weekdays, start_hour, end_hour,
+                              user_id="User", start_date=None, end_date=None):
+        """
+        Add a weekly standing booking, e.g. every weekday from 8 to 18
+        
+        Only the rule is stored; occurrences are expanded per date on demand
+        by expand_recurring_bookings(). The rule blocks its hours for daily
+        bookings (gap index, bitmaps) until it expires, and is counted in the
+        occupancy cube on the weekdays whose next date it covers.
+        
+        Args:
+            spot_id: Parking spot ID
+            section: Parking section
+            weekdays: Days the rule repeats on (ints 0-6 or day names)
+            start_hour: First hour of each stay (0-23)
+            end_hour: Hour each stay ends, exclusive (1-24)
+            user_id: User making the booking
+            start_date: First date the rule applies (default: today)
+            end_date: Last date the rule applies (default: open-ended)
+        
+        Returns:
+            int or None: Rule ID, or None if the rule conflicts with existing bookings
+                or has already ended
+        """
+        if not (0 <= start_hour < end_hour <= 24):
+            return None
+        
+        self._refresh_recurring()
+        weekdays = frozenset(self._day_index(day) for day in weekdays)
+        start_date = start_date or date.today()
+        if end_date is not None and end_date < max(start_date, date.today()):
+            return None
+        window_mask = self._window_mask(start_hour, end_hour)
+        
+        if not weekdays or self._rule_conflicts(spot_id, section, weekdays, window_mask, start_date, end_date):
+            return None
+        
+        rule_id = self._next_rule_id
+        self._next_rule_id += 1
+        self.recurring_rules[rule_id] = {
+            'rule_id': rule_id,
+            'spot_id': spot_id,
+            'section': section,
+            'weekdays': weekdays,
+            'start_hour': start_hour,
+            'end_hour': end_hour,
+            'mask': window_mask,
+            'user_id': user_id,
+            'start_date': start_date,
+            'end_date': end_date,
+            'booking_time': datetime.now(),
+            'cube_days': frozenset()
+        }
+        
+        spot_key = (spot_id, section)
+        self._spot_rules.setdefault(spot_key, set()).add(rule_id)
+        self._blocked_masks[spot_key] = self._blocked_masks.get(spot_key, 0) | window_mask
+        for day in weekdays:
+            self._rules_by_weekday[day].append(rule_id)
+        self._count_rule_in_cube(self.recurring_rules[rule_id])
+        
+        # Best-fit and adjacent-spot searches must skip the held hours
+        self._index_spot(spot_id, section)
+        self._refresh_spot_bitmaps(spot_id, section)
+        
+        # Already-expanded dates must pick up the new rule
+        self._recurring_calendar.clear()
+        
+        return rule_id
+    
+    def cancel_recurring_booking(self, rule_id):
+        """
+        Remove a recurring booking rule
+        
+        Args:
+            rule_id: ID returned by add_recurring_booking
+        
+        Returns:
+            bool: True if the rule existed and was removed
+        """
+        rule = self.recurring_rules.pop(rule_id, None)
+        if rule is None:
+            return False
+        
+        spot_key = (rule['spot_id'], rule['section'])
+        for day in rule['weekdays']:
+            self._rules_by_weekday[day].remove(rule_id)
+        self._uncount_rule_in_cube(rule)
+        
+        # Rebuild the spot's blocked hours from its remaining rules
+        rule_ids = self._spot_rules.get(spot_key, set())
+        rule_ids.discard(rule_id)
+        mask = 0
+        for other_id in rule_ids:
+            mask |= self.recurring_rules[other_id]['mask']
+        if rule_ids:
+            self._blocked_masks[spot_key] = mask
+        else:
+            self._spot_rules.pop(spot_key, None)
+            self._blocked_masks.pop(spot_key, None)
+        
+        self._index_spot(*spot_key)
+        self._refresh_spot_bitmaps(*spot_key)
+        
+        self._recurring_calendar.clear()
+        return True
+    
+    @staticmethod
+    def _rule_active_on(rule, on_date):
+        """Check whether a rule has an occurrence on a date"""
+        return (
+            on_date.weekday() in rule['weekdays'] and
+            rule['start_date'] <= on_date and
+            (rule['end_date'] is None or on_date <= rule['end_date'])
+        )
+    
+    def _recurring_hours(self, spot_id, section, on_date):
+        """24-bit mask of the spot's hours held by recurring rules on a date"""
+        mask = 0
+        for rule_id in self._spot_rules.get((spot_id, section), ()):
+            rule = self.recurring_rules[rule_id]
+            if self._rule_active_on(rule, on_date):
+                mask |= rule['mask']
+        return mask
+    
+    def _count_rule_in_cube(self, rule):
+        """
+        Count a rule in the occupancy cube on the weekdays whose next date it covers
+        
+        The cube's weekday axis describes the coming week (today included),
+        so a rule that hasn't started yet or has ended is not counted there.
+        """
+        days = frozenset(
+            day for day in rule['weekdays']
+            if self._rule_active_on(rule, self._occurrence_date(day, self._recurring_as_of))
+        )
+        for day in days ^ rule['cube_days']:
+            count = 1 if day in days else -1
+            for hour in range(rule['start_hour'], rule['end_hour']):
+                self._add_to_cube(rule['spot_id'], rule['section'], hour, day_of_week=day, count=count)
+        rule['cube_days'] = days
+    
+    def _uncount_rule_in_cube(self, rule):
+        """Remove a rule's counts from the occupancy cube"""
+        for day in rule['cube_days']:
+            for hour in range(rule['start_hour'], rule['end_hour']):
+                self._add_to_cube(rule['spot_id'], rule['section'], hour, day_of_week=day, count=-1)
+        rule['cube_days'] = frozenset()
+    
+    def _refresh_recurring(self):
+        """
+        Roll recurring state forward when the date changes
+        
+        Expired rules are removed (freeing their hours in the gap index and
+        bitmaps) and the cube's recurring counts are moved to the new week.
+        """
+        today = date.today()
+        if self._recurring_as_of == today:
+            return
+        self._recurring_as_of = today
+        
+        for rule_id, rule in list(self.recurring_rules.items()):
+            if rule['end_date'] is not None and rule['end_date'] < today:
+                self.cancel_recurring_booking(rule_id)
+            else:
+                self._count_rule_in_cube(rule)
+    
+    def expand_recurring_bookings(self, start_date, end_date):
+        """
+        Materialize recurring occurrences for the dates in a calendar window
+        
+        Dates are expanded lazily and cached; dates that fall out of the
+        window are dropped, so memory tracks the window, not the year.
+        
+        Args:
+            start_date: First date of the window
+            end_date: Last date of the window (inclusive)
+        
+        Returns:
+            dict: {date: [occurrence dicts]} for every date in the window
+        """
+        window = {}
+        current = start_date
+        while current <= end_date:
+            if current not in self._recurring_calendar:
+                occurrences = []
+                for rule_id in self._rules_by_weekday[current.weekday()]:
+                    rule = self.recurring_rules[rule_id]
+                    if rule['start_date'] <= current and (rule['end_date'] is None or current <= rule['end_date']):
+                        occurrences.append({
+                            'rule_id': rule_id,
+                            'spot_id': rule['spot_id'],
+                            'section': rule['section'],
+                            'date': current,
+                            'start_hour': rule['start_hour'],
+                            'end_hour': rule['end_hour'],
+                            'user_id': rule['user_id']
+                        })
+                self._recurring_calendar[current] = occurrences
+            window[current] = self._recurring_calendar[current]
+            current += timedelta(days=1)
+        
+        self._recurring_calendar = window
+        return dict(window)
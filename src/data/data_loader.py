@@ -10,12 +10,16 @@ class ParkingDataLoader:
         """Initialize data loader with CSV path"""
         self.csv_path = csv_path
         self.df = None
+        self._spot_table = None
+        self._spot_index = None
         self.load_data()
     
     def load_data(self):
         """Load parking data from CSV"""
         if os.path.exists(self.csv_path):
             self.df = pd.read_csv(self.csv_path)
+            self._spot_table = None
+            self._spot_index = None
             print(f"[OK] Loaded {len(self.df)} records from parking dataset")
         else:
             raise FileNotFoundError(f"CSV file not found at {self.csv_path}")
@@ -37,14 +41,36 @@ class ParkingDataLoader:
     def get_spot_info(self, spot_id, section):
         """Get detailed information about a specific parking spot"""
         if self.df is not None:
-            spot_data = self.df[
-                (self.df['Parking_Spot_ID'] == spot_id) & 
-                (self.df['Parking_Lot_Section'] == section)
-            ]
-            if not spot_data.empty:
-                return spot_data.iloc[-1].to_dict()  # Get most recent record
+            # Index of most recent record per spot, built once from the spot table
+            if self._spot_index is None:
+                self._spot_index = {
+                    (row['Parking_Spot_ID'], row['Parking_Lot_Section']): row
+                    for row in self.get_spot_table().to_dict('records')
+                }
+            spot_data = self._spot_index.get((spot_id, section))
+            if spot_data is not None:
+                return dict(spot_data)
         return None
     
+    def get_spot_table(self):
+        """
+        Get one metadata row per (section, spot) pair
+        Uses the most recent record for each spot, same as get_spot_info
+        
+        Returns:
+            pd.DataFrame: Spot rows sorted by section and spot ID
+        """
+        if self.df is None:
+            return pd.DataFrame()
+        
+        if self._spot_table is None:
+            self._spot_table = (
+                self.df.drop_duplicates(['Parking_Lot_Section', 'Parking_Spot_ID'], keep='last')
+                .sort_values(['Parking_Lot_Section', 'Parking_Spot_ID'])
+                .reset_index(drop=True)
+            )
+        return self._spot_table
+    
     def get_section_statistics(self, section):
         """Get statistics for a parking section"""
         if self.df is not None:
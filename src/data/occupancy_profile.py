@@ -0,0 +1,147 @@
+"""
+Occupancy Profile Module
+Historical occupancy rates per section, weekday and hour
+Built from the stay intervals in the parking dataset with a vectorized
+sweep-line (difference array + cumulative sum) over the week
+"""
+import numpy as np
+import pandas as pd
+
+HOURS_PER_WEEK = 7 * 24
+
+# Weight of the section's all-week curve for that hour against a single weekday's counts
+PROFILE_SHRINKAGE = 2.0
+
+
+def stay_counts(section_codes, days, entry_hours, durations, n_sections):
+    """
+    Count overlapping stays per (section, weekday, hour)
+
+    Each stay adds +1 at its start hour and -1 at its end hour on a weekly
+    timeline; a cumulative sum then gives the number of parked cars in
+    every hour. Stays running past Sunday midnight wrap to Monday.
+
+    Args:
+        section_codes: int section index per stay
+        days: int weekday of arrival per stay (0=Monday)
+        entry_hours: Arrival hour per stay (fractions round down)
+        durations: Stay length in hours (fractions round up, at least 1)
+        n_sections: Number of sections
+
+    Returns:
+        np.ndarray: int (n_sections, 7, 24) counts
+    """
+    starts = np.asarray(days, dtype=np.int64) * 24 + np.floor(entry_hours).astype(np.int64)
+    lengths = np.clip(np.ceil(durations).astype(np.int64), 1, HOURS_PER_WEEK)
+    ends = starts + lengths
+
+    # Timeline long enough for the latest end, folded back onto one week afterwards
+    n_weeks = int(np.ceil((ends.max() + 1) / HOURS_PER_WEEK)) if len(ends) else 1
+    diff = np.zeros((n_sections, n_weeks * HOURS_PER_WEEK + 1), dtype=np.int64)
+    np.add.at(diff, (section_codes, starts), 1)
+    np.add.at(diff, (section_codes, ends), -1)
+
+    timeline = np.cumsum(diff[:, :-1], axis=1)
+    week = timeline.reshape(n_sections, n_weeks, HOURS_PER_WEEK).sum(axis=1)
+    return week.reshape(n_sections, 7, 24)
+
+
+class OccupancyProfile:
+    """
+    Dense occupancy rate lookups in a (sections, 7, 24) array
+
+    The sweep-line counts give the shape of each section's week; they are
+    scaled so the section's average matches its observed occupied share,
+    since the dataset is a sample of stays rather than a full log.
+    """
+
+    def __init__(self, sections, rates):
+        """
+        Args:
+            sections: Section names along the first axis
+            rates: float (sections, 7, 24) occupancy rates in [0, 1]
+        """
+        self.sections = list(sections)
+        self.rates = np.asarray(rates, dtype=np.float64)
+        self.daily_rates = self.rates.mean(axis=1)
+        self._section_index = {section: i for i, section in enumerate(self.sections)}
+
+    def rate(self, section, hour, day_of_week=None):
+        """
+        Historical occupancy rate
+
+        Args:
+            section: Parking section
+            hour: Hour of day (0-23)
+            day_of_week: Day index (0=Monday), or None for the average over all days
+
+        Returns:
+            float or None: Rate, None for an unknown section
+        """
+        section_idx = self._section_index.get(section)
+        if section_idx is None:
+            return None
+        if day_of_week is None:
+            return float(self.daily_rates[section_idx, hour])
+        return float(self.rates[section_idx, day_of_week, hour])
+
+    def hourly_curve(self, section, day_of_week=None):
+        """
+        24-hour occupancy curve for a section
+
+        Returns:
+            np.ndarray or None: float (24,) rates
+        """
+        section_idx = self._section_index.get(section)
+        if section_idx is None:
+            return None
+        if day_of_week is None:
+            return self.daily_rates[section_idx]
+        return self.rates[section_idx, day_of_week]
+
+
+def build_occupancy_profile(df):
+    """
+    Compute occupancy rates from the raw parking dataset
+
+    Stay length is Parking_Duration, or Exit_Time - Entry_Time (wrapping
+    past midnight) where the duration is missing. df is never modified.
+
+    Args:
+        df: DataFrame with Parking_Lot_Section, Timestamp, Entry_Time,
+            Exit_Time, Parking_Duration, Occupancy_Status
+
+    Returns:
+        OccupancyProfile
+    """
+    sections = sorted(df['Parking_Lot_Section'].dropna().unique())
+    section_codes = pd.Categorical(df['Parking_Lot_Section'], categories=sections).codes
+    days = pd.to_datetime(df['Timestamp'], errors='coerce').dt.dayofweek.to_numpy()
+    entry_hours = df['Entry_Time'].to_numpy(dtype=np.float64)
+    durations = df['Parking_Duration'].to_numpy(dtype=np.float64)
+    exit_hours = df['Exit_Time'].to_numpy(dtype=np.float64)
+    durations = np.where(np.isnan(durations), (exit_hours - entry_hours) % 24, durations)
+
+    valid = (section_codes >= 0) & ~np.isnan(days) & ~np.isnan(entry_hours) & ~np.isnan(durations)
+    counts = stay_counts(
+        section_codes[valid], days[valid].astype(np.int64),
+        entry_hours[valid], durations[valid], len(sections)
+    ).astype(np.float64)
+
+    # Sparse weekday cells lean on the section's curve for that hour over the whole week
+    hour_means = counts.mean(axis=1, keepdims=True)
+    smoothed = (counts + PROFILE_SHRINKAGE * hour_means) / (1.0 + PROFILE_SHRINKAGE)
+
+    # Relative load (1.0 = the section's average hour), scaled to its observed occupied share
+    occupied = (df['Occupancy_Status'] == 'Occupied').to_numpy(dtype=np.float64)
+    section_counts = np.bincount(section_codes[section_codes >= 0], minlength=len(sections))
+    occupied_share = np.bincount(
+        section_codes[section_codes >= 0], weights=occupied[section_codes >= 0], minlength=len(sections)
+    ) / np.maximum(section_counts, 1)
+
+    average_load = smoothed.mean(axis=(1, 2), keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        relative_load = np.where(average_load > 0, smoothed / average_load, 1.0)
+    rates = np.clip(occupied_share[:, None, None] * relative_load, 0.0, 1.0)
+
+    return OccupancyProfile(sections, rates)
@@ -0,0 +1,311 @@
+"""
+User Profile Store Module
+Per-user vehicle and parking-history profiles for personalized predictions
+Profiles live in a SQLite table with an in-memory LRU in front of it; users
+without a profile get the defaults of their vehicle type
+"""
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+DEFAULT_DB_PATH = os.path.join('resources', 'user_profiles.db')
+
+# Profile fields, named like the dataset columns the model was trained on
+PROFILE_FIELDS = ['Vehicle_Type_Weight', 'Vehicle_Type_Height', 'User_Parking_History']
+
+# App vehicle types -> dataset Vehicle_Type categories (defaults are kept per category)
+DATASET_VEHICLE_TYPES = {
+    'Sedan': 'Car', 'SUV': 'Car', 'Truck': 'Car', 'Car': 'Car',
+    'Motorcycle': 'Motorcycle', 'Electric Vehicle': 'Electric Vehicle'
+}
+
+# Used when neither the user nor the dataset says anything about a vehicle type
+FALLBACK_PROFILE = {'Vehicle_Type_Weight': 1500.0, 'Vehicle_Type_Height': 4.0, 'User_Parking_History': 5.0}
+
+# User_Parking_History is an opaque score in the dataset (about -1.8 to 11.7,
+# mean 5.1), so bookings are mapped onto it as a bounded running estimate:
+# each completed booking closes HISTORY_RATE of the gap to a high-but-typical
+# target, and values are clipped to the training range
+HISTORY_RATE = 0.1
+HISTORY_TARGET_QUANTILE = 0.95
+
+# (low, high, target) used when the dataset can't provide them
+FALLBACK_HISTORY_BOUNDS = (0.0, 10.0, 8.5)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_profiles (
+    user_id TEXT PRIMARY KEY,
+    vehicle_type TEXT,
+    vehicle_weight REAL,
+    vehicle_height REAL,
+    parking_history REAL,
+    bookings INTEGER NOT NULL DEFAULT 0,
+    booked_hours REAL NOT NULL DEFAULT 0,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS vehicle_defaults (
+    vehicle_type TEXT PRIMARY KEY,
+    vehicle_weight REAL,
+    vehicle_height REAL,
+    parking_history REAL
+);
+CREATE TABLE IF NOT EXISTS history_bounds (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    low REAL,
+    high REAL,
+    target REAL
+);
+"""
+
+
+def build_vehicle_defaults(df):
+    """
+    Median profile values per dataset vehicle type
+
+    Args:
+        df: DataFrame with Vehicle_Type and PROFILE_FIELDS columns (not modified)
+
+    Returns:
+        dict: {vehicle_type: {field: value}}
+    """
+    medians = df.groupby('Vehicle_Type')[PROFILE_FIELDS].median()
+    return {
+        vehicle_type: {field: float(row[field]) for field in PROFILE_FIELDS}
+        for vehicle_type, row in medians.iterrows()
+    }
+
+
+def build_history_bounds(df):
+    """
+    Training range of User_Parking_History and the running estimate's target
+
+    Returns:
+        tuple: (low, high, target)
+    """
+    history = df['User_Parking_History'].dropna()
+    return (
+        float(history.min()),
+        float(history.max()),
+        float(history.quantile(HISTORY_TARGET_QUANTILE))
+    )
+
+
+def vehicle_default_profile(vehicle_defaults, vehicle_type='Sedan'):
+    """
+    Profile of a user with no history, from per-vehicle-type defaults
+
+    Args:
+        vehicle_defaults: {dataset vehicle type: {field: value}} (see build_vehicle_defaults)
+        vehicle_type: App or dataset vehicle type
+
+    Returns:
+        dict: PROFILE_FIELDS values plus 'source' = 'vehicle_default'
+    """
+    dataset_type = DATASET_VEHICLE_TYPES.get(vehicle_type, 'Car')
+    profile = dict(vehicle_defaults.get(dataset_type, FALLBACK_PROFILE))
+    profile['source'] = 'vehicle_default'
+    return profile
+
+
+class UserProfileStore:
+    """
+    SQLite-backed user profiles with an LRU cache
+
+    Reads hit the LRU first, so a warm lookup is one dict access; the
+    SQLite table is only read on a cache miss and written on updates
+    (write-through, so both always agree).
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, cache_size=1024, data_loader=None):
+        """
+        Args:
+            db_path: SQLite file (':memory:' for a throwaway store)
+            cache_size: Profiles kept in memory
+            data_loader: ParkingDataLoader used to (re)build vehicle defaults
+        """
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        # Re-entrant: updates hold it across their read-modify-write
+        self._lock = threading.RLock()
+
+        if db_path != ':memory:':
+            os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+        if data_loader is not None and data_loader.df is not None:
+            self._save_vehicle_defaults(build_vehicle_defaults(data_loader.df))
+            self._save_history_bounds(build_history_bounds(data_loader.df))
+        self.vehicle_defaults = self._load_vehicle_defaults()
+        self.history_bounds = self._load_history_bounds()
+
+    def _save_vehicle_defaults(self, defaults):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO vehicle_defaults VALUES (?, ?, ?, ?)",
+                [
+                    (vehicle_type, values['Vehicle_Type_Weight'], values['Vehicle_Type_Height'],
+                     values['User_Parking_History'])
+                    for vehicle_type, values in defaults.items()
+                ]
+            )
+
+    def _load_vehicle_defaults(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM vehicle_defaults").fetchall()
+        return {row[0]: dict(zip(PROFILE_FIELDS, row[1:])) for row in rows}
+
+    def _save_history_bounds(self, bounds):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO history_bounds VALUES (1, ?, ?, ?)", bounds)
+
+    def _load_history_bounds(self):
+        with self._lock:
+            row = self._conn.execute("SELECT low, high, target FROM history_bounds WHERE id = 1").fetchone()
+        return tuple(row) if row else FALLBACK_HISTORY_BOUNDS
+
+    def default_profile(self, vehicle_type='Sedan'):
+        """
+        Profile for a user with no history
+
+        Returns:
+            dict: PROFILE_FIELDS values for the vehicle type, 'source' = 'vehicle_default'
+        """
+        return vehicle_default_profile(self.vehicle_defaults, vehicle_type)
+
+    def _clip_history(self, history):
+        low, high, _ = self.history_bounds
+        return min(max(history, low), high)
+
+    def _cached_row(self, user_id):
+        """Stored row for a user (LRU, then SQLite); None if the user has none"""
+        with self._lock:
+            if user_id in self._cache:
+                self._cache.move_to_end(user_id)
+                return self._cache[user_id]
+
+            row = self._conn.execute(
+                "SELECT vehicle_type, vehicle_weight, vehicle_height, parking_history, bookings, booked_hours "
+                "FROM user_profiles WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            # Unknown users are cached too, so they don't hit SQLite on every request
+            self._remember(user_id, row)
+            return row
+
+    def _remember(self, user_id, row):
+        self._cache[user_id] = row
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def get_profile(self, user_id, vehicle_type='Sedan'):
+        """
+        Profile values for a user
+
+        Fields the user has no value for come from the vehicle type defaults.
+
+        Args:
+            user_id: User identifier
+            vehicle_type: Vehicle the user is booking with
+
+        Returns:
+            dict: PROFILE_FIELDS values plus 'source' ('user' or 'vehicle_default')
+        """
+        profile = self.default_profile(vehicle_type)
+        row = self._cached_row(user_id) if user_id is not None else None
+        if row is None:
+            return profile
+
+        stored_type, weight, height, history = row[:4]
+        # Vehicle specs only apply while the user books with the same vehicle type
+        if stored_type == vehicle_type:
+            if weight is not None:
+                profile['Vehicle_Type_Weight'] = weight
+            if height is not None:
+                profile['Vehicle_Type_Height'] = height
+        if history is not None:
+            # Stored values from before the running estimate may be out of range
+            profile['User_Parking_History'] = self._clip_history(history)
+        profile['source'] = 'user'
+        return profile
+
+    def record_booking(self, user_id, vehicle_type=None, hours=1):
+        """
+        Update a profile after a completed booking (creates it if needed)
+
+        Call once per booking when it completes. User_Parking_History moves
+        HISTORY_RATE of the way towards the target, so it stays inside the
+        range the model was trained on however many bookings a user makes.
+
+        Args:
+            user_id: User identifier
+            vehicle_type: Vehicle used (keeps the stored one if None)
+            hours: Length of the booking in hours
+        """
+        with self._lock:
+            row = self._cached_row(user_id)
+            if row is None:
+                base = self.default_profile(vehicle_type or 'Sedan')
+                row = (vehicle_type, None, None, base['User_Parking_History'], 0, 0.0)
+
+            stored_type, weight, height, history, bookings, booked_hours = row
+            if vehicle_type is not None and vehicle_type != stored_type:
+                # New vehicle: its specs are unknown again
+                stored_type, weight, height = vehicle_type, None, None
+            _, _, target = self.history_bounds
+            history = self._clip_history(history + HISTORY_RATE * (target - history))
+            updated = (stored_type, weight, height, history, bookings + 1, booked_hours + hours)
+            self._write(user_id, updated)
+
+    def set_vehicle(self, user_id, vehicle_type, weight=None, height=None):
+        """Store a user's vehicle and (optionally) its measured specs"""
+        with self._lock:
+            row = self._cached_row(user_id)
+            history, bookings, booked_hours = (None, 0, 0.0) if row is None else row[3:]
+            if history is None:
+                history = self.default_profile(vehicle_type)['User_Parking_History']
+            self._write(user_id, (vehicle_type, weight, height, history, bookings, booked_hours))
+
+    def _write(self, user_id, row):
+        """Write-through update of SQLite and the LRU"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO user_profiles VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (user_id, *row, datetime.now().isoformat(timespec='seconds'))
+                )
+            self._remember(user_id, row)
+
+    def close(self):
+        """Close the SQLite connection"""
+        with self._lock:
+            self._conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_user_profile_store(data_loader=None, db_path=DEFAULT_DB_PATH):
+    """
+    Get the process-wide UserProfileStore
+
+    Args:
+        data_loader: ParkingDataLoader for vehicle defaults (first call only)
+        db_path: SQLite file (first call only)
+
+    Returns:
+        UserProfileStore or None if the database can't be opened
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                try:
+                    _store = UserProfileStore(db_path=db_path, data_loader=data_loader)
+                except Exception as e:
+                    print(f"[ERROR] User profile store unavailable: {e}")
+    return _store
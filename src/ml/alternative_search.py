@@ -0,0 +1,158 @@
+"""
+Alternative Search Module
+Lot-wide top-k search for the best available spots
+Scores candidates in batches, keeps a bounded heap of the k best and skips
+sections (and the rest of a section) that cannot beat the current k-th best
+"""
+import heapq
+import numpy as np
+
+# Score multiplier for spots whose size doesn't suit the vehicle
+INCOMPATIBLE_PENALTY = 0.5
+
+# Headroom over a section's expected vacancy (1 - forecast occupancy) for
+# spots without a table score: individual spots beat the section average
+OCCUPANCY_BOUND_MARGIN = 0.25
+
+# Headroom over a table score when the live prediction can differ from it
+# (weather forecast, traffic drift or a stored user profile)
+LIVE_CONTEXT_MARGIN = 0.1
+
+
+def _spot_score(probability_vacant, size_compatible):
+    """Ranking score: availability confidence, halved for a size mismatch"""
+    return probability_vacant * (1.0 if size_compatible else INCOMPATIBLE_PENALTY)
+
+
+def _section_bound(predictor, booking_system, section, hour, day_of_week):
+    """
+    Estimated best probability_vacant in a section
+
+    1 - the section's occupancy rate (section forecaster, else the booking
+    cube) plus OCCUPANCY_BOUND_MARGIN, capped at 1.
+
+    Returns:
+        float: Bound in [0, 1]
+    """
+    occupancy = None
+    forecaster = getattr(predictor, 'section_forecaster', None)
+    if forecaster is not None:
+        occupancy = forecaster.occupancy(section, day_of_week, hour)
+    if occupancy is None:
+        occupancy = booking_system.get_section_occupancy(section, hour, day_of_week)['occupancy_percentage'] / 100
+    return min(1.0, 1.0 - occupancy + OCCUPANCY_BOUND_MARGIN)
+
+
+def find_top_alternatives(predictor, booking_system, booking_datetime, vehicle_type='Sedan',
+                          is_ev=False, k=3, exclude=None, batch_size=32, user_id=None):
+    """
+    Find the k best available spots across every section
+
+    A spot's bound is its precomputed availability table score times the
+    size penalty, known without inference. The table score is exact for
+    historical context; under a weather forecast, traffic drift or a
+    stored user profile it gets LIVE_CONTEXT_MARGIN of headroom, and spots
+    the table can't answer get their section's occupancy-based bound (see
+    _section_bound). Sections with no free spots are skipped outright.
+    Sections and the spots within them are visited in decreasing bound
+    order, so the search stops as soon as the next bound can't beat the
+    k-th best score. Estimated bounds make the search approximate: a spot
+    far above its section's expected vacancy can be missed.
+
+    Args:
+        predictor: Loaded PrebookingPredictor
+        booking_system: BookingSystem for current availability
+        booking_datetime: Datetime of the booking
+        vehicle_type: Vehicle type from user
+        is_ev: Electric vehicle flag
+        k: Number of spots to return
+        exclude: (spot_id, section) to leave out, e.g. the current selection
+        batch_size: Candidates scored per predict_many call
+        user_id: User whose profile personalizes the predictions
+
+    Returns:
+        list: Up to k dicts (spot_id, section, probability_vacant,
+              size_compatible, proximity, score), best first
+    """
+    hour = booking_datetime.hour
+    day_of_week = booking_datetime.weekday()
+    data_loader = predictor.data_loader
+
+    # Table scores are exact unless the live prediction uses other inputs
+    personalized = predictor._user_profile(user_id, vehicle_type).get('source') == 'user'
+    table_margin = (
+        LIVE_CONTEXT_MARGIN
+        if personalized or predictor._has_live_context(booking_datetime.month, day_of_week, hour)
+        else 0.0
+    )
+
+    # Candidate spots and their upper bounds, per section
+    section_candidates = []
+    for section in booking_system.cube_sections:
+        spot_ids = [
+            spot_id for spot_id in booking_system.get_available_spots_in_section(section, hour, day_of_week)
+            if (spot_id, section) != exclude
+        ]
+        if not spot_ids:
+            continue
+
+        bounds = predictor.precomputed_probabilities(
+            spot_ids, section, booking_datetime, vehicle_type, is_ev, ignore_live_context=True
+        )
+        section_bound = _section_bound(predictor, booking_system, section, hour, day_of_week)
+        bounds = np.where(np.isnan(bounds), section_bound, np.minimum(1.0, bounds + table_margin))
+        compatible = [
+            predictor._is_size_compatible(
+                vehicle_type, data_loader.get_spot_info(spot_id, section) if data_loader else None
+            )
+            for spot_id in spot_ids
+        ]
+        bounds = bounds * np.where(compatible, 1.0, INCOMPATIBLE_PENALTY)
+        order = np.argsort(-bounds, kind='stable')
+        section_candidates.append((
+            float(bounds[order[0]]), section,
+            [spot_ids[i] for i in order], bounds[order]
+        ))
+
+    section_candidates.sort(key=lambda candidate: -candidate[0])
+
+    heap = []  # min-heap of (score, -proximity, tiebreak, result)
+    counter = 0
+
+    for section_bound, section, spot_ids, bounds in section_candidates:
+        if len(heap) == k and section_bound <= heap[0][0]:
+            break  # every remaining section has a lower bound
+
+        for start in range(0, len(spot_ids), batch_size):
+            if len(heap) == k and bounds[start] <= heap[0][0]:
+                break  # rest of this section can't make the top k
+
+            batch = spot_ids[start:start + batch_size]
+            scores = predictor.predict_many(
+                batch, section, booking_datetime,
+                vehicle_types=vehicle_type, is_ev=is_ev, user_id=user_id
+            )
+
+            for spot_id, row in zip(batch, scores):
+                spot_info = data_loader.get_spot_info(spot_id, section) if data_loader else None
+                proximity = float(spot_info.get('Proximity_To_Exit', 10.0)) if spot_info else 10.0
+                probability_vacant = float(row['probability_vacant'])
+                size_compatible = bool(row['size_compatible'])
+                score = _spot_score(probability_vacant, size_compatible)
+
+                entry = (score, -proximity, counter, {
+                    'spot_id': int(spot_id),
+                    'section': section,
+                    'probability_vacant': probability_vacant,
+                    'size_compatible': size_compatible,
+                    'proximity': proximity,
+                    'score': score
+                })
+                counter += 1
+
+                if len(heap) < k:
+                    heapq.heappush(heap, entry)
+                elif entry[:2] > heap[0][:2]:
+                    heapq.heapreplace(heap, entry)
+
+    return [entry[3] for entry in sorted(heap, key=lambda e: (e[0], e[1]), reverse=True)]
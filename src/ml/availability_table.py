@@ -0,0 +1,159 @@
+"""
+Availability Table Module
+Precomputed probability-of-vacancy for every spot x month x weekday x hour
+x vehicle type x EV flag, so hot-path predictions are a single array lookup
+"""
+import numpy as np
+from datetime import datetime
+
+from ml.npz_mmap import load_npz
+
+TABLE_FILE = 'availability_table.npz'
+
+# Vehicle_Type categories the model actually sees (see VEHICLE_TYPE_MAP)
+TABLE_VEHICLE_TYPES = ['Car', 'Motorcycle', 'Electric Vehicle']
+
+
+class AvailabilityTable:
+    """
+    Dense lookup table of probability_vacant
+
+    Array axes: (spot, month, day of week, hour, vehicle type, EV flag).
+    Months that were not built are simply missing, so lookups for them
+    return None and the predictor falls back to live inference.
+    """
+
+    def __init__(self, sections, spot_ids, months, probabilities):
+        """
+        Args:
+            sections: Section of each spot row
+            spot_ids: Parking_Spot_ID of each spot row
+            months: Months (1-12) along the month axis
+            probabilities: float array (spots, months, 7, 24, vehicle types, 2)
+        """
+        self.sections = np.asarray(sections).astype(str)
+        self.spot_ids = np.asarray(spot_ids)
+        self.months = np.asarray(months)
+        self.probabilities = probabilities
+
+        self._spot_index = {
+            (int(spot_id), section): i
+            for i, (spot_id, section) in enumerate(zip(self.spot_ids, self.sections))
+        }
+        self._month_index = {int(month): i for i, month in enumerate(self.months)}
+        self._vehicle_index = {vehicle: i for i, vehicle in enumerate(TABLE_VEHICLE_TYPES)}
+
+    def lookup(self, spot_id, section, hour, day_of_week, vehicle_mapped, is_ev, month):
+        """
+        Look up probability_vacant for one combination
+
+        Returns:
+            float or None: Probability the spot is vacant, or None for unseen keys
+        """
+        spot_idx = self._spot_index.get((int(spot_id), section))
+        month_idx = self._month_index.get(int(month))
+        vehicle_idx = self._vehicle_index.get(vehicle_mapped)
+        if spot_idx is None or month_idx is None or vehicle_idx is None:
+            return None
+        return float(self.probabilities[spot_idx, month_idx, day_of_week, hour, vehicle_idx, int(bool(is_ev))])
+
+    def lookup_many(self, spot_ids, section, hour, day_of_week, vehicle_mapped, is_ev, month):
+        """
+        Look up probability_vacant for several spots of one section at once
+
+        Returns:
+            np.ndarray: Probabilities, NaN for spots (or months/vehicles) not in the table
+        """
+        result = np.full(len(spot_ids), np.nan)
+        month_idx = self._month_index.get(int(month))
+        vehicle_idx = self._vehicle_index.get(vehicle_mapped)
+        if month_idx is None or vehicle_idx is None:
+            return result
+
+        rows = np.array([self._spot_index.get((int(spot_id), section), -1) for spot_id in spot_ids], dtype=np.int64)
+        known = rows >= 0
+        result[known] = self.probabilities[rows[known], month_idx, day_of_week, hour, vehicle_idx, int(bool(is_ev))]
+        return result
+
+    def save(self, path):
+        """Save the table as an uncompressed .npz file (memory-mappable, see load)"""
+        np.savez(
+            path,
+            sections=self.sections,
+            spot_ids=self.spot_ids,
+            months=self.months,
+            probabilities=self.probabilities
+        )
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        """
+        Load a table saved with save()
+
+        Args:
+            path: .npz file path
+            mmap_mode: Memory-map the probabilities (e.g. 'r') so worker
+                       processes share one copy through the page cache
+
+        Returns:
+            AvailabilityTable
+        """
+        data = load_npz(path, mmap_mode=mmap_mode)
+        return cls(data['sections'], data['spot_ids'], data['months'], data['probabilities'])
+
+
+def build_availability_table(predictor, months=None):
+    """
+    Score every spot x weekday x hour x vehicle type x EV combination in bulk
+
+    Rows are scored one (month, weekday, hour) block at a time so the
+    traffic/weather/sensor context is computed once per block. Only the
+    historical traffic and weather patterns are used: the predictor skips
+    the table while a forecast or traffic drift is active, so a table
+    built during one must not keep those values.
+
+    Args:
+        predictor: Loaded PrebookingPredictor with a data_loader
+        months: Months (1-12) to build, defaults to the current month
+
+    Returns:
+        AvailabilityTable
+    """
+    if not predictor.is_loaded or predictor.data_loader is None:
+        raise ValueError("Predictor must have a loaded model and a data loader")
+
+    months = months or [datetime.now().month]
+    spot_table = predictor.data_loader.get_spot_table()
+    sections = spot_table['Parking_Lot_Section'].to_numpy()
+    spot_ids = spot_table['Parking_Spot_ID'].to_numpy()
+    spot_infos = spot_table.to_dict('records')
+
+    n_vehicles = len(TABLE_VEHICLE_TYPES)
+    probabilities = np.zeros(
+        (len(spot_ids), len(months), 7, 24, n_vehicles, 2), dtype=np.float32
+    )
+
+    # Users without a stored profile are predicted with their vehicle type's defaults
+    profiles = {vehicle_type: predictor._user_profile(None, vehicle_type) for vehicle_type in TABLE_VEHICLE_TYPES}
+
+    for m_idx, month in enumerate(months):
+        for day_of_week in range(7):
+            for hour in range(24):
+                predicted_traffic = predictor._predict_traffic_level(hour, day_of_week, historical=True)
+                weather_forecast = predictor._get_weather_forecast(hour, day_of_week, month, historical=True)
+                sensor_averages = predictor._get_historical_sensor_average(hour)
+
+                feature_rows = []
+                for spot_id, section, spot_info in zip(spot_ids, sections, spot_infos):
+                    for vehicle_type in TABLE_VEHICLE_TYPES:
+                        for is_ev in (False, True):
+                            feature_rows.append(predictor._build_prebooking_features(
+                                hour, day_of_week, month, is_ev, spot_id, section,
+                                vehicle_type, spot_info, predicted_traffic,
+                                weather_forecast, sensor_averages, profiles[vehicle_type]
+                            ))
+
+                block = predictor._score_feature_rows(feature_rows)[:, 0]
+                probabilities[:, m_idx, day_of_week, hour] = block.reshape(len(spot_ids), n_vehicles, 2)
+
+    return AvailabilityTable(sections, spot_ids, months, probabilities)
@@ -0,0 +1,148 @@
+"""
+Distillation Module
+Trains a small tree ensemble to mimic the trained model's predict_proba
+The teacher (the best model from model_proper.py) stays available for
+offline use; the student is what the app evaluates on the hot path
+"""
+import time
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor
+
+from ml.tree_export import export_tree_ensemble
+
+# Smallest share of evaluation rows where student and teacher must pick the same label
+MIN_AGREEMENT = 0.95
+
+# Student sizes tried from smallest to largest; the first one that agrees enough wins
+STUDENT_CONFIGS = [
+    {'n_estimators': 50, 'max_depth': 2, 'learning_rate': 0.2},
+    {'n_estimators': 100, 'max_depth': 3, 'learning_rate': 0.1},
+    {'n_estimators': 150, 'max_depth': 4, 'learning_rate': 0.1}
+]
+
+# Extra teacher-labelled rows drawn from the per-feature distributions,
+# so the student also matches the teacher away from the training rows
+SYNTHETIC_ROWS = 5000
+
+# Teacher probabilities are clipped before taking log-odds
+PROBABILITY_CLIP = 1e-4
+
+
+def _synthetic_rows(X, n_rows, rng):
+    """Rows whose columns are resampled independently from X"""
+    picks = rng.integers(0, len(X), size=(n_rows, X.shape[1]))
+    return X[picks, np.arange(X.shape[1])]
+
+
+def measure_latency(predict_proba, X, single_rows=200):
+    """
+    Time a predict_proba function on a batch and on single rows
+
+    Args:
+        predict_proba: Callable taking a 2D feature array
+        X: Feature rows
+        single_rows: Number of one-row calls to average
+
+    Returns:
+        dict: {'batch_ms' (whole X), 'row_us' (one-row call)}
+    """
+    X = np.asarray(X, dtype=np.float64)
+    predict_proba(X[:1])  # warm-up
+
+    started = time.perf_counter()
+    predict_proba(X)
+    batch_ms = (time.perf_counter() - started) * 1000
+
+    rows = X[np.arange(single_rows) % len(X)]
+    started = time.perf_counter()
+    for row in rows:
+        predict_proba(row[None, :])
+    row_us = (time.perf_counter() - started) / single_rows * 1e6
+
+    return {'batch_ms': batch_ms, 'row_us': row_us}
+
+
+def distill_model(teacher, X_train, X_eval, configs=None, min_agreement=MIN_AGREEMENT,
+                  synthetic_rows=SYNTHETIC_ROWS, random_state=42):
+    """
+    Distill a fitted classifier into a small exported tree ensemble
+
+    Each student is a GradientBoostingRegressor fitted to the teacher's
+    log-odds (soft targets keep the teacher's confidence, not just its
+    labels), exported with export_tree_ensemble and scored against the
+    teacher on X_eval.
+
+    Args:
+        teacher: Fitted classifier with predict_proba
+        X_train: Scaled training feature rows
+        X_eval: Scaled held-out feature rows for agreement and latency
+        configs: Student hyperparameters to try, smallest first (default STUDENT_CONFIGS)
+        min_agreement: Label agreement required to export
+        synthetic_rows: Extra teacher-labelled rows sampled from X_train
+        random_state: Seed for synthetic rows and students
+
+    Returns:
+        tuple: (TreeEnsembleEvaluator or None if no student agrees enough, report dict)
+    """
+    rng = np.random.default_rng(random_state)
+    X_train = np.asarray(X_train, dtype=np.float64)
+    X_eval = np.asarray(X_eval, dtype=np.float64)
+    X_fit = np.vstack([X_train, _synthetic_rows(X_train, synthetic_rows, rng)]) if synthetic_rows else X_train
+
+    teacher_fit = np.clip(teacher.predict_proba(X_fit)[:, 1], PROBABILITY_CLIP, 1 - PROBABILITY_CLIP)
+    targets = np.log(teacher_fit / (1 - teacher_fit))
+    teacher_eval = teacher.predict_proba(X_eval)[:, 1]
+
+    report = {
+        'min_agreement': min_agreement,
+        'teacher': measure_latency(teacher.predict_proba, X_eval),
+        'candidates': [],
+        'selected': None,
+        'passed': False
+    }
+
+    for config in (configs or STUDENT_CONFIGS):
+        student = GradientBoostingRegressor(random_state=random_state, **config)
+        student.fit(X_fit, targets)
+        evaluator = export_tree_ensemble(student)
+
+        student_eval = evaluator.predict_proba(X_eval)[:, 1]
+        candidate = {
+            'config': dict(config),
+            'nodes': int(len(evaluator.feature)),
+            'agreement': float(((student_eval > 0.5) == (teacher_eval > 0.5)).mean()),
+            'mean_abs_diff': float(np.abs(student_eval - teacher_eval).mean()),
+            'latency': measure_latency(evaluator.predict_proba, X_eval)
+        }
+        report['candidates'].append(candidate)
+
+        if candidate['agreement'] >= min_agreement:
+            report['selected'] = len(report['candidates']) - 1
+            report['passed'] = True
+            return evaluator, report
+
+    return None, report
+
+
+def format_report(report):
+    """
+    Render a distillation report as printable lines
+
+    Returns:
+        list: Lines (teacher first, then each student)
+    """
+    teacher = report['teacher']
+    lines = [
+        f"{'model':<28} {'agreement':>9} {'mean|dp|':>9} {'batch ms':>9} {'row us':>9}",
+        f"{'teacher':<28} {'-':>9} {'-':>9} {teacher['batch_ms']:>9.2f} {teacher['row_us']:>9.1f}"
+    ]
+    for i, candidate in enumerate(report['candidates']):
+        config = candidate['config']
+        name = f"student d{config['max_depth']} x{config['n_estimators']}"
+        if i == report['selected']:
+            name += " (selected)"
+        lines.append(
+            f"{name:<28} {candidate['agreement'] * 100:>8.1f}% {candidate['mean_abs_diff']:>9.3f} "
+            f"{candidate['latency']['batch_ms']:>9.2f} {candidate['latency']['row_us']:>9.1f}"
+        )
+    return lines
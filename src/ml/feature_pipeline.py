@@ -0,0 +1,157 @@
+"""
+Compiled Feature Pipeline Module
+Turns raw prediction inputs into the model's scaled feature matrix without pandas
+Built once at model load from feature_columns, label_encoders and scaler,
+or loaded from feature_pipeline.npz so serving does not need sklearn pickles
+"""
+import threading
+import numpy as np
+
+# Peak (2) / moderate (1) / off-peak (0) hours, also used for training (training_pipeline.engineer_features)
+HOUR_PATTERN = np.array(
+    [2 if 8 <= h <= 10 or 17 <= h <= 19 else 1 if 11 <= h <= 16 else 0 for h in range(24)],
+    dtype=np.float64
+)
+
+
+class CompiledFeaturePipeline:
+    """
+    Precompiled replacement for "build dict -> DataFrame -> reorder -> StandardScaler"
+
+    - LabelEncoders become plain category -> code dicts
+    - sin/cos and pattern features come from 24-hour / 7-day tables
+    - scaler mean/scale are NumPy arrays in feature_columns order
+
+    Input rows use the raw dataset column names (Hour, DayOfWeek,
+    Parking_Lot_Section, Vehicle_Type, Nearby_Traffic_Level, ...); the
+    engineered columns are derived here. Scaling is done in float64 and
+    written into a preallocated float32 buffer, which is the dtype tree
+    models evaluate in anyway.
+    """
+
+    def __init__(self, feature_columns, categories, mean=None, scale=None):
+        """
+        Args:
+            feature_columns: Ordered feature names the model was trained on
+            categories: {column: classes in encoded order} (LabelEncoder.classes_)
+            mean: Scaler mean per feature (default 0)
+            scale: Scaler scale per feature (default 1)
+        """
+        self.feature_columns = list(feature_columns)
+        self.n_features = len(self.feature_columns)
+
+        self.categories = {column: [str(c) for c in classes] for column, classes in categories.items()}
+        self.category_codes = {
+            column: {category: code for code, category in enumerate(classes)}
+            for column, classes in self.categories.items()
+        }
+
+        hours = np.arange(24)
+        days = np.arange(7)
+        self.tables = {
+            'Hour_sin': np.sin(2 * np.pi * hours / 24),
+            'Hour_cos': np.cos(2 * np.pi * hours / 24),
+            'Hour_Pattern': HOUR_PATTERN,
+            'DayOfWeek_sin': np.sin(2 * np.pi * days / 7),
+            'DayOfWeek_cos': np.cos(2 * np.pi * days / 7),
+            'IsWeekend': (days >= 5).astype(np.float64),
+            'DayOfWeek_Pattern': (days < 5).astype(np.float64)
+        }
+
+        self.mean = np.zeros(self.n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+        self.scale = np.ones(self.n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+
+        self._local = threading.local()
+
+    @classmethod
+    def from_fitted(cls, feature_columns, label_encoders, scaler):
+        """
+        Compile from the objects saved by model_proper.py
+
+        Args:
+            feature_columns: Ordered feature names the model was trained on
+            label_encoders: {column: fitted LabelEncoder}
+            scaler: Fitted StandardScaler
+        """
+        categories = {column: list(encoder.classes_) for column, encoder in label_encoders.items()}
+        return cls(feature_columns, categories,
+                   getattr(scaler, 'mean_', None), getattr(scaler, 'scale_', None))
+
+    def save(self, path):
+        """Save columns, category tables and scaler parameters as an .npz file"""
+        arrays = {
+            'feature_columns': np.array(self.feature_columns, dtype=str),
+            'mean': self.mean,
+            'scale': self.scale
+        }
+        for column, classes in self.categories.items():
+            arrays[f'categories__{column}'] = np.array(classes, dtype=str)
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Load a pipeline saved with save()"""
+        with np.load(path) as data:
+            categories = {
+                key[len('categories__'):]: data[key].tolist()
+                for key in data.files if key.startswith('categories__')
+            }
+            return cls(data['feature_columns'].tolist(), categories, data['mean'], data['scale'])
+
+    def _buffer(self, n_rows):
+        """Per-thread preallocated float32 output buffer with at least n_rows rows"""
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None or buffer.shape[0] < n_rows:
+            buffer = np.empty((max(n_rows, 64), self.n_features), dtype=np.float32)
+            self._local.buffer = buffer
+        return buffer[:n_rows]
+
+    def encode(self, column, values):
+        """
+        Encode category values with the precomputed lookup table
+
+        Raises:
+            ValueError: For a category the encoder never saw (same as LabelEncoder)
+        """
+        codes = self.category_codes[column]
+        try:
+            return np.array([codes[value] for value in values], dtype=np.float64)
+        except KeyError as e:
+            raise ValueError(f"y contains previously unseen labels: {e}") from None
+
+    def transform(self, rows, out=None):
+        """
+        Build the scaled feature matrix for a list of raw input rows
+
+        Args:
+            rows: List of dicts keyed by raw input column names
+            out: Optional float32 array (len(rows), n_features) to write into;
+                 defaults to this thread's reusable buffer, so consume the
+                 result before the next transform() call on the same thread
+
+        Returns:
+            np.ndarray: float32 matrix in feature_columns order
+        """
+        n = len(rows)
+        if out is None:
+            out = self._buffer(n)
+
+        hours = np.array([row['Hour'] for row in rows], dtype=np.int64)
+        days = np.array([row['DayOfWeek'] for row in rows], dtype=np.int64)
+
+        for j, name in enumerate(self.feature_columns):
+            if name in self.tables:
+                values = self.tables[name][days if name.startswith(('DayOfWeek', 'IsWeekend')) else hours]
+            elif name.endswith('_encoded'):
+                column = name[:-len('_encoded')]
+                values = self.encode(column, [row[column] for row in rows])
+            elif name == 'Hour':
+                values = hours
+            elif name == 'DayOfWeek':
+                values = days
+            else:
+                values = np.array([row[name] for row in rows], dtype=np.float64)
+
+            out[:, j] = (values - self.mean[j]) / self.scale[j]
+
+        return out
@@ -0,0 +1,139 @@
+"""
+Latency Budget Module
+Runs live predictions against a deadline
+A call that misses its budget is answered with a fallback (cached or
+precomputed result) and keeps running on the worker pool, so its result
+lands in the prediction cache for the next request
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import numpy as np
+
+# Seconds the page waits for a live prediction before serving the fallback
+DEFAULT_BUDGET_SECONDS = 0.3
+
+# Recent request latencies kept for percentile reporting
+LATENCY_WINDOW = 1000
+
+
+class LatencyBudget:
+    """
+    Deadline-bounded execution on a shared worker pool
+
+    Identical requests already in flight are joined rather than started
+    again, so a stalled model doesn't pile up duplicate work on every rerun.
+    """
+
+    def __init__(self, budget_seconds=DEFAULT_BUDGET_SECONDS, max_workers=4):
+        """
+        Args:
+            budget_seconds: Default deadline per request
+            max_workers: Worker threads for live calls
+        """
+        self.budget_seconds = budget_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="live-predict")
+        self._in_flight = {}
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self.timeouts = 0
+        self.errors = 0
+
+    def run(self, key, live_fn, fallback_fn, budget_seconds=None):
+        """
+        Return live_fn() if it finishes within the budget, else fallback_fn()
+
+        Args:
+            key: Hashable identity of the request (joins identical in-flight calls)
+            live_fn: Callable producing the live result dict
+            fallback_fn: Callable producing a cheap result dict; must not block
+            budget_seconds: Deadline for this request (default: self.budget_seconds)
+
+        Returns:
+            dict: Live result, or fallback result with 'fallback' = True and
+                  'fallback_reason' ('timeout' or 'error')
+        """
+        budget = self.budget_seconds if budget_seconds is None else budget_seconds
+        started = time.monotonic()
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            started_call = future is None
+            if started_call:
+                future = self._executor.submit(live_fn)
+                self._in_flight[key] = future
+        if started_call:
+            # Outside the lock: an already finished future runs the callback right here
+            future.add_done_callback(lambda done, key=key: self._finished(key, done))
+
+        try:
+            result = future.result(timeout=max(0.0, budget - (time.monotonic() - started)))
+        except TimeoutError:
+            # The live call keeps going and fills the cache for the next request
+            with self._lock:
+                self.timeouts += 1
+            result = self._fallback(fallback_fn, 'timeout')
+        except Exception as e:
+            print(f"[ERROR] Live prediction failed, serving fallback: {e}")
+            with self._lock:
+                self.errors += 1
+            result = self._fallback(fallback_fn, 'error')
+
+        with self._lock:
+            self._latencies.append(time.monotonic() - started)
+        return result
+
+    def _finished(self, key, future):
+        """Forget a completed call so the next request starts a fresh one"""
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    @staticmethod
+    def _fallback(fallback_fn, reason):
+        result = dict(fallback_fn())
+        result['fallback'] = True
+        result['fallback_reason'] = reason
+        return result
+
+    def stats(self):
+        """
+        Get latency counters over the recent window
+
+        Returns:
+            dict: {'requests', 'timeouts', 'errors', 'p50_ms', 'p99_ms'}
+        """
+        with self._lock:
+            latencies = np.array(self._latencies)
+            timeouts, errors = self.timeouts, self.errors
+        if len(latencies) == 0:
+            return {'requests': 0, 'timeouts': timeouts, 'errors': errors, 'p50_ms': 0.0, 'p99_ms': 0.0}
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+        return {
+            'requests': len(latencies),
+            'timeouts': timeouts,
+            'errors': errors,
+            'p50_ms': float(p50),
+            'p99_ms': float(p99)
+        }
+
+
+_budget = None
+_budget_lock = threading.Lock()
+
+
+def get_latency_budget():
+    """
+    Get the process-wide LatencyBudget
+
+    Returns:
+        LatencyBudget
+    """
+    global _budget
+    if _budget is None:
+        with _budget_lock:
+            if _budget is None:
+                _budget = LatencyBudget()
+    return _budget
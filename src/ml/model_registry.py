@@ -0,0 +1,347 @@
+"""
+Model Registry Module
+Process-wide store of loaded prediction models
+Each model version is loaded once and shared by every Streamlit session;
+new versions published by model_proper.py are loaded, warmed and swapped
+in the background without a restart
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from ml.predictor_prebooking import PrebookingPredictor
+from ml.model_versions import manifest_path, resolve_model_path, prune_versions, write_lease
+
+# Smoke batch used to warm a freshly loaded version before it goes live
+WARMUP_HOURS = [8, 12, 17]
+WARMUP_SPOTS = 20
+
+
+class PredictorHandle:
+    """
+    Lightweight per-session reference to a shared predictor
+
+    Holds only the registry and model directory, so storing it in
+    st.session_state costs nothing. Attribute access is forwarded to the
+    predictor currently live for that directory; use acquire() to pin one
+    version for the duration of a request.
+    """
+
+    def __init__(self, registry, model_dir, data_loader=None):
+        self._registry = registry
+        self._model_dir = model_dir
+        self._data_loader = data_loader
+
+    @property
+    def predictor(self):
+        """Live PrebookingPredictor for this handle's model directory"""
+        return self._registry.get_predictor(self._model_dir, self._data_loader)
+
+    def acquire(self):
+        """Pin the live version (context manager yielding the predictor)"""
+        return self._registry.acquire(self._model_dir, self._data_loader)
+
+    def __getattr__(self, name):
+        return getattr(self.predictor, name)
+
+
+class _LoadedVersion:
+    """One loaded model version plus the number of requests using it"""
+
+    def __init__(self, version, predictor):
+        self.version = version
+        self.predictor = predictor
+        self.refcount = 0
+
+
+class ModelRegistry:
+    """
+    Loads each model version once per process
+
+    Model arrays are loaded with mmap_mode='r' (joblib for the pickles,
+    npz_mmap for the tree export and availability table), so they are
+    backed by the OS page cache and shared between worker processes
+    instead of being copied into each one.
+
+    Swapping versions only replaces the live pointer. Requests already
+    holding the old version (see acquire) finish on it; it is dropped, and
+    old version directories are pruned on disk, once nothing uses it.
+    The versions a process holds are recorded in a lease file, so pruning
+    from another process (e.g. model_proper.py) skips them too.
+    """
+
+    def __init__(self, mmap_mode='r', keep_versions=3):
+        """
+        Args:
+            mmap_mode: Memory-map mode for model arrays (None to disable)
+            keep_versions: Newest versions kept on disk when pruning
+        """
+        self.mmap_mode = mmap_mode
+        self.keep_versions = keep_versions
+        self._live = {}
+        self._retired = {}
+        self._data_loaders = {}
+        self._load_locks = {}
+        self._preloading = set()
+        self._watchers = {}
+        self._lock = threading.Lock()
+
+    def _key(self, model_dir):
+        return os.path.abspath(model_dir)
+
+    def _load_version(self, model_dir, data_loader):
+        """Load the manifest's current version (not yet live)"""
+        version, path = resolve_model_path(model_dir)
+        predictor = PrebookingPredictor(
+            model_dir=path,
+            data_loader=data_loader,
+            mmap_mode=self.mmap_mode
+        )
+        return _LoadedVersion(version, predictor)
+
+    def _live_entry(self, model_dir, data_loader=None):
+        """Get the live version, loading it on first use"""
+        key = self._key(model_dir)
+        entry = self._live.get(key)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+            if data_loader is not None:
+                self._data_loaders.setdefault(key, data_loader)
+
+        # Only one thread loads a given directory; the others wait for it
+        with load_lock:
+            entry = self._live.get(key)
+            if entry is None:
+                entry = self._load_version(model_dir, self._data_loaders.get(key))
+                self._live[key] = entry
+                self._update_lease(model_dir)
+        return entry
+
+    def get_predictor(self, model_dir='models', data_loader=None):
+        """
+        Get the live predictor for a model directory, loading it on first use
+
+        Args:
+            model_dir: Root model directory (versioned or flat)
+            data_loader: ParkingDataLoader used for pattern learning on first load
+
+        Returns:
+            PrebookingPredictor
+        """
+        return self._live_entry(model_dir, data_loader).predictor
+
+    @contextmanager
+    def acquire(self, model_dir='models', data_loader=None):
+        """
+        Pin the live version for the duration of a request
+
+        Usage:
+            with registry.acquire('models') as predictor:
+                predictor.predict_many(...)
+        """
+        entry = self._live_entry(model_dir, data_loader)
+        with self._lock:
+            # Re-read under the lock so a concurrent swap can't hand out a retired version
+            entry = self._live.get(self._key(model_dir), entry)
+            entry.refcount += 1
+
+        try:
+            yield entry.predictor
+        finally:
+            with self._lock:
+                entry.refcount -= 1
+            self._collect_retired(model_dir)
+
+    def get_handle(self, model_dir='models', data_loader=None):
+        """
+        Get a session handle without loading anything
+
+        Returns:
+            PredictorHandle
+        """
+        return PredictorHandle(self, model_dir, data_loader)
+
+    def current_version(self, model_dir='models'):
+        """Version name of the live model (None for a flat directory or if not loaded)"""
+        entry = self._live.get(self._key(model_dir))
+        return entry.version if entry else None
+
+    def _warm(self, predictor, data_loader):
+        """
+        Run a smoke batch through a freshly loaded version
+
+        Returns:
+            bool: True if the version is usable
+        """
+        if not predictor.is_loaded:
+            return False
+        if data_loader is None:
+            return True
+
+        spot_table = data_loader.get_spot_table().head(WARMUP_SPOTS)
+        spot_ids = spot_table['Parking_Spot_ID'].tolist()
+        sections = spot_table['Parking_Lot_Section'].tolist()
+        today = datetime.now().replace(minute=0, second=0, microsecond=0)
+        for hour in WARMUP_HOURS:
+            predictor.predict_many(spot_ids, sections, today.replace(hour=hour))
+        return True
+
+    def refresh(self, model_dir='models'):
+        """
+        Load the manifest's current version and swap it in if it is new
+
+        The new version is loaded and warmed before the swap; if that
+        fails, the live version keeps serving.
+
+        Returns:
+            bool: True if a new version went live
+        """
+        key = self._key(model_dir)
+        version, _ = resolve_model_path(model_dir)
+        live = self._live.get(key)
+        if live is not None and live.version == version:
+            return False
+
+        data_loader = self._data_loaders.get(key)
+        try:
+            entry = self._load_version(model_dir, data_loader)
+            if not self._warm(entry.predictor, data_loader):
+                print(f"[WARNING] Model version {version} failed to load; keeping current version")
+                return False
+        except Exception as e:
+            print(f"[ERROR] Model version {version} failed warm-up: {e}")
+            return False
+
+        with self._lock:
+            old = self._live.get(key)
+            self._live[key] = entry
+            if old is not None:
+                self._retired.setdefault(key, []).append(old)
+
+        print(f"[OK] Model version {version} is live")
+        self._collect_retired(model_dir)
+        return True
+
+    def _held_versions(self, key):
+        """Versions this process still serves: the live one and pinned retired ones"""
+        with self._lock:
+            held = {entry.version for entry in self._retired.get(key, [])}
+            live = self._live.get(key)
+            if live is not None:
+                held.add(live.version)
+        held.discard(None)
+        return held
+
+    def _update_lease(self, model_dir):
+        """Rewrite this process's lease with the versions it holds"""
+        held = self._held_versions(self._key(model_dir))
+        if not held:
+            return
+        try:
+            write_lease(model_dir, held)
+        except OSError as e:
+            print(f"[WARNING] Could not record model versions in use: {e}")
+
+    def _collect_retired(self, model_dir):
+        """Drop retired versions no request is using and prune them on disk"""
+        key = self._key(model_dir)
+        with self._lock:
+            retired = self._retired.get(key)
+            if not retired:
+                return
+            self._retired[key] = [entry for entry in retired if entry.refcount > 0]
+
+        self._update_lease(model_dir)
+        try:
+            prune_versions(model_dir, keep=self.keep_versions, in_use=self._held_versions(key))
+        except OSError as e:
+            print(f"[WARNING] Could not prune old model versions: {e}")
+
+    def preload(self, model_dir='models', data_loader=None):
+        """
+        Start loading a model directory in a background thread
+        Call at app startup so the first user click does not pay for deserialization
+        """
+        key = self._key(model_dir)
+        with self._lock:
+            if key in self._live or key in self._preloading:
+                return
+            self._preloading.add(key)
+
+        thread = threading.Thread(
+            target=self._live_entry,
+            args=(model_dir, data_loader),
+            name="model-registry-preload",
+            daemon=True
+        )
+        thread.start()
+
+    def start_watcher(self, model_dir='models', data_loader=None, interval=30):
+        """
+        Poll the manifest in a background thread and roll out new versions
+
+        Args:
+            model_dir: Root model directory
+            data_loader: ParkingDataLoader for new versions' pattern learning and warm-up
+            interval: Seconds between manifest checks
+        """
+        key = self._key(model_dir)
+        with self._lock:
+            if key in self._watchers:
+                return
+            if data_loader is not None:
+                self._data_loaders.setdefault(key, data_loader)
+
+            def watch():
+                last_mtime = None
+                while True:
+                    try:
+                        mtime = os.path.getmtime(manifest_path(model_dir))
+                    except OSError:
+                        mtime = None
+                    # Versions are first loaded by preload/get_predictor; only roll out changes
+                    if mtime is not None and mtime != last_mtime and key in self._live:
+                        self.refresh(model_dir)
+                        last_mtime = mtime
+                    # Keep the lease fresh for hosts that can't check our pid
+                    self._update_lease(model_dir)
+                    time.sleep(interval)
+
+            thread = threading.Thread(target=watch, name="model-registry-watcher", daemon=True)
+            self._watchers[key] = thread
+        thread.start()
+
+    def is_loaded(self, model_dir='models'):
+        """Check whether a model directory has already been loaded"""
+        return self._key(model_dir) in self._live
+
+    def clear(self):
+        """Drop every loaded predictor (next access reloads from disk)"""
+        with self._lock:
+            self._live.clear()
+            self._retired.clear()
+            self._preloading.clear()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry():
+    """
+    Get the process-wide ModelRegistry
+
+    Returns:
+        ModelRegistry
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
@@ -0,0 +1,225 @@
+"""
+Model Versions Module
+Versioned model directory layout with a JSON manifest
+
+    models/
+        manifest.json            {"current": "...", "versions": [...]}
+        versions/<version>/      one complete set of model artifacts
+        leases/<host>-<pid>.json versions a serving process has loaded
+
+A flat models/ directory without a manifest is still supported and is
+treated as a single unnamed version.
+"""
+import json
+import os
+import shutil
+import socket
+import time
+from datetime import datetime
+
+MANIFEST_NAME = 'manifest.json'
+VERSIONS_DIR = 'versions'
+LEASES_DIR = 'leases'
+
+# Leases not refreshed for this long no longer protect their versions
+# (only used when the owning process can't be checked directly)
+LEASE_TTL = 600
+
+
+def manifest_path(model_dir):
+    """Path of the manifest file for a model directory"""
+    return os.path.join(model_dir, MANIFEST_NAME)
+
+
+def read_manifest(model_dir):
+    """
+    Read the manifest
+
+    Returns:
+        dict or None: Manifest contents, or None if there is no (valid) manifest
+    """
+    try:
+        with open(manifest_path(model_dir)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(model_dir, manifest):
+    """Write the manifest atomically (readers never see a partial file)"""
+    _write_json(manifest_path(model_dir), manifest)
+
+
+def _write_json(path, data):
+    """Write a JSON file atomically via a temporary file"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _lease_path(model_dir):
+    """Lease file of this process"""
+    return os.path.join(model_dir, LEASES_DIR, f"{socket.gethostname()}-{os.getpid()}.json")
+
+
+def write_lease(model_dir, versions):
+    """
+    Record the versions this process is serving so no process prunes them
+
+    Rewriting the lease also refreshes it (see LEASE_TTL).
+
+    Args:
+        model_dir: Root model directory
+        versions: Version names currently loaded (live and still-pinned retired ones)
+    """
+    os.makedirs(os.path.join(model_dir, LEASES_DIR), exist_ok=True)
+    _write_json(_lease_path(model_dir), {
+        'host': socket.gethostname(),
+        'pid': os.getpid(),
+        'versions': sorted(versions)
+    })
+
+
+def release_lease(model_dir):
+    """Remove this process's lease"""
+    try:
+        os.remove(_lease_path(model_dir))
+    except OSError:
+        pass
+
+
+def _process_alive(pid):
+    """Check a local process id (POSIX only; None if it can't be checked)"""
+    if os.name != 'posix' or not isinstance(pid, int):
+        return None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def leased_versions(model_dir, ttl=LEASE_TTL):
+    """
+    Versions held by live serving processes
+
+    A lease counts while its process is running (same host, POSIX) or,
+    when that can't be checked, while it is younger than `ttl` seconds.
+    Leases of processes that exited are removed.
+
+    Returns:
+        set: Version names in use
+    """
+    lease_dir = os.path.join(model_dir, LEASES_DIR)
+    try:
+        names = os.listdir(lease_dir)
+    except OSError:
+        return set()
+
+    host = socket.gethostname()
+    in_use = set()
+    for name in names:
+        if not name.endswith('.json'):
+            continue
+        path = os.path.join(lease_dir, name)
+        try:
+            with open(path) as f:
+                lease = json.load(f)
+            age = time.time() - os.path.getmtime(path)
+        except (OSError, ValueError):
+            continue
+
+        alive = _process_alive(lease.get('pid')) if lease.get('host') == host else None
+        if alive is None:
+            alive = age < ttl
+        if alive:
+            in_use.update(lease.get('versions', []))
+        elif lease.get('host') == host:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    return in_use
+
+
+def resolve_model_path(model_dir):
+    """
+    Find the artifacts directory of the current version
+
+    Returns:
+        tuple: (version or None, directory containing the model files)
+    """
+    manifest = read_manifest(model_dir)
+    if manifest and manifest.get('current'):
+        version = manifest['current']
+        return version, os.path.join(model_dir, VERSIONS_DIR, version)
+    return None, model_dir
+
+
+def create_version_dir(model_dir, version=None):
+    """
+    Create an empty directory for a new version (not yet published)
+
+    Args:
+        model_dir: Root model directory
+        version: Version name (default: timestamp like v20250101-120000)
+
+    Returns:
+        tuple: (version, path)
+    """
+    version = version or datetime.now().strftime('v%Y%m%d-%H%M%S')
+    path = os.path.join(model_dir, VERSIONS_DIR, version)
+    os.makedirs(path, exist_ok=False)
+    return version, path
+
+
+def publish_version(model_dir, version, metadata=None):
+    """
+    Make a version current by rewriting the manifest
+
+    Args:
+        model_dir: Root model directory
+        version: Version created with create_version_dir
+        metadata: Extra details to record (model type, metrics, ...)
+    """
+    manifest = read_manifest(model_dir) or {'current': None, 'versions': []}
+    manifest['versions'] = [v for v in manifest['versions'] if v['version'] != version]
+    manifest['versions'].append({
+        'version': version,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        **(metadata or {})
+    })
+    manifest['current'] = version
+    _write_manifest(model_dir, manifest)
+
+
+def prune_versions(model_dir, keep=3, in_use=()):
+    """
+    Delete old version directories
+
+    The current version, the newest `keep` versions, anything in
+    `in_use` and every version leased by a serving process (see
+    write_lease) are never deleted, so any process can prune safely.
+
+    Returns:
+        list: Versions that were removed
+    """
+    manifest = read_manifest(model_dir)
+    if not manifest:
+        return []
+
+    ordered = [v['version'] for v in manifest['versions']]
+    protected = set(ordered[-keep:]) | {manifest['current']} | set(in_use) | leased_versions(model_dir)
+    removed = [version for version in ordered if version not in protected]
+    if not removed:
+        return []
+
+    for version in removed:
+        shutil.rmtree(os.path.join(model_dir, VERSIONS_DIR, version), ignore_errors=True)
+
+    manifest['versions'] = [v for v in manifest['versions'] if v['version'] not in removed]
+    _write_manifest(model_dir, manifest)
+    return removed
@@ -0,0 +1,65 @@
+"""
+NPZ Memory-Map Module
+np.load ignores mmap_mode for .npz archives, so every worker process would
+read its own copy of each exported array. Members saved uncompressed
+(np.savez) sit as plain .npy data inside the zip, so they can be
+memory-mapped straight from the archive and shared through the OS page cache.
+"""
+import struct
+import zipfile
+import numpy as np
+
+# Fixed part of a zip local file header; name and extra-field lengths end it
+LOCAL_HEADER_SIZE = 30
+HEADER_READERS = {
+    (1, 0): np.lib.format.read_array_header_1_0,
+    (2, 0): np.lib.format.read_array_header_2_0,
+}
+
+
+def load_npz(path, mmap_mode=None):
+    """
+    Load every array of an .npz file
+
+    Args:
+        path: .npz file path
+        mmap_mode: np.memmap mode (e.g. 'r') for uncompressed members,
+                   None to read everything into memory
+
+    Returns:
+        dict: Member name -> np.ndarray (np.memmap where mapped). Compressed,
+              object and 0-d members are always read into memory.
+    """
+    if mmap_mode is None:
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            array = _map_member(path, f, info, mmap_mode) if info.compress_type == zipfile.ZIP_STORED else None
+            if array is None:
+                with archive.open(info) as member:
+                    array = np.lib.format.read_array(member)
+            arrays[name] = array
+    return arrays
+
+
+def _map_member(path, f, info, mmap_mode):
+    """Memory-map one stored member, or None if it can't be mapped"""
+    f.seek(info.header_offset + LOCAL_HEADER_SIZE - 4)
+    name_length, extra_length = struct.unpack('<HH', f.read(4))
+    f.seek(info.header_offset + LOCAL_HEADER_SIZE + name_length + extra_length)
+
+    reader = HEADER_READERS.get(np.lib.format.read_magic(f))
+    if reader is None:
+        return None
+    shape, fortran_order, dtype = reader(f)
+    if dtype.hasobject or len(shape) == 0 or 0 in shape:
+        return None
+
+    return np.memmap(
+        path, dtype=dtype, mode=mmap_mode, offset=f.tell(),
+        shape=shape, order='F' if fortran_order else 'C'
+    )
@@ -0,0 +1,161 @@
+"""
+Pattern Tables Module
+Historical traffic, sensor and weather patterns as dense NumPy arrays
+Built once (at training time by model_proper.py) and saved next to the model
+"""
+import numpy as np
+import pandas as pd
+
+# Layout of the saved .npz; bump whenever arrays are added, renamed or reshaped
+# (1 = traffic_codes/weather_temperature layout, saved without a version field)
+FORMAT_VERSION = 2
+
+# Alphabetical, so argmax ties resolve like pandas Series.mode()[0]
+TRAFFIC_LEVELS = ['High', 'Low', 'Medium']
+WEATHER_COLUMNS = ['Weather_Temperature', 'Weather_Precipitation']
+
+# Pseudo-count pulling sparse (month, weekday, hour) weather cells toward the hour's mean
+WEATHER_SHRINKAGE = 5.0
+
+SENSOR_COLUMNS = {
+    'proximity': 'Sensor_Reading_Proximity',
+    'pressure': 'Sensor_Reading_Pressure',
+    'ultrasonic': 'Sensor_Reading_Ultrasonic'
+}
+
+
+def _hour_means(hours, values):
+    """Mean of values per hour (NaN for hours with no rows)"""
+    counts = np.bincount(hours, minlength=24)
+    sums = np.bincount(hours, weights=values, minlength=24)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def _mode_codes(counts):
+    """argmax over the last axis, -1 where there were no observations"""
+    return np.where(counts.sum(axis=-1) > 0, counts.argmax(axis=-1), -1).astype(np.int8)
+
+
+class PatternTables:
+    """
+    Dense historical pattern lookups
+
+    - traffic: Nearby_Traffic_Level counts per (hour, day of week) in
+      TRAFFIC_LEVELS order; the mode is stored as codes with a per-hour fallback
+    - sensor: average sensor readings per hour
+    - weather: average temperature and precipitation per (month, weekday,
+      hour), shrunk toward the hour's overall mean where data is sparse
+
+    Missing combinations are -1 (traffic) or NaN (means).
+    """
+
+    def __init__(self, traffic_counts, sensor_means, weather):
+        """
+        Args:
+            traffic_counts: int (24, 7, 3) observations per hour x weekday x level
+            sensor_means: float (3, 24) means in SENSOR_COLUMNS order
+            weather: float (12, 7, 24, 2) [temperature, precipitation] per
+                month x weekday x hour
+        """
+        self.traffic_counts = np.asarray(traffic_counts, dtype=np.int64)
+        self.traffic_codes = _mode_codes(self.traffic_counts)
+        self.traffic_hour_codes = _mode_codes(self.traffic_counts.sum(axis=1))
+        self.sensor_means = np.asarray(sensor_means, dtype=np.float64)
+        self.weather = np.asarray(weather, dtype=np.float64)
+
+    def traffic_level(self, hour, day_of_week):
+        """
+        Most common traffic level for an hour and weekday
+
+        Returns:
+            str or None: Level, falling back to the hour's overall mode; None if the hour was never seen
+        """
+        code = self.traffic_codes[hour, day_of_week]
+        if code < 0:
+            code = self.traffic_hour_codes[hour]
+        return TRAFFIC_LEVELS[code] if code >= 0 else None
+
+    def sensor_average(self, hour):
+        """
+        Average sensor readings for an hour
+
+        Returns:
+            dict: {'proximity', 'pressure', 'ultrasonic'} (NaN where unseen)
+        """
+        return {name: self.sensor_means[i, hour] for i, name in enumerate(SENSOR_COLUMNS)}
+
+    def save(self, path):
+        """Save the tables as an .npz file"""
+        np.savez(
+            path,
+            format_version=FORMAT_VERSION,
+            traffic_counts=self.traffic_counts,
+            sensor_means=self.sensor_means,
+            weather=self.weather
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load tables saved with save()
+
+        Raises:
+            ValueError: If the file was saved in another format version
+        """
+        with np.load(path) as data:
+            version = int(data['format_version']) if 'format_version' in data.files else 1
+            if version != FORMAT_VERSION:
+                raise ValueError(f"pattern tables format {version}, expected {FORMAT_VERSION}")
+            return cls(
+                data['traffic_counts'],
+                data['sensor_means'],
+                data['weather']
+            )
+
+
+def build_pattern_tables(df):
+    """
+    Compute all pattern tables from the raw parking dataset
+
+    Works on NumPy copies of the needed columns; df is never modified.
+
+    Args:
+        df: DataFrame with Entry_Time, Timestamp, Nearby_Traffic_Level,
+            sensor reading and weather columns
+
+    Returns:
+        PatternTables
+    """
+    hours = df['Entry_Time'].to_numpy().astype(np.int64)
+    timestamps = pd.to_datetime(df['Timestamp'], errors='coerce')
+    days = timestamps.dt.dayofweek.to_numpy()
+    months = timestamps.dt.month.to_numpy()
+    levels = pd.Categorical(df['Nearby_Traffic_Level'], categories=TRAFFIC_LEVELS).codes
+
+    # Crosstab of traffic level counts per (hour, weekday)
+    valid = ~np.isnan(days) & (levels >= 0)
+    traffic_counts = np.zeros((24, 7, len(TRAFFIC_LEVELS)), dtype=np.int64)
+    np.add.at(traffic_counts, (hours[valid], days[valid].astype(np.int64), levels[valid]), 1)
+
+    sensor_means = np.array([
+        _hour_means(hours, df[column].to_numpy(dtype=np.float64))
+        for column in SENSOR_COLUMNS.values()
+    ])
+
+    # Weather sums/counts per (month, weekday, hour), blended with the hour mean
+    dated = ~np.isnan(days) & ~np.isnan(months)
+    cell = (months[dated].astype(np.int64) - 1, days[dated].astype(np.int64), hours[dated])
+    weather_values = df[WEATHER_COLUMNS].to_numpy(dtype=np.float64)
+    weather_sums = np.zeros((12, 7, 24, len(WEATHER_COLUMNS)))
+    weather_counts = np.zeros((12, 7, 24, 1))
+    np.add.at(weather_sums, cell, weather_values[dated])
+    np.add.at(weather_counts, cell, 1)
+    hour_means = np.stack([_hour_means(hours, weather_values[:, k]) for k in range(len(WEATHER_COLUMNS))], axis=-1)
+    weather = (weather_sums + WEATHER_SHRINKAGE * hour_means) / (weather_counts + WEATHER_SHRINKAGE)
+
+    return PatternTables(
+        traffic_counts=traffic_counts,
+        sensor_means=sensor_means,
+        weather=weather
+    )
@@ -0,0 +1,86 @@
+"""
+Prediction Cache Module
+Bounded LRU cache with TTL expiry for model predictions
+Keeps Streamlit reruns from recomputing the same predictions
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache where every entry also expires after a TTL
+
+    Keys should be the normalized model inputs (hashable tuples).
+    Values are whatever the predictor stores (e.g. class probabilities).
+    """
+
+    def __init__(self, maxsize=4096, ttl_seconds=900):
+        """
+        Initialize an empty cache
+
+        Args:
+            maxsize: Maximum number of entries before least-recently-used eviction
+            ttl_seconds: Seconds an entry stays valid after being stored
+        """
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Look up a key
+
+        Returns:
+            Cached value, or None on a miss or an expired entry
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry (used when the model or pattern tables change)"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """
+        Get hit/miss counters
+
+        Returns:
+            dict: {'hits', 'misses', 'size', 'hit_rate'}
+        """
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._entries),
+            'hit_rate': self.hits / total if total else 0.0
+        }
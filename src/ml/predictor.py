@@ -4,11 +4,26 @@ Loads trained model and makes predictions for parking spots
 Combines ML predictions with database availability
 """
 import joblib
-import numpy as np
-import pandas as pd
 import os
 from datetime import datetime
 
+from ml.feature_pipeline import CompiledFeaturePipeline
+
+# Spot metadata used when a spot is missing from the dataset
+DEFAULT_SPOT_INFO = {
+    'Proximity_To_Exit': 10.0,
+    'Weather_Temperature': 20.0,
+    'Weather_Precipitation': 0,
+    'Nearby_Traffic_Level': 'Medium',
+    'Sensor_Reading_Proximity': 5.0,
+    'Sensor_Reading_Pressure': 2.0,
+    'Sensor_Reading_Ultrasonic': 100.0,
+    'Vehicle_Type_Weight': 1500.0,
+    'Vehicle_Type_Height': 4.0,
+    'User_Parking_History': 5.0,
+    'Reserved_Status': 0
+}
+
 class ParkingPredictor:
     """
     AI-powered parking predictor
@@ -27,6 +42,7 @@ class ParkingPredictor:
         self.scaler = None
         self.feature_columns = None
         self.label_encoders = None
+        self.feature_pipeline = None
         self.is_loaded = False
         
         self._load_model()
@@ -47,6 +63,9 @@ class ParkingPredictor:
             self.scaler = joblib.load(scaler_path)
             self.feature_columns = joblib.load(features_path)
             self.label_encoders = joblib.load(encoders_path)
+            self.feature_pipeline = CompiledFeaturePipeline.from_fitted(
+                self.feature_columns, self.label_encoders, self.scaler
+            )
             self.is_loaded = True
             
             print("[OK] ML model loaded successfully")
@@ -101,19 +120,7 @@ class ParkingPredictor:
             
             if not spot_info:
                 # Use defaults if spot not found
-                spot_info = {
-                    'Proximity_To_Exit': 10.0,
-                    'Weather_Temperature': 20.0,
-                    'Weather_Precipitation': 0,
-                    'Nearby_Traffic_Level': 'Medium',
-                    'Sensor_Reading_Proximity': 5.0,
-                    'Sensor_Reading_Pressure': 2.0,
-                    'Sensor_Reading_Ultrasonic': 100.0,
-                    'Vehicle_Type_Weight': 1500.0,
-                    'Vehicle_Type_Height': 4.0,
-                    'User_Parking_History': 5.0,
-                    'Reserved_Status': 0
-                }
+                spot_info = dict(DEFAULT_SPOT_INFO)
             
             # Build feature dictionary
             features = self._build_features(
@@ -122,14 +129,12 @@ class ParkingPredictor:
             )
             
             # Make prediction
-            feature_df = pd.DataFrame([features])[self.feature_columns]
-            feature_scaled = self.scaler.transform(feature_df)
-            
-            prediction = self.model.predict(feature_scaled)[0]
+            feature_scaled = self.feature_pipeline.transform([features])
             probabilities = self.model.predict_proba(feature_scaled)[0]
             
             prob_vacant = probabilities[0]
             prob_occupied = probabilities[1]
+            prediction = 0 if prob_vacant >= prob_occupied else 1
             confidence = max(prob_vacant, prob_occupied)
             
             # Generate recommendation
@@ -162,30 +167,11 @@ class ParkingPredictor:
     
     def _build_features(self, hour, day_of_week, is_ev, spot_id, section,
                        vehicle_type, spot_info):
-        """Build feature dictionary for prediction"""
-        
-        # Time features
-        month = datetime.now().month
-        is_weekend = 1 if day_of_week >= 5 else 0
-        
-        # Cyclical encoding
-        hour_sin = np.sin(2 * np.pi * hour / 24)
-        hour_cos = np.cos(2 * np.pi * hour / 24)
-        day_sin = np.sin(2 * np.pi * day_of_week / 7)
-        day_cos = np.cos(2 * np.pi * day_of_week / 7)
-        
-        # Patterns
-        if 8 <= hour <= 10 or 17 <= hour <= 19:
-            hour_pattern = 2  # Peak
-        elif 11 <= hour <= 16:
-            hour_pattern = 1  # Moderate
-        else:
-            hour_pattern = 0  # Off-peak
-        
-        day_pattern = 1 if day_of_week < 5 else 0  # Weekday/Weekend
-        
-        # Encode section and vehicle type
-        section_encoded = self.label_encoders['Parking_Lot_Section'].transform([section])[0]
+        """
+        Build raw input dictionary for prediction
+        Engineered columns (sin/cos, patterns, encodings, scaling) are
+        derived by the compiled feature pipeline
+        """
         
         # Map vehicle type to CSV format
         vehicle_type_map = {
@@ -196,33 +182,20 @@ class ParkingPredictor:
             'Motorcycle': 'Motorcycle',
             'Electric Vehicle': 'Electric Vehicle'
         }
-        vehicle_mapped = vehicle_type_map.get(vehicle_type, 'Car')
-        vehicle_encoded = self.label_encoders['Vehicle_Type'].transform([vehicle_mapped])[0]
-        
-        # Traffic level encoding
-        traffic_level = spot_info.get('Nearby_Traffic_Level', 'Medium')
-        traffic_encoded = self.label_encoders['Nearby_Traffic_Level'].transform([traffic_level])[0]
         
         return {
             'Hour': hour,
             'DayOfWeek': day_of_week,
             'Electric_Vehicle': 1 if is_ev else 0,
             'Parking_Spot_ID': spot_id,
-            'IsWeekend': is_weekend,
-            'Month': month,
-            'Hour_sin': hour_sin,
-            'Hour_cos': hour_cos,
-            'DayOfWeek_sin': day_sin,
-            'DayOfWeek_cos': day_cos,
-            'Hour_Pattern': hour_pattern,
-            'DayOfWeek_Pattern': day_pattern,
-            'Parking_Lot_Section_encoded': section_encoded,
-            'Vehicle_Type_encoded': vehicle_encoded,
+            'Month': datetime.now().month,
+            'Parking_Lot_Section': section,
+            'Vehicle_Type': vehicle_type_map.get(vehicle_type, 'Car'),
+            'Nearby_Traffic_Level': spot_info.get('Nearby_Traffic_Level', 'Medium'),
             'Proximity_To_Exit': spot_info.get('Proximity_To_Exit', 10.0),
             'Reserved_Status': spot_info.get('Reserved_Status', 0),
             'Weather_Temperature': spot_info.get('Weather_Temperature', 20.0),
             'Weather_Precipitation': spot_info.get('Weather_Precipitation', 0),
-            'Nearby_Traffic_Level_encoded': traffic_encoded,
             'Sensor_Reading_Proximity': spot_info.get('Sensor_Reading_Proximity', 5.0),
             'Sensor_Reading_Pressure': spot_info.get('Sensor_Reading_Pressure', 2.0),
             'Sensor_Reading_Ultrasonic': spot_info.get('Sensor_Reading_Ultrasonic', 100.0),
@@ -354,26 +327,48 @@ class ParkingPredictor:
         
         try:
             # Get all available spots in section
-            available_spots = booking_system.get_available_spots_in_section(section, hour)
+            available_spots = booking_system.get_available_spots_in_section(section, hour, day_of_week)
             
             if exclude_spot and exclude_spot in available_spots:
                 available_spots.remove(exclude_spot)
             
-            # Predict for each available spot
+            # Convert day name to number if needed
+            if isinstance(day_of_week, str):
+                days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+                day_of_week = days.index(day_of_week) if day_of_week in days else 0
+            
+            # Build features for every available spot, then score them in one batch
+            spot_infos = []
+            feature_rows = []
+            for spot_id in available_spots:
+                spot_info = data_loader.get_spot_info(spot_id, section) or dict(DEFAULT_SPOT_INFO)
+                spot_infos.append(spot_info)
+                feature_rows.append(self._build_features(
+                    hour, day_of_week, is_ev, spot_id, section,
+                    vehicle_type, spot_info
+                ))
+            
+            if not feature_rows:
+                return []
+            
+            probabilities = self.model.predict_proba(self.feature_pipeline.transform(feature_rows))
+            
             spot_predictions = []
-            for spot_id in available_spots[:20]:  # Limit to 20 for performance
-                prediction = self.predict_spot_availability(
-                    spot_id, section, hour, day_of_week,
-                    vehicle_type, is_ev, data_loader
-                )
-                
-                spot_info = data_loader.get_spot_info(spot_id, section)
+            for spot_id, spot_info, (prob_vacant, prob_occupied) in zip(available_spots, spot_infos, probabilities):
+                prediction = {
+                    'prediction': 'Vacant' if prob_vacant >= prob_occupied else 'Occupied',
+                    'confidence': max(prob_vacant, prob_occupied),
+                    'probability_vacant': prob_vacant,
+                    'probability_occupied': prob_occupied,
+                    'recommendation': self._generate_recommendation(prob_vacant, hour, spot_info),
+                    'insights': self._extract_insights(spot_info, hour, day_of_week)
+                }
                 
                 spot_predictions.append({
                     'spot_id': spot_id,
                     'section': section,
-                    'confidence': prediction['probability_vacant'],
-                    'distance_to_exit': spot_info.get('Proximity_To_Exit', 10.0) if spot_info else 10.0,
+                    'confidence': prob_vacant,
+                    'distance_to_exit': spot_info.get('Proximity_To_Exit', 10.0),
                     'prediction': prediction
                 })
             
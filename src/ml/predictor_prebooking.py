@@ -10,41 +10,152 @@ import joblib
 import numpy as np
 import pandas as pd
 import os
+import threading
 from datetime import datetime, timedelta
 
+from ml.prediction_cache import PredictionCache
+from ml.availability_table import AvailabilityTable, TABLE_FILE
+from ml.feature_pipeline import CompiledFeaturePipeline
+from ml.tree_export import TreeEnsembleEvaluator, export_tree_ensemble
+from ml.pattern_tables import PatternTables, build_pattern_tables
+from ml.weather_provider import WeatherProvider, FileForecastSource
+from ml.traffic_context import TrafficContext, FileTrafficFeed
+from ml.section_forecaster import SectionDemandForecaster, FORECAST_FILE
+from data.user_profiles import (
+    PROFILE_FIELDS, build_vehicle_defaults, vehicle_default_profile, get_user_profile_store
+)
+
+# Map app vehicle types to the dataset's Vehicle_Type categories
+VEHICLE_TYPE_MAP = {
+    'Sedan': 'Car', 'SUV': 'Car', 'Truck': 'Car', 'Car': 'Car',
+    'Motorcycle': 'Motorcycle', 'Electric Vehicle': 'Electric Vehicle'
+}
+
+# Model feature columns grouped into the factors shown as prediction drivers
+FEATURE_GROUPS = {
+    'Hour': 'Time of day', 'Hour_sin': 'Time of day', 'Hour_cos': 'Time of day', 'Hour_Pattern': 'Time of day',
+    'DayOfWeek': 'Day of week', 'DayOfWeek_sin': 'Day of week', 'DayOfWeek_cos': 'Day of week',
+    'DayOfWeek_Pattern': 'Day of week', 'IsWeekend': 'Day of week',
+    'Month': 'Season',
+    'Parking_Spot_ID': 'This spot', 'Proximity_To_Exit': 'This spot', 'Reserved_Status': 'This spot',
+    'Parking_Lot_Section_encoded': 'Section',
+    'Vehicle_Type_encoded': 'Vehicle', 'Vehicle_Type_Weight': 'Vehicle', 'Vehicle_Type_Height': 'Vehicle',
+    'Electric_Vehicle': 'EV charging',
+    'Weather_Temperature': 'Weather', 'Weather_Precipitation': 'Weather',
+    'Nearby_Traffic_Level_encoded': 'Traffic',
+    'Sensor_Reading_Proximity': 'Sensor history', 'Sensor_Reading_Pressure': 'Sensor history',
+    'Sensor_Reading_Ultrasonic': 'Sensor history',
+    'User_Parking_History': 'Parking history'
+}
+
+# Record layout returned by PrebookingPredictor.predict_many
+PREDICTION_DTYPE = np.dtype([
+    ('spot_id', np.int64),
+    ('section', 'U16'),
+    ('hour', np.int8),
+    ('day_of_week', np.int8),
+    ('probability_vacant', np.float64),
+    ('probability_occupied', np.float64),
+    ('size_compatible', np.bool_)
+])
+
 class PrebookingPredictor:
     """
     AI-powered parking predictor optimized for PREBOOKING
     Does NOT rely on real-time sensors for future predictions
     """
     
-    def __init__(self, model_dir='models', data_loader=None):
+    def __init__(self, model_dir='models', data_loader=None,
+                 cache_size=4096, cache_ttl=900, availability_table_path=None,
+                 mmap_mode=None, weather_sources=None, weather_ttl=600,
+                 traffic_feed=None, traffic_alpha=0.05):
         """
         Initialize predictor for prebooking
         
         Args:
             model_dir: Directory containing saved model files
             data_loader: ParkingDataLoader to analyze historical patterns
+            cache_size: Max cached predictions (LRU eviction)
+            cache_ttl: Seconds a cached prediction stays valid
+            availability_table_path: Precomputed table for lookup mode
+                (default: availability_table.npz in model_dir, if present)
+            mmap_mode: Memory-map mode (e.g. 'r') for the model arrays: the pickled
+                       model (joblib), the tree export and the availability table
+            weather_sources: Forecast sources overlaying historical weather
+                (default: the local forecast feed, see weather_provider.py)
+            weather_ttl: Seconds between weather source refreshes
+            traffic_feed: Source of new traffic observations
+                (default: the local traffic feed, see traffic_context.py)
+            traffic_alpha: Weight of each new traffic observation
         """
         self.model_dir = model_dir
+        self.mmap_mode = mmap_mode
         self.data_loader = data_loader
         self.model = None
         self.scaler = None
         self.feature_columns = None
         self.label_encoders = None
+        self.feature_pipeline = None
         self.is_loaded = False
         
-        # Historical pattern caches (learned from dataset)
-        self.traffic_patterns = None
-        self.sensor_patterns = None
+        # Historical traffic/sensor/weather patterns (dense arrays, see pattern_tables.py)
+        self.pattern_tables = None
+        self.weather_provider = None
+        self.weather_sources = [FileForecastSource()] if weather_sources is None else weather_sources
+        self.weather_ttl = weather_ttl
+        self.traffic_context = None
+        self.traffic_feed = FileTrafficFeed() if traffic_feed is None else traffic_feed
+        self.traffic_alpha = traffic_alpha
+        
+        # Model outputs keyed by normalized inputs (cleared when model/patterns change)
+        self.prediction_cache = PredictionCache(maxsize=cache_size, ttl_seconds=cache_ttl)
+        
+        # Per-feature contributions for the same keys (see explain)
+        self.contribution_cache = PredictionCache(maxsize=cache_size, ttl_seconds=cache_ttl)
+        self.explainer = None
+        
+        # Precomputed probabilities (lookup mode), see build_availability_table.py
+        self.availability_table = None
+        
+        # Lookups answered by the table / left to the model (see cache_stats)
+        self._table_hits = 0
+        self._model_runs = 0
+        self._stats_lock = threading.Lock()
+        
+        # Per-vehicle-type profile features for users without a stored profile
+        self.vehicle_defaults = self._build_vehicle_defaults()
+        
+        # Section x weekday x hour demand curves saved with this version
+        self.section_forecaster = None
         
         self._load_model()
-        if data_loader:
-            self._learn_patterns()
+        self._load_availability_table(availability_table_path)
+        self._learn_patterns()
+        self._load_section_forecaster()
     
     def _load_model(self):
-        """Load trained model and associated files"""
+        """
+        Load trained model and associated files
+        
+        Prefers the NumPy export (tree_ensemble.npz + feature_pipeline.npz)
+        written by model_proper.py, which needs neither sklearn nor xgboost.
+        Falls back to the joblib pickles when no export exists.
+        """
         try:
+            ensemble_path = os.path.join(self.model_dir, 'tree_ensemble.npz')
+            pipeline_path = os.path.join(self.model_dir, 'feature_pipeline.npz')
+            
+            if os.path.exists(ensemble_path) and os.path.exists(pipeline_path):
+                self.model = TreeEnsembleEvaluator.load(ensemble_path, mmap_mode=self.mmap_mode)
+                self.feature_pipeline = CompiledFeaturePipeline.load(pipeline_path)
+                self.feature_columns = self.feature_pipeline.feature_columns
+                self.explainer = self.model
+                self.is_loaded = True
+                self.invalidate_cache()
+                
+                print("[OK] Prebooking ML model loaded successfully (NumPy tree export)")
+                return
+            
             model_path = os.path.join(self.model_dir, 'parking_predictor.pkl')
             scaler_path = os.path.join(self.model_dir, 'scaler.pkl')
             features_path = os.path.join(self.model_dir, 'feature_columns.pkl')
@@ -54,11 +165,16 @@ class PrebookingPredictor:
                 print("[WARNING] ML model files not found. Predictions will be disabled.")
                 return
             
-            self.model = joblib.load(model_path)
+            self.model = joblib.load(model_path, mmap_mode=self.mmap_mode)
             self.scaler = joblib.load(scaler_path)
             self.feature_columns = joblib.load(features_path)
             self.label_encoders = joblib.load(encoders_path)
+            self.feature_pipeline = CompiledFeaturePipeline.from_fitted(
+                self.feature_columns, self.label_encoders, self.scaler
+            )
+            self.explainer = self._export_explainer()
             self.is_loaded = True
+            self.invalidate_cache()
             
             print("[OK] Prebooking ML model loaded successfully")
         
@@ -66,42 +182,103 @@ class PrebookingPredictor:
             print(f"[ERROR] Failed to load ML model: {e}")
             self.is_loaded = False
     
+    def _export_explainer(self):
+        """
+        Flatten a pickled tree model for feature contributions
+        
+        Returns:
+            TreeEnsembleEvaluator or None if the model type can't be exported
+        """
+        try:
+            return export_tree_ensemble(self.model)
+        except Exception as e:
+            print(f"[WARNING] Prediction drivers unavailable for this model: {e}")
+            return None
+    
+    def _load_section_forecaster(self):
+        """
+        Load the section forecaster saved with this model version, or fit
+        one on the loaded dataset (milliseconds) if there is none
+        """
+        forecast_path = os.path.join(self.model_dir, FORECAST_FILE)
+        try:
+            if os.path.exists(forecast_path):
+                self.section_forecaster = SectionDemandForecaster.load(forecast_path)
+                print(f"[OK] Loaded section forecaster from {forecast_path}")
+            elif self.data_loader and self.data_loader.df is not None:
+                self.section_forecaster = SectionDemandForecaster.fit(self.data_loader.df)
+                print("[OK] Fitted section forecaster on historical data")
+        except Exception as e:
+            print(f"[ERROR] Section forecaster unavailable: {e}")
+            self.section_forecaster = None
+    
+    def _load_availability_table(self, table_path=None):
+        """Load the precomputed availability table if one exists"""
+        table_path = table_path or os.path.join(self.model_dir, TABLE_FILE)
+        if not self.is_loaded or not os.path.exists(table_path):
+            return
+        
+        try:
+            self.availability_table = AvailabilityTable.load(table_path, mmap_mode=self.mmap_mode)
+            print(f"[OK] Availability table loaded ({len(self.availability_table.spot_ids)} spots)")
+        except Exception as e:
+            print(f"[ERROR] Failed to load availability table: {e}")
+            self.availability_table = None
+    
     def _learn_patterns(self):
         """
-        Learn historical patterns from dataset for predictions
+        Load historical patterns for predictions
         - Traffic patterns by hour and weekday
         - Sensor patterns by hour
-        - Weather patterns by hour/month
+        - Weather patterns by hour
+        
+        Uses pattern_tables.npz saved next to the model by model_proper.py;
+        otherwise (no file, another format version or a read error) builds
+        the tables from the data loader's DataFrame (without modifying it).
         """
-        if not self.data_loader or not self.data_loader.df is not None:
+        tables_path = os.path.join(self.model_dir, 'pattern_tables.npz')
+        try:
+            self.pattern_tables = None
+            if os.path.exists(tables_path):
+                try:
+                    self.pattern_tables = PatternTables.load(tables_path)
+                    source = "Loaded historical patterns"
+                except Exception as e:
+                    print(f"[WARNING] Can't use {tables_path} ({e}) - rebuilding patterns from the dataset")
+            
+            if self.pattern_tables is None:
+                if not (self.data_loader and self.data_loader.df is not None):
+                    return
+                self.pattern_tables = build_pattern_tables(self.data_loader.df)
+                source = "Learned historical patterns from dataset"
+            
+            # Weather lookups index the (month, weekday, hour) table; forecast
+            # refreshes invalidate predictions made with the old weather
+            self.weather_provider = WeatherProvider(
+                self.pattern_tables.weather, sources=self.weather_sources, ttl_seconds=self.weather_ttl
+            )
+            self.weather_provider.add_listener(self.invalidate_cache)
+            
+            # Traffic follows new observations (EWMA) on top of the historical counts
+            self.traffic_context = TrafficContext(
+                self.pattern_tables.traffic_counts, alpha=self.traffic_alpha, feed=self.traffic_feed
+            )
+            self.traffic_context.add_listener(self.invalidate_cache)
+        except Exception as e:
+            print(f"[ERROR] Failed to load historical patterns: {e}")
+            self.pattern_tables = None
+            self.weather_provider = None
+            self.traffic_context = None
             return
         
-        df = self.data_loader.df
-        
-        # Learn traffic patterns (hour + weekday)
-        if 'Timestamp' not in df.columns:
-            df['Timestamp'] = pd.to_datetime(df['Timestamp'], errors='coerce')
-        
-        df['Hour'] = df['Entry_Time']
-        df['DayOfWeek'] = pd.to_datetime(df['Timestamp']).dt.dayofweek
+        # Cached predictions were made with the old patterns
+        self.invalidate_cache()
         
-        # Average traffic level by hour and weekday
-        self.traffic_patterns = df.groupby(['Hour', 'DayOfWeek'])['Nearby_Traffic_Level'].agg(
-            lambda x: x.mode()[0] if len(x.mode()) > 0 else 'Medium'
-        ).to_dict()
-        
-        # Average sensor readings by hour (fallback for when we can't get real-time)
-        self.sensor_patterns = {
-            'proximity': df.groupby('Hour')['Sensor_Reading_Proximity'].mean().to_dict(),
-            'pressure': df.groupby('Hour')['Sensor_Reading_Pressure'].mean().to_dict(),
-            'ultrasonic': df.groupby('Hour')['Sensor_Reading_Ultrasonic'].mean().to_dict()
-        }
-        
-        print("[OK] Learned historical patterns from dataset")
-        print(f"  - Traffic patterns: {len(self.traffic_patterns)} hour-day combinations")
-        print(f"  - Sensor patterns: {len(self.sensor_patterns['proximity'])} hourly averages")
+        print(f"[OK] {source}")
+        print(f"  - Traffic patterns: {int((self.pattern_tables.traffic_codes >= 0).sum())} hour-day combinations")
+        print(f"  - Sensor patterns: {int((~np.isnan(self.pattern_tables.sensor_means[0])).sum())} hourly averages")
     
-    def _predict_traffic_level(self, hour, day_of_week):
+    def _predict_traffic_level(self, hour, day_of_week, historical=False):
         """
         Predict traffic level based on historical patterns
         NOT from static dataset value
@@ -109,11 +286,18 @@ class PrebookingPredictor:
         Args:
             hour: Hour of day (0-23)
             day_of_week: Day of week (0=Monday, 6=Sunday)
+            historical: Ignore streamed observations (historical pattern only)
         
         Returns:
             str: Predicted traffic level (Low/Medium/High)
         """
-        if self.traffic_patterns is None:
+        if self.traffic_context is None:
+            level = None
+        elif historical:
+            level = self.traffic_context.historical_level(hour, day_of_week)
+        else:
+            level = self.traffic_context.level(hour, day_of_week)
+        if level is None:
             # Fallback to rule-based if no patterns learned
             if 8 <= hour <= 10 or 17 <= hour <= 19:
                 if day_of_week < 5:  # Weekday
@@ -125,49 +309,36 @@ class PrebookingPredictor:
             else:
                 return 'Low'
         
-        # Use learned patterns
-        key = (hour, day_of_week)
-        if key in self.traffic_patterns:
-            return self.traffic_patterns[key]
-        
-        # Fallback to same hour, different day
-        same_hour = [v for k, v in self.traffic_patterns.items() if k[0] == hour]
-        if same_hour:
-            return max(set(same_hour), key=same_hour.count)  # Most common
-        
-        return 'Medium'  # Default
+        # Learned pattern (same hour on other days when this weekday was never
+        # seen), updated by streaming observations
+        return level
     
-    def _get_weather_forecast(self, hour, day_of_week, location="default"):
+    def _get_weather_forecast(self, hour, day_of_week, month=None, location="default", historical=False):
         """
         Get weather forecast for future booking time
-        TODO: Integrate real weather API
+        Forecast feed where available, historical averages otherwise
         
         Args:
             hour: Target hour
             day_of_week: Target day
+            month: Target month (default: current month)
             location: Location for forecast
+            historical: Ignore the forecast feed (historical averages only)
         
         Returns:
             dict: Weather forecast data
         """
-        # TODO: Replace with actual weather API call
-        # Example: OpenWeatherMap, WeatherAPI, etc.
-        
-        # For now, use historical averages from dataset
-        if self.data_loader and self.data_loader.df is not None:
-            df = self.data_loader.df
-            if 'Hour' not in df.columns:
-                df['Hour'] = df['Entry_Time']
-            
-            hour_data = df[df['Hour'] == hour]
-            if len(hour_data) > 0:
-                avg_temp = hour_data['Weather_Temperature'].mean()
-                avg_precip = hour_data['Weather_Precipitation'].mean()
-                
+        if self.weather_provider:
+            month = month or datetime.now().month
+            if historical:
+                forecast = self.weather_provider.historical(month, day_of_week, hour)
+            else:
+                forecast = self.weather_provider.forecast(month, day_of_week, hour)
+            if forecast is not None:
                 return {
-                    'temperature': avg_temp,
-                    'precipitation': 1 if avg_precip > 0.5 else 0,
-                    'source': 'historical_average'
+                    'temperature': forecast['temperature'],
+                    'precipitation': 1 if forecast['precipitation'] > 0.5 else 0,
+                    'source': forecast['source']
                 }
         
         # Default fallback
@@ -188,11 +359,12 @@ class PrebookingPredictor:
         Returns:
             dict: Average sensor readings
         """
-        if self.sensor_patterns:
+        if self.pattern_tables:
+            averages = self.pattern_tables.sensor_average(hour)
+            defaults = {'proximity': 5.0, 'pressure': 2.0, 'ultrasonic': 100.0}
             return {
-                'proximity': self.sensor_patterns['proximity'].get(hour, 5.0),
-                'pressure': self.sensor_patterns['pressure'].get(hour, 2.0),
-                'ultrasonic': self.sensor_patterns['ultrasonic'].get(hour, 100.0)
+                name: defaults[name] if np.isnan(value) else value
+                for name, value in averages.items()
             }
         
         # Defaults if no patterns
@@ -222,8 +394,14 @@ class PrebookingPredictor:
         }
         return vehicle_to_size.get(vehicle_type, 'Standard')
     
+    def _is_size_compatible(self, vehicle_type, spot_info):
+        """Check if a spot's size suits the vehicle (Standard spots suit all)"""
+        recommended_size = self._get_spot_size_for_vehicle(vehicle_type)
+        actual_size = spot_info.get('Spot_Size', 'Standard') if spot_info else 'Standard'
+        return recommended_size == actual_size or actual_size == 'Standard'
+    
     def predict_for_prebooking(self, spot_id, section, booking_datetime,
-                               vehicle_type='Sedan', is_ev=False):
+                               vehicle_type='Sedan', is_ev=False, user_id=None):
         """
         Predict spot availability for PREBOOKING
         Optimized for future time slots (not real-time)
@@ -234,6 +412,8 @@ class PrebookingPredictor:
             booking_datetime: datetime object for booking time
             vehicle_type: Vehicle type from user
             is_ev: Electric vehicle flag
+            user_id: User whose profile personalizes the vehicle and
+                history features (None: vehicle type defaults)
         
         Returns:
             dict: Prediction with insights
@@ -244,6 +424,7 @@ class PrebookingPredictor:
         try:
             hour = booking_datetime.hour
             day_of_week = booking_datetime.weekday()
+            month = booking_datetime.month
             
             # Get spot metadata (static info)
             spot_info = self.data_loader.get_spot_info(spot_id, section) if self.data_loader else {}
@@ -252,32 +433,41 @@ class PrebookingPredictor:
             predicted_traffic = self._predict_traffic_level(hour, day_of_week)
             
             # GET weather forecast (will use API in future)
-            weather_forecast = self._get_weather_forecast(hour, day_of_week)
+            weather_forecast = self._get_weather_forecast(hour, day_of_week, month)
             
             # GET historical sensor averages (not real-time)
             sensor_averages = self._get_historical_sensor_average(hour)
             
             # Check vehicle-spot compatibility
             recommended_size = self._get_spot_size_for_vehicle(vehicle_type)
-            actual_size = spot_info.get('Spot_Size', 'Standard') if spot_info else 'Standard'
-            size_compatible = (recommended_size == actual_size or actual_size == 'Standard')
-            
-            # Build features
-            features = self._build_prebooking_features(
-                hour, day_of_week, is_ev, spot_id, section,
-                vehicle_type, spot_info, predicted_traffic,
-                weather_forecast, sensor_averages
-            )
-            
-            # Make prediction
-            feature_df = pd.DataFrame([features])[self.feature_columns]
-            feature_scaled = self.scaler.transform(feature_df)
+            size_compatible = self._is_size_compatible(vehicle_type, spot_info)
             
-            prediction = self.model.predict(feature_scaled)[0]
-            probabilities = self.model.predict_proba(feature_scaled)[0]
+            # Make prediction (reuse a cached one for identical model inputs)
+            profile = self._user_profile(user_id, vehicle_type)
+            cache_key = self._prediction_key(spot_id, section, hour, day_of_week, vehicle_type, is_ev, month, profile)
+            probabilities = self._lookup_probabilities(cache_key)
+            contributions = self.contribution_cache.get(cache_key) if self.explainer is not None else None
+            if probabilities is None:
+                features = self._build_prebooking_features(
+                    hour, day_of_week, month, is_ev, spot_id, section,
+                    vehicle_type, spot_info, predicted_traffic,
+                    weather_forecast, sensor_averages, profile
+                )
+                # Contributions only when they come from the same tree walk (NumPy
+                # export); otherwise explain_prediction computes them on demand
+                if self.explainer is self.model:
+                    scored, row_contributions = self._score_feature_rows([features], with_contributions=True)
+                else:
+                    scored, row_contributions = self._score_feature_rows([features]), None
+                probabilities = scored[0]
+                self.prediction_cache.put(cache_key, probabilities)
+                if row_contributions is not None:
+                    contributions = row_contributions[0]
+                    self.contribution_cache.put(cache_key, contributions)
             
             prob_vacant = probabilities[0]
             prob_occupied = probabilities[1]
+            prediction = 0 if prob_vacant >= prob_occupied else 1
             confidence = max(prob_vacant, prob_occupied)
             
             # Calculate time until booking
@@ -307,7 +497,12 @@ class PrebookingPredictor:
                 'weather_forecast': weather_forecast,
                 'size_compatible': size_compatible,
                 'recommended_size': recommended_size,
-                'hours_until_booking': hours_until
+                'hours_until_booking': hours_until,
+                # None: not computed yet, see explain_prediction
+                'drivers': (
+                    None if contributions is None and self.explainer is not None
+                    else self._top_drivers(contributions)
+                )
             }
         
         except Exception as e:
@@ -316,60 +511,484 @@ class PrebookingPredictor:
             traceback.print_exc()
             return self._get_default_prediction()
     
-    def _build_prebooking_features(self, hour, day_of_week, is_ev, spot_id, section,
-                                   vehicle_type, spot_info, predicted_traffic,
-                                   weather_forecast, sensor_averages):
-        """Build features for prebooking prediction"""
+    def explain_prediction(self, spot_id, section, booking_datetime,
+                           vehicle_type='Sedan', is_ev=False, user_id=None, top_k=3):
+        """
+        Top prediction drivers for one booking, computed on demand
         
-        # Time features
-        month = datetime.now().month
-        is_weekend = 1 if day_of_week >= 5 else 0
+        Served from the contribution cache when a prefetch or a live
+        prediction already walked the trees; otherwise walks them for this
+        one row, so predictions answered from the table never pay for it.
         
-        # Cyclical encoding
-        hour_sin = np.sin(2 * np.pi * hour / 24)
-        hour_cos = np.cos(2 * np.pi * hour / 24)
-        day_sin = np.sin(2 * np.pi * day_of_week / 7)
-        day_cos = np.cos(2 * np.pi * day_of_week / 7)
+        Args:
+            spot_id: Parking spot ID
+            section: Parking section
+            booking_datetime: datetime of the booking
+            vehicle_type: Vehicle type from user
+            is_ev: Electric vehicle flag
+            user_id: User whose profile personalizes the features
+            top_k: Number of drivers to return
         
-        # Patterns
-        if 8 <= hour <= 10 or 17 <= hour <= 19:
-            hour_pattern = 2  # Peak
-        elif 11 <= hour <= 16:
-            hour_pattern = 1  # Moderate
-        else:
-            hour_pattern = 0  # Off-peak
+        Returns:
+            list: Drivers as returned by _top_drivers (empty without an explainer)
+        """
+        if not self.is_loaded or self.explainer is None:
+            return []
+        
+        try:
+            hour = booking_datetime.hour
+            day_of_week = booking_datetime.weekday()
+            month = booking_datetime.month
+            profile = self._user_profile(user_id, vehicle_type)
+            cache_key = self._prediction_key(spot_id, section, hour, day_of_week, vehicle_type, is_ev, month, profile)
+            
+            contributions = self.contribution_cache.get(cache_key)
+            if contributions is None:
+                spot_info = self.data_loader.get_spot_info(spot_id, section) if self.data_loader else {}
+                features = self._build_prebooking_features(
+                    hour, day_of_week, month, is_ev, spot_id, section, vehicle_type, spot_info,
+                    self._predict_traffic_level(hour, day_of_week),
+                    self._get_weather_forecast(hour, day_of_week, month),
+                    self._get_historical_sensor_average(hour),
+                    profile
+                )
+                feature_scaled = self.feature_pipeline.transform([features])
+                _, row_contributions, _ = self.explainer.predict_proba_with_contributions(feature_scaled)
+                contributions = row_contributions[0]
+                self.contribution_cache.put(cache_key, contributions)
+            
+            return self._top_drivers(contributions, top_k)
+        
+        except Exception as e:
+            print(f"[ERROR] Prediction explanation failed: {e}")
+            return []
+    
+    def predict_many(self, spot_ids, sections, booking_datetimes,
+                     vehicle_types='Sedan', is_ev=False, explain=False, user_id=None):
+        """
+        Score many (spot, time, vehicle) combinations with one model call
         
-        day_pattern = 1 if day_of_week < 5 else 0
+        Every argument may be a single value or a sequence; single values are
+        repeated to the length of the longest sequence. So one spot over many
+        hours, many spots at one hour, or mixed lists all work.
         
-        # Encode categorical
-        section_encoded = self.label_encoders['Parking_Lot_Section'].transform([section])[0]
+        Args:
+            spot_ids: Parking spot ID(s)
+            sections: Parking section(s)
+            booking_datetimes: datetime(s) of the booking
+            vehicle_types: Vehicle type(s) from user
+            is_ev: Electric vehicle flag(s)
+            explain: Also fill the contribution cache for rows answered from
+                the cache or availability table (used by prefetching, so
+                a later click can show drivers without walking the trees)
+            user_id: User whose profile personalizes every row (None: vehicle type defaults)
         
-        # Map vehicle type to dataset format
-        vehicle_type_map = {
-            'Sedan': 'Car', 'SUV': 'Car', 'Truck': 'Car', 'Car': 'Car',
-            'Motorcycle': 'Motorcycle', 'Electric Vehicle': 'Electric Vehicle'
-        }
-        vehicle_mapped = vehicle_type_map.get(vehicle_type, 'Car')
-        vehicle_encoded = self.label_encoders['Vehicle_Type'].transform([vehicle_mapped])[0]
+        Returns:
+            np.ndarray: Structured array, one record per row, with fields
+                spot_id, section, hour, day_of_week, probability_vacant,
+                probability_occupied, size_compatible
+        """
+        columns = [spot_ids, sections, booking_datetimes, vehicle_types, is_ev]
+        lengths = [len(c) for c in columns if isinstance(c, (list, tuple, np.ndarray, pd.Series))]
+        n = max(lengths) if lengths else 1
+        spot_ids, sections, booking_datetimes, vehicle_types, is_ev = [
+            list(c) if isinstance(c, (list, tuple, np.ndarray, pd.Series)) else [c] * n
+            for c in columns
+        ]
+        
+        results = np.zeros(n, dtype=PREDICTION_DTYPE)
+        results['probability_vacant'] = 0.5
+        results['probability_occupied'] = 0.5
+        results['size_compatible'] = True
+        
+        # Time-dependent context is shared by every row with the same (hour, day, month),
+        # the user profile by every row with the same vehicle type
+        context_cache = {}
+        profiles = {}
+        feature_rows = []
+        scored_keys = []
+        miss_positions = []
+        miss_rows = []
+        miss_keys = []
+        
+        for i in range(n):
+            hour = booking_datetimes[i].hour
+            day_of_week = booking_datetimes[i].weekday()
+            month = booking_datetimes[i].month
+            spot_info = self.data_loader.get_spot_info(spot_ids[i], sections[i]) if self.data_loader else {}
+            
+            
+            results[i]['spot_id'] = spot_ids[i]
+            results[i]['section'] = sections[i]
+            results[i]['hour'] = hour
+            results[i]['day_of_week'] = day_of_week
+            results[i]['size_compatible'] = self._is_size_compatible(vehicle_types[i], spot_info)
+            
+            if not self.is_loaded:
+                continue
+            
+            if vehicle_types[i] not in profiles:
+                profiles[vehicle_types[i]] = self._user_profile(user_id, vehicle_types[i])
+            profile = profiles[vehicle_types[i]]
+            cache_key = self._prediction_key(
+                spot_ids[i], sections[i], hour, day_of_week, vehicle_types[i], is_ev[i], month, profile
+            )
+            cached = self._lookup_probabilities(cache_key)
+            if cached is not None:
+                results[i]['probability_vacant'] = cached[0]
+                results[i]['probability_occupied'] = cached[1]
+                if not (explain and self.explainer is not None and
+                        self.contribution_cache.get(cache_key) is None):
+                    continue
+            
+            if (hour, day_of_week, month) not in context_cache:
+                context_cache[(hour, day_of_week, month)] = (
+                    self._predict_traffic_level(hour, day_of_week),
+                    self._get_weather_forecast(hour, day_of_week, month),
+                    self._get_historical_sensor_average(hour)
+                )
+            predicted_traffic, weather_forecast, sensor_averages = context_cache[(hour, day_of_week, month)]
+            
+            feature_rows.append(self._build_prebooking_features(
+                hour, day_of_week, month, is_ev[i], spot_ids[i], sections[i],
+                vehicle_types[i], spot_info, predicted_traffic,
+                weather_forecast, sensor_averages, profile
+            ))
+            scored_keys.append(cache_key)
+            if cached is None:
+                miss_positions.append(len(feature_rows) - 1)
+                miss_rows.append(i)
+                miss_keys.append(cache_key)
         
-        # Encode PREDICTED traffic (not from dataset)
-        traffic_encoded = self.label_encoders['Nearby_Traffic_Level'].transform([predicted_traffic])[0]
+        if not feature_rows:
+            return results
         
+        try:
+            # Contributions come with the NumPy export's tree walk; a separate explainer
+            # walks its trees again, which only prefetching (explain) pays for
+            if explain or self.explainer is self.model:
+                probabilities, contributions = self._score_feature_rows(feature_rows, with_contributions=True)
+            else:
+                probabilities, contributions = self._score_feature_rows(feature_rows), None
+            results['probability_vacant'][miss_rows] = probabilities[miss_positions, 0]
+            results['probability_occupied'][miss_rows] = probabilities[miss_positions, 1]
+            for position, cache_key in zip(miss_positions, miss_keys):
+                self.prediction_cache.put(cache_key, probabilities[position])
+            if contributions is not None:
+                for position, cache_key in enumerate(scored_keys):
+                    self.contribution_cache.put(cache_key, contributions[position])
+        except Exception as e:
+            print(f"[ERROR] Batch prebooking prediction failed: {e}")
+
+        return results
+
+    def predict_window(self, spot_id, section, entry_datetime, exit_datetime,
+                       vehicle_type='Sedan', is_ev=False, user_id=None):
+        """
+        Predict availability of a spot for a whole stay
+
+        Every hour in [entry, exit) is scored with one predict_many call.
+        The hours are treated as independent, so the whole-stay probability
+        is the product of the hourly ones; the weakest hour is the one most
+        likely to be taken.
+
+        Args:
+            spot_id: Parking spot ID
+            section: Parking section (Zone A, B, C, D)
+            entry_datetime: datetime of arrival
+            exit_datetime: datetime of departure (next day if not after entry)
+            vehicle_type: Vehicle type from user
+            is_ev: Electric vehicle flag
+            user_id: User whose profile personalizes the features
+
+        Returns:
+            dict: {'hourly' (PREDICTION_DTYPE records), 'hour_starts',
+                   'probability_stay', 'weakest_hour', 'weakest_probability'}
+        """
+        if exit_datetime <= entry_datetime:
+            exit_datetime += timedelta(days=1)
+
+        # Hours overlapped by the stay, starting with the (partial) entry hour
+        first_hour = entry_datetime.replace(minute=0, second=0, microsecond=0)
+        n_hours = max(1, min(24, int(np.ceil((exit_datetime - first_hour).total_seconds() / 3600))))
+        hour_starts = [first_hour + timedelta(hours=h) for h in range(n_hours)]
+
+        hourly = self.predict_many(
+            spot_id, section, hour_starts,
+            vehicle_types=vehicle_type, is_ev=is_ev, user_id=user_id
+        )
+        weakest = int(np.argmin(hourly['probability_vacant']))
+
         return {
+            'hourly': hourly,
+            'hour_starts': hour_starts,
+            'probability_stay': float(np.prod(hourly['probability_vacant'])),
+            'weakest_hour': hour_starts[weakest],
+            'weakest_probability': float(hourly['probability_vacant'][weakest])
+        }
+
+    def _build_vehicle_defaults(self):
+        """Median profile values per vehicle type from the data loader's DataFrame"""
+        try:
+            if self.data_loader and self.data_loader.df is not None:
+                return build_vehicle_defaults(self.data_loader.df)
+        except Exception as e:
+            print(f"[WARNING] Vehicle defaults unavailable: {e}")
+        return {}
+
+    def _user_profile(self, user_id, vehicle_type):
+        """
+        Profile features for a request (at most one profile store lookup)
+
+        Users without a stored profile, and requests without a user, get
+        the defaults of their vehicle type. The availability table is built
+        with the same defaults, so only stored user profiles bypass it.
+
+        Returns:
+            dict: PROFILE_FIELDS values plus 'source' ('user' or 'vehicle_default')
+        """
+        if user_id is not None:
+            store = get_user_profile_store(self.data_loader)
+            if store is not None:
+                try:
+                    profile = store.get_profile(user_id, vehicle_type)
+                    if profile['source'] == 'user':
+                        return profile
+                except Exception as e:
+                    print(f"[WARNING] User profile lookup failed: {e}")
+        return vehicle_default_profile(self.vehicle_defaults, vehicle_type)
+
+    def _prediction_key(self, spot_id, section, hour, day_of_week, vehicle_type, is_ev, month, profile=None):
+        """
+        Normalize the inputs of _build_prebooking_features into a cache key
+        Traffic, weather and sensor context are derived from these, so they
+        are covered as long as the cache is cleared when patterns change.
+        The first seven fields are the availability table's lookup key; the
+        last is the stored user profile (None for vehicle-type defaults,
+        which the table already covers)
+        """
+        return (
+            int(spot_id),
+            section,
+            int(hour),
+            int(day_of_week),
+            VEHICLE_TYPE_MAP.get(vehicle_type, 'Car'),
+            1 if is_ev else 0,
+            int(month),
+            tuple(round(float(profile[field]), 3) for field in PROFILE_FIELDS)
+            if profile and profile.get('source') == 'user' else None
+        )
+    
+    def _lookup_probabilities(self, cache_key):
+        """
+        Serve [prob_vacant, prob_occupied] without running the model
+        Checks the prediction cache first, then the precomputed table
+        (not for stored user profiles, the table holds vehicle defaults)
+        
+        Returns:
+            np.ndarray or None: Probabilities, or None if live inference is needed
+        """
+        probabilities = self.prediction_cache.get(cache_key)
+        
+        # The table was built from historical weather and traffic; live context needs the model
+        if (probabilities is None and self.availability_table is not None and cache_key[7] is None and
+                not self._has_live_context(cache_key[6], cache_key[3], cache_key[2])):
+            prob_vacant = self.availability_table.lookup(*cache_key[:7])
+            if prob_vacant is not None:
+                probabilities = np.array([prob_vacant, 1.0 - prob_vacant])
+                with self._stats_lock:
+                    self._table_hits += 1
+        
+        if probabilities is None:
+            with self._stats_lock:
+                self._model_runs += 1
+        return probabilities
+    
+    def _has_live_context(self, month, day_of_week, hour):
+        """True if a weather forecast or traffic drift makes the availability table stale for this slot"""
+        return bool(
+            (self.weather_provider and self.weather_provider.is_forecast(month, day_of_week, hour)) or
+            (self.traffic_context and self.traffic_context.has_drifted(hour, day_of_week))
+        )
+    
+    def precomputed_probabilities(self, spot_ids, section, booking_datetime,
+                                  vehicle_type='Sedan', is_ev=False, ignore_live_context=False):
+        """
+        Precomputed probability_vacant for spots of one section (no inference)
+        
+        Args:
+            ignore_live_context: Answer from the table even while a forecast
+                or traffic drift applies (historical-context estimates)
+        
+        Returns:
+            np.ndarray: Probabilities, NaN where the availability table can't
+            answer (no table, unknown spot, or live weather/traffic context)
+        """
+        hour = booking_datetime.hour
+        day_of_week = booking_datetime.weekday()
+        month = booking_datetime.month
+        
+        if self.availability_table is None or (
+                not ignore_live_context and self._has_live_context(month, day_of_week, hour)):
+            return np.full(len(spot_ids), np.nan)
+        
+        return self.availability_table.lookup_many(
+            spot_ids, section, hour, day_of_week,
+            VEHICLE_TYPE_MAP.get(vehicle_type, 'Car'), is_ev, month
+        )
+    
+    def fallback_prediction(self, spot_id, section, booking_datetime,
+                            vehicle_type='Sedan', is_ev=False, user_id=None):
+        """
+        Answer from stored results only (never runs the model)
+
+        Served when a live prediction misses its latency budget. Uses the
+        prediction cache, then the precomputed availability table even if
+        live weather/traffic context (or a user profile) would normally
+        bypass it.
+
+        Returns:
+            dict: Prediction in the predict_for_prebooking layout, with
+                  'fallback_source' ('cache', 'precomputed' or 'default')
+        """
+        prediction = self._get_default_prediction()
+        prediction['fallback_source'] = 'default'
+
+        cache_key = self._prediction_key(
+            spot_id, section, booking_datetime.hour, booking_datetime.weekday(), vehicle_type, is_ev,
+            booking_datetime.month, self._user_profile(user_id, vehicle_type)
+        )
+        probabilities = self.prediction_cache.get(cache_key)
+        if probabilities is not None:
+            prediction['fallback_source'] = 'cache'
+        elif self.availability_table is not None:
+            prob_vacant = self.availability_table.lookup(*cache_key[:7])
+            if prob_vacant is not None:
+                probabilities = np.array([prob_vacant, 1.0 - prob_vacant])
+                prediction['fallback_source'] = 'precomputed'
+
+        spot_info = self.data_loader.get_spot_info(spot_id, section) if self.data_loader else None
+        prediction['size_compatible'] = self._is_size_compatible(vehicle_type, spot_info)
+        prediction['recommended_size'] = self._get_spot_size_for_vehicle(vehicle_type)
+        prediction['hours_until_booking'] = (booking_datetime - datetime.now()).total_seconds() / 3600
+
+        if probabilities is not None:
+            prob_vacant, prob_occupied = float(probabilities[0]), float(probabilities[1])
+            prediction.update({
+                'prediction': 'Vacant' if prob_vacant >= prob_occupied else 'Occupied',
+                'confidence': max(prob_vacant, prob_occupied),
+                'probability_vacant': prob_vacant,
+                'probability_occupied': prob_occupied,
+                'recommendation': f"Estimated {prob_vacant * 100:.0f}% chance this spot is free (quick estimate)"
+            })
+        else:
+            prediction['recommendation'] = 'Live prediction is still running - check again in a moment'
+        return prediction
+
+    def invalidate_cache(self):
+        """Drop all cached predictions and contributions"""
+        self.prediction_cache.clear()
+        self.contribution_cache.clear()
+    
+    def cache_stats(self):
+        """
+        Get prediction cache and availability table counters
+        
+        Cache misses answered by the table are not model runs, so
+        'lookup_hit_rate' counts both layers.
+        
+        Returns:
+            dict: {'hits', 'misses', 'size', 'hit_rate'} of the prediction
+                  cache plus 'table_hits', 'model_runs' and 'lookup_hit_rate'
+        """
+        stats = self.prediction_cache.stats()
+        with self._stats_lock:
+            table_hits, model_runs = self._table_hits, self._model_runs
+        lookups = stats['hits'] + table_hits + model_runs
+        stats.update({
+            'table_hits': table_hits,
+            'model_runs': model_runs,
+            'lookup_hit_rate': (stats['hits'] + table_hits) / lookups if lookups else 0.0
+        })
+        return stats
+    
+    def _top_drivers(self, contributions, top_k=3):
+        """
+        Summarize feature contributions as the strongest prediction drivers
+        
+        Contributions are summed per FEATURE_GROUPS factor and flipped to
+        point toward availability (log-odds for boosting models, probability
+        for forests).
+        
+        Args:
+            contributions: (n_features,) contributions toward Occupied, or None
+            top_k: Number of drivers to return
+        
+        Returns:
+            list: Dicts {'factor', 'effect', 'direction'} by decreasing |effect|,
+                  direction 'available' or 'occupied'; empty without contributions
+        """
+        if contributions is None:
+            return []
+        
+        effects = {}
+        for column, value in zip(self.feature_columns, contributions):
+            factor = FEATURE_GROUPS.get(column, column)
+            effects[factor] = effects.get(factor, 0.0) - float(value)
+        
+        ranked = sorted(effects.items(), key=lambda item: -abs(item[1]))[:top_k]
+        return [
+            {'factor': factor, 'effect': effect, 'direction': 'available' if effect > 0 else 'occupied'}
+            for factor, effect in ranked
+            if effect != 0.0
+        ]
+    
+    def _score_feature_rows(self, feature_rows, with_contributions=False):
+        """
+        Run the compiled feature pipeline and model once over a list of input rows
+        
+        Args:
+            feature_rows: Raw input dicts from _build_prebooking_features
+            with_contributions: Also return per-feature contributions
+        
+        Returns:
+            np.ndarray: (n, 2) array of [prob_vacant, prob_occupied], plus a
+            (n, n_features) contribution array toward Occupied (None without
+            an explainer) when with_contributions is set
+        """
+        feature_scaled = self.feature_pipeline.transform(feature_rows)
+        if not with_contributions:
+            return self.model.predict_proba(feature_scaled)
+        
+        if self.explainer is None:
+            return self.model.predict_proba(feature_scaled), None
+        if self.explainer is self.model:
+            # NumPy export: probabilities and contributions from the same tree walk
+            probabilities, contributions, _ = self.explainer.predict_proba_with_contributions(feature_scaled)
+            return probabilities, contributions
+        _, contributions, _ = self.explainer.predict_proba_with_contributions(feature_scaled)
+        return self.model.predict_proba(feature_scaled), contributions
+    
+    def _build_prebooking_features(self, hour, day_of_week, month, is_ev, spot_id, section,
+                                   vehicle_type, spot_info, predicted_traffic,
+                                   weather_forecast, sensor_averages, profile=None):
+        """
+        Build raw inputs for prebooking prediction
+        Engineered columns (sin/cos, patterns, encodings, scaling) are
+        derived by the compiled feature pipeline; the profile (user or
+        vehicle defaults) replaces the spot's vehicle specs and parking history
+        """
+        features = {
             'Hour': hour,
             'DayOfWeek': day_of_week,
             'Electric_Vehicle': 1 if is_ev else 0,
             'Parking_Spot_ID': spot_id,
-            'IsWeekend': is_weekend,
             'Month': month,
-            'Hour_sin': hour_sin,
-            'Hour_cos': hour_cos,
-            'DayOfWeek_sin': day_sin,
-            'DayOfWeek_cos': day_cos,
-            'Hour_Pattern': hour_pattern,
-            'DayOfWeek_Pattern': day_pattern,
-            'Parking_Lot_Section_encoded': section_encoded,
-            'Vehicle_Type_encoded': vehicle_encoded,
+            'Parking_Lot_Section': section,
+            
+            # Vehicle type in dataset format
+            'Vehicle_Type': VEHICLE_TYPE_MAP.get(vehicle_type, 'Car'),
+            
             'Proximity_To_Exit': spot_info.get('Proximity_To_Exit', 10.0) if spot_info else 10.0,
             'Reserved_Status': spot_info.get('Reserved_Status', 0) if spot_info else 0,
             
@@ -378,7 +997,7 @@ class PrebookingPredictor:
             'Weather_Precipitation': weather_forecast['precipitation'],
             
             # PREDICTED traffic (not static dataset value)
-            'Nearby_Traffic_Level_encoded': traffic_encoded,
+            'Nearby_Traffic_Level': predicted_traffic,
             
             # Historical sensor AVERAGES (not real-time)
             'Sensor_Reading_Proximity': sensor_averages['proximity'],
@@ -390,6 +1009,9 @@ class PrebookingPredictor:
             'Vehicle_Type_Height': spot_info.get('Vehicle_Type_Height', 4.0) if spot_info else 4.0,
             'User_Parking_History': spot_info.get('User_Parking_History', 5.0) if spot_info else 5.0
         }
+        if profile:
+            features.update({field: profile[field] for field in PROFILE_FIELDS})
+        return features
     
     def _generate_prebooking_recommendation(self, prob_vacant, hour, day_of_week,
                                            predicted_traffic, weather_forecast,
@@ -0,0 +1,150 @@
+"""
+Prediction Prefetcher Module
+Scores a section's available spots on a background thread pool as soon as
+the section is opened, so clicking a slot finds its prediction in the cache
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Spots scored per predict_many call; cancellation is checked between chunks
+PREFETCH_CHUNK = 16
+
+# Seconds a finished job is reused for the same context (its results are
+# still in the prediction cache, whose default TTL is 900s) and then forgotten
+JOB_TTL = 600
+
+# Finished jobs kept at most (oldest forgotten first); covers sessions that
+# ended without cancel()
+MAX_JOBS = 1000
+
+
+class PredictionPrefetcher:
+    """
+    Per-session prefetch jobs on a shared worker pool
+
+    Each session has at most one job. Starting a job for a different
+    context (section, hours, vehicle) cancels the previous one: queued work
+    is dropped and running work stops at its next chunk. A job for the same
+    context is reused, running or finished within job_ttl seconds.
+    """
+
+    def __init__(self, max_workers=2, job_ttl=JOB_TTL, max_jobs=MAX_JOBS):
+        """
+        Args:
+            max_workers: Worker threads shared by every session
+            job_ttl: Seconds a finished job is reused and kept
+            max_jobs: Finished jobs kept at most
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self.job_ttl = job_ttl
+        self.max_jobs = max_jobs
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def prefetch(self, session_id, predictor_handle, work, vehicle_type='Sedan', is_ev=False, user_id=None):
+        """
+        Start scoring work for a session (no-op if the same work is running
+        or finished less than job_ttl seconds ago)
+
+        Args:
+            session_id: Key identifying the user session
+            predictor_handle: PredictorHandle (or predictor with acquire())
+            work: List of (section, booking_datetime, spot_ids) to score
+            vehicle_type: Vehicle type from user
+            is_ev: Electric vehicle flag
+            user_id: User whose profile personalizes the predictions
+
+        Returns:
+            bool: True if a new job was started
+        """
+        context = (
+            tuple((section, booking_datetime, tuple(spot_ids)) for section, booking_datetime, spot_ids in work),
+            vehicle_type,
+            bool(is_ev),
+            user_id
+        )
+
+        with self._lock:
+            self._evict()
+            job = self._jobs.get(session_id)
+            # Expired jobs were just evicted, so a finished one still has its results cached
+            if job and job['context'] == context and not job['future'].cancelled():
+                return False
+            if job:
+                self._cancel_job(job)
+
+            cancelled = threading.Event()
+            job = {'context': context, 'cancelled': cancelled, 'finished_at': None}
+            job['future'] = self._executor.submit(
+                self._run, predictor_handle, work, vehicle_type, is_ev, user_id, cancelled
+            )
+            job['future'].add_done_callback(lambda _: job.update(finished_at=time.monotonic()))
+            self._jobs[session_id] = job
+        return True
+
+    def _evict(self):
+        """Forget finished jobs older than job_ttl, then the oldest beyond max_jobs (lock held)"""
+        now = time.monotonic()
+        finished = sorted(
+            (job['finished_at'], session_id)
+            for session_id, job in self._jobs.items()
+            if job['finished_at'] is not None
+        )
+        excess = len(self._jobs) - self.max_jobs
+        for finished_at, session_id in finished:
+            if now - finished_at > self.job_ttl or excess > 0:
+                del self._jobs[session_id]
+                excess -= 1
+
+    def _run(self, predictor_handle, work, vehicle_type, is_ev, user_id, cancelled):
+        """Score work chunk by chunk into the prediction cache"""
+        try:
+            with predictor_handle.acquire() as predictor:
+                if not predictor.is_loaded:
+                    return
+                for section, booking_datetime, spot_ids in work:
+                    for start in range(0, len(spot_ids), PREFETCH_CHUNK):
+                        if cancelled.is_set():
+                            return
+                        predictor.predict_many(
+                            spot_ids[start:start + PREFETCH_CHUNK], section, booking_datetime,
+                            vehicle_types=vehicle_type, is_ev=is_ev, explain=True, user_id=user_id
+                        )
+        except Exception as e:
+            print(f"[ERROR] Prediction prefetch failed: {e}")
+
+    def _cancel_job(self, job):
+        job['cancelled'].set()
+        job['future'].cancel()
+
+    def cancel(self, session_id):
+        """Cancel a session's job (e.g. when the user leaves the slot view)"""
+        with self._lock:
+            job = self._jobs.pop(session_id, None)
+            if job:
+                self._cancel_job(job)
+
+    def is_running(self, session_id):
+        """Check whether a session's job is queued or running"""
+        job = self._jobs.get(session_id)
+        return bool(job) and not job['future'].done()
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher():
+    """
+    Get the process-wide PredictionPrefetcher
+
+    Returns:
+        PredictionPrefetcher
+    """
+    global _prefetcher
+    if _prefetcher is None:
+        with _prefetcher_lock:
+            if _prefetcher is None:
+                _prefetcher = PredictionPrefetcher()
+    return _prefetcher
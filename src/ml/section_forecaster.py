@@ -0,0 +1,210 @@
+"""
+Section Forecaster Module
+Section-level demand forecasts: occupancy rate per section x weekday x hour
+A ridge regression on section, weekday and hour-of-day features is fitted
+to the sweep-line occupancy profile of the historical stays
+(data/occupancy_profile.py), so every section's curve for the whole week
+comes out of a single matrix product
+"""
+import numpy as np
+
+from data.occupancy_profile import OccupancyProfile, build_occupancy_profile
+
+# Sine/cosine pairs describing the shape of the daily curve
+HOUR_HARMONICS = 3
+
+# Harmonics each section may adjust on top of the shared daily curve
+SECTION_HOUR_HARMONICS = 2
+
+# Candidate L2 penalties (intercept excluded); fit() picks one by cross-validation.
+# Large values keep sparse section/weekday cells near the lot average
+RIDGE_ALPHAS = (1.0, 10.0, 100.0, 1000.0)
+CV_FOLDS = 5
+
+FORECAST_FILE = 'section_forecast.npz'
+
+
+def _hour_basis(hours, n_harmonics):
+    """(n, 2 * n_harmonics) sine/cosine features of the hour of day"""
+    angles = 2 * np.pi * np.outer(hours, np.arange(1, n_harmonics + 1)) / 24
+    return np.concatenate([np.sin(angles), np.cos(angles)], axis=1)
+
+
+def _design_matrix(section_codes, days, hours, n_sections):
+    """
+    Feature rows for (section, weekday, hour) cells
+
+    Columns: intercept, section one-hot, weekday one-hot, hour harmonics,
+    section x low-order hour harmonics.
+    """
+    section_codes = np.asarray(section_codes, dtype=np.int64)
+    days = np.asarray(days, dtype=np.int64)
+    n = len(section_codes)
+
+    section_onehot = np.zeros((n, n_sections))
+    section_onehot[np.arange(n), section_codes] = 1.0
+    day_onehot = np.zeros((n, 7))
+    day_onehot[np.arange(n), days] = 1.0
+
+    hour_features = _hour_basis(hours, HOUR_HARMONICS)
+    section_hour = _hour_basis(hours, SECTION_HOUR_HARMONICS)
+    interactions = (section_onehot[:, :, None] * section_hour[:, None, :]).reshape(n, -1)
+
+    return np.concatenate([np.ones((n, 1)), section_onehot, day_onehot, hour_features, interactions], axis=1)
+
+
+def _solve_ridge(X, rates, alpha):
+    """
+    Ridge fit on per-cell occupancy rates
+
+    Args:
+        X: _design_matrix rows of the cells
+        rates: Occupancy rate of each cell
+        alpha: L2 penalty
+
+    Returns:
+        np.ndarray: Coefficients for _design_matrix columns
+    """
+    # Normal equations: (X'X + aI) b = X'y
+    penalty = np.full(X.shape[1], alpha)
+    penalty[0] = 0.0
+    return np.linalg.solve(X.T @ X + np.diag(penalty), X.T @ rates)
+
+
+class SectionDemandForecaster:
+    """
+    Occupancy forecasts for every section, weekday and hour
+
+    All curves are computed once at construction into a (sections, 7, 24)
+    array of occupancy rates in [0, 1], so a lookup is an array index.
+    """
+
+    def __init__(self, sections, coefficients):
+        """
+        Args:
+            sections: Section names in coefficient order
+            coefficients: Ridge weights for _design_matrix columns
+        """
+        self.sections = list(sections)
+        self.coefficients = np.asarray(coefficients, dtype=np.float64)
+        self._section_index = {section: i for i, section in enumerate(self.sections)}
+        self.curves = self.forecast_all()
+
+    @classmethod
+    def fit(cls, df, ridge_alpha=None):
+        """
+        Fit on the raw parking dataset
+
+        The stays are first swept into an OccupancyProfile (see
+        build_occupancy_profile); the forecaster is a smooth fit of that
+        profile's (section, weekday, hour) rates, so the two never disagree
+        beyond smoothing.
+
+        Args:
+            df: DataFrame with Parking_Lot_Section, Timestamp, Entry_Time,
+                Exit_Time, Parking_Duration, Occupancy_Status (not modified)
+            ridge_alpha: L2 penalty, or None to choose from RIDGE_ALPHAS by
+                CV_FOLDS-fold cross-validated squared error over the cells
+
+        Returns:
+            SectionDemandForecaster
+        """
+        profile = build_occupancy_profile(df)
+        n_sections = len(profile.sections)
+        X = _design_matrix(*np.indices((n_sections, 7, 24)).reshape(3, -1), n_sections)
+        rates = profile.rates.ravel()
+
+        if ridge_alpha is None:
+            folds = np.random.default_rng(0).integers(0, CV_FOLDS, len(rates))
+            scores = []
+            for alpha in RIDGE_ALPHAS:
+                errors = 0.0
+                for fold in range(CV_FOLDS):
+                    held_out = folds == fold
+                    coefficients = _solve_ridge(X[~held_out], rates[~held_out], alpha)
+                    predicted = np.clip(X[held_out] @ coefficients, 0.0, 1.0)
+                    errors += np.sum((predicted - rates[held_out]) ** 2)
+                scores.append(errors / len(rates))
+            ridge_alpha = RIDGE_ALPHAS[int(np.argmin(scores))]
+
+        return cls(profile.sections, _solve_ridge(X, rates, ridge_alpha))
+
+    def forecast_all(self):
+        """
+        Occupancy rate for every section, weekday and hour (one matrix product)
+
+        Returns:
+            np.ndarray: float (sections, 7, 24) rates clipped to [0, 1]
+        """
+        grid = np.indices((len(self.sections), 7, 24)).reshape(3, -1)
+        X = _design_matrix(grid[0], grid[1], grid[2], len(self.sections))
+        return np.clip(X @ self.coefficients, 0.0, 1.0).reshape(len(self.sections), 7, 24)
+
+    def occupancy(self, section, day_of_week, hours):
+        """
+        Forecast occupancy rate for a section
+
+        Args:
+            section: Parking section
+            day_of_week: Day index (0=Monday)
+            hours: Hour of day, or a sequence of hours (averaged, e.g. a stay)
+
+        Returns:
+            float or None: Rate in [0, 1], None for an unknown section
+        """
+        section_idx = self._section_index.get(section)
+        if section_idx is None:
+            return None
+        return float(np.mean(self.curves[section_idx, day_of_week, np.asarray(hours, dtype=np.int64)]))
+
+    def as_profile(self):
+        """
+        The forecast curves as an OccupancyProfile (same lookups as the
+        historical profile)
+
+        Returns:
+            OccupancyProfile
+        """
+        return OccupancyProfile(self.sections, self.curves)
+
+    def all_sections(self, day_of_week, hours):
+        """
+        Forecast occupancy rate for every section
+
+        Returns:
+            dict: {section: rate}
+        """
+        rates = self.curves[:, day_of_week, np.asarray(hours, dtype=np.int64)]
+        if rates.ndim > 1:
+            rates = rates.mean(axis=1)
+        return {section: float(rate) for section, rate in zip(self.sections, rates)}
+
+    def save(self, path):
+        """Save the fitted model as an .npz file"""
+        np.savez(path, sections=np.array(self.sections), coefficients=self.coefficients)
+
+    @classmethod
+    def load(cls, path):
+        """Load a model saved with save()"""
+        with np.load(path) as data:
+            return cls([str(s) for s in data['sections']], data['coefficients'])
+
+
+def get_section_forecaster(data_loader, model_dir='models'):
+    """
+    Get the section forecaster of the live model version
+
+    The forecaster belongs to the registry's predictor (see
+    PrebookingPredictor._load_section_forecaster), so a version swap
+    replaces it together with the model.
+
+    Args:
+        data_loader: ParkingDataLoader instance
+        model_dir: Directory with saved models
+
+    Returns:
+        SectionDemandForecaster or None if neither loading nor fitting is possible
+    """
+    from ml.model_registry import get_model_registry
+
+    return get_model_registry().get_predictor(model_dir, data_loader).section_forecaster
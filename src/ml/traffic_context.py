@@ -0,0 +1,213 @@
+"""
+Traffic Context Module
+Streaming estimate of Nearby_Traffic_Level per (weekday, hour)
+Starts from the historical distributions and follows new observations
+(sensor rows or a local traffic feed) with exponentially weighted updates
+"""
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+from ml.pattern_tables import TRAFFIC_LEVELS
+
+# Local traffic feed picked up when no feed path is configured
+DEFAULT_TRAFFIC_FEED_PATH = os.path.join('resources', 'traffic_feed.csv')
+
+
+class FileTrafficFeed:
+    """
+    Append-only CSV of traffic observations
+
+    Columns: `timestamp` and `traffic_level` (dataset-style `Timestamp`,
+    `Entry_Time`, `Nearby_Traffic_Level` also work). Only rows added since
+    the previous read are returned.
+    """
+
+    def __init__(self, path=DEFAULT_TRAFFIC_FEED_PATH):
+        """
+        Args:
+            path: CSV file appended to by the traffic sensors
+        """
+        self.path = path
+        self._rows_read = 0
+
+    def fetch(self):
+        """
+        Read rows appended since the last call
+
+        Returns:
+            pd.DataFrame or None: New observations
+        """
+        if not os.path.exists(self.path):
+            return None
+
+        feed = pd.read_csv(self.path)
+        if len(feed) < self._rows_read:
+            # File was rotated; start over
+            self._rows_read = 0
+        new_rows = feed.iloc[self._rows_read:]
+        self._rows_read = len(feed)
+        return new_rows if len(new_rows) else None
+
+
+def observations_from_frame(frame):
+    """
+    Convert feed or dataset rows into (day_of_week, hour, level code) arrays
+
+    Returns:
+        tuple: Three int arrays; rows with unknown levels or times are dropped
+    """
+    if 'timestamp' in frame.columns:
+        timestamps = pd.to_datetime(frame['timestamp'], errors='coerce')
+        hours = timestamps.dt.hour.to_numpy(dtype=np.float64)
+        levels = frame['traffic_level']
+    else:
+        timestamps = pd.to_datetime(frame['Timestamp'], errors='coerce')
+        hours = frame['Entry_Time'].to_numpy(dtype=np.float64)
+        levels = frame['Nearby_Traffic_Level']
+
+    days = timestamps.dt.dayofweek.to_numpy(dtype=np.float64)
+    codes = pd.Categorical(levels, categories=TRAFFIC_LEVELS).codes
+    valid = ~np.isnan(days) & ~np.isnan(hours) & (codes >= 0)
+    return days[valid].astype(np.int64), hours[valid].astype(np.int64), codes[valid].astype(np.int64)
+
+
+class TrafficContext:
+    """
+    Exponentially weighted traffic level distributions in a (7, 24, 3) array
+
+    Each observation moves its cell's distribution toward that level by
+    `alpha`. Cells that have never been observed start from the hour's
+    distribution across all weekdays, so the most likely level per cell is
+    always precomputed and a lookup is a single array index.
+    """
+
+    def __init__(self, traffic_counts, alpha=0.05, feed=None, ttl_seconds=300):
+        """
+        Args:
+            traffic_counts: int (24, 7, 3) historical counts (PatternTables.traffic_counts)
+            alpha: Weight of each new observation
+            feed: Source with fetch() returning new observation rows (optional)
+            ttl_seconds: Seconds between feed polls
+        """
+        self.alpha = alpha
+        self.feed = feed
+        self.ttl_seconds = ttl_seconds
+
+        counts = np.asarray(traffic_counts, dtype=np.float64).transpose(1, 0, 2)
+        totals = counts.sum(axis=-1, keepdims=True)
+        hour_counts = counts.sum(axis=0, keepdims=True)
+        hour_totals = hour_counts.sum(axis=-1, keepdims=True)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cell_dist = counts / totals
+            hour_dist = np.broadcast_to(hour_counts / hour_totals, counts.shape)
+        self.distributions = np.ascontiguousarray(np.where(totals > 0, cell_dist, np.nan_to_num(hour_dist)))
+
+        self._codes = self._argmax(self.distributions)
+        self._historical_codes = self._codes.copy()
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._polling = False
+        self._expires_at = 0.0
+
+    @staticmethod
+    def _argmax(distributions):
+        """Most likely level code per cell, -1 where nothing is known"""
+        return np.where(distributions.sum(axis=-1) > 0, distributions.argmax(axis=-1), -1).astype(np.int8)
+
+    def add_listener(self, callback):
+        """Call callback() whenever a cell's most likely level changes"""
+        self._listeners.append(callback)
+
+    def level(self, hour, day_of_week):
+        """
+        Most likely traffic level
+
+        Returns:
+            str or None: Low/Medium/High, or None if the hour was never observed
+        """
+        self._poll_if_stale()
+        code = self._codes[day_of_week, hour]
+        return TRAFFIC_LEVELS[code] if code >= 0 else None
+
+    def historical_level(self, hour, day_of_week):
+        """
+        Most likely traffic level from the historical counts alone
+
+        Returns:
+            str or None: Low/Medium/High, or None if the hour was never observed
+        """
+        code = self._historical_codes[day_of_week, hour]
+        return TRAFFIC_LEVELS[code] if code >= 0 else None
+
+    def has_drifted(self, hour, day_of_week):
+        """True if observations moved this cell away from its historical level"""
+        return self._codes[day_of_week, hour] != self._historical_codes[day_of_week, hour]
+
+    def ingest(self, days, hours, codes):
+        """
+        Apply a batch of observations (in arrival order)
+
+        Repeated cells get the same result as applying the observations one
+        by one: the cell decays by (1 - alpha)^k and the i-th of k
+        observations adds alpha * (1 - alpha)^(k - 1 - i) to its level.
+
+        Returns:
+            bool: True if any cell's most likely level changed
+        """
+        if len(days) == 0:
+            return False
+
+        cells = np.asarray(days) * 24 + np.asarray(hours)
+        order = np.argsort(cells, kind='stable')
+        sorted_cells = cells[order]
+        unique_cells, starts, counts = np.unique(sorted_cells, return_index=True, return_counts=True)
+
+        group = np.repeat(np.arange(len(unique_cells)), counts)
+        rank_from_end = counts[group] - 1 - (np.arange(len(sorted_cells)) - starts[group])
+        weights = self.alpha * (1 - self.alpha) ** rank_from_end
+
+        with self._lock:
+            flat = self.distributions.reshape(-1, len(TRAFFIC_LEVELS))
+            flat[unique_cells] *= ((1 - self.alpha) ** counts)[:, None]
+            np.add.at(flat, (sorted_cells, np.asarray(codes)[order]), weights)
+            self.distributions = flat.reshape(self.distributions.shape)
+
+            codes_before = self._codes
+            self._codes = self._argmax(self.distributions)
+            changed = not np.array_equal(codes_before, self._codes)
+
+        if changed:
+            for callback in self._listeners:
+                callback()
+        return changed
+
+    def ingest_frame(self, frame):
+        """Ingest feed rows or new dataset-format sensor rows"""
+        return self.ingest(*observations_from_frame(frame))
+
+    def poll(self):
+        """Read new feed rows and ingest them as one batch"""
+        try:
+            rows = self.feed.fetch() if self.feed else None
+            if rows is not None:
+                self.ingest_frame(rows)
+        except Exception as e:
+            print(f"[ERROR] Traffic feed failed: {e}")
+        finally:
+            with self._lock:
+                self._expires_at = time.monotonic() + self.ttl_seconds
+                self._polling = False
+
+    def _poll_if_stale(self):
+        """Poll the feed in the background once the TTL has passed (lookups never wait)"""
+        if self.feed is None or time.monotonic() < self._expires_at:
+            return
+        with self._lock:
+            if self._polling:
+                return
+            self._polling = True
+        threading.Thread(target=self.poll, name="traffic-feed", daemon=True).start()
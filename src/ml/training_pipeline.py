@@ -0,0 +1,539 @@
+"""
+Training Pipeline Module
+Feature engineering, candidate training and publishing for the prebooking model
+Engineered features are cached on disk keyed by a hash of the dataset, and
+the candidate models train in parallel worker processes, each limited to its
+own share of the cores. model_proper.py is the command-line entry point.
+"""
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+from xgboost import XGBClassifier
+
+from ml.distillation import distill_model
+from ml.feature_pipeline import CompiledFeaturePipeline, HOUR_PATTERN
+from ml.model_versions import create_version_dir, publish_version, prune_versions
+from ml.pattern_tables import build_pattern_tables
+from ml.section_forecaster import SectionDemandForecaster, FORECAST_FILE
+from ml.tree_export import export_tree_ensemble, check_parity
+from ml.availability_table import build_availability_table, TABLE_FILE
+from ml.predictor_prebooking import PrebookingPredictor
+from data.data_loader import ParkingDataLoader
+
+DATASET_PATH = os.path.join('resources', 'IIoT_Smart_Parking_Management (2).csv')
+
+# Bump when engineer_features changes, so old cached features are not reused
+FEATURE_CACHE_VERSION = 1
+
+CATEGORICAL_COLUMNS = ['Parking_Lot_Section', 'Vehicle_Type', 'Nearby_Traffic_Level', 'User_Type']
+
+# Only features available at prediction time
+FEATURE_COLUMNS = [
+    # User inputs (collected from user)
+    'Hour', 'DayOfWeek', 'Electric_Vehicle', 'Parking_Spot_ID',
+
+    # Engineered time features
+    'IsWeekend', 'Month', 'Hour_sin', 'Hour_cos',
+    'DayOfWeek_sin', 'DayOfWeek_cos', 'Hour_Pattern', 'DayOfWeek_Pattern',
+
+    # From dataset (historical data for that spot/section)
+    'Parking_Lot_Section_encoded', 'Vehicle_Type_encoded',
+    'Proximity_To_Exit', 'Reserved_Status',
+
+    # Weather & Traffic (available from forecast/sensors)
+    'Weather_Temperature', 'Weather_Precipitation', 'Nearby_Traffic_Level_encoded',
+
+    # Sensor readings (available in real-time)
+    'Sensor_Reading_Proximity', 'Sensor_Reading_Pressure', 'Sensor_Reading_Ultrasonic',
+
+    # Vehicle specifications (from user vehicle type)
+    'Vehicle_Type_Weight', 'Vehicle_Type_Height',
+
+    # User history (if available)
+    'User_Parking_History'
+]
+
+# Not available at prediction time
+EXCLUDED_FEATURES = ['Exit_Time', 'Parking_Duration', 'Payment_Amount',
+                     'Parking_Violation', 'Occupancy_Rate']
+
+# name -> (estimator class, parameters, thread-count parameter or None if single-threaded)
+CANDIDATE_MODELS = {
+    'Random Forest': (RandomForestClassifier, {
+        'n_estimators': 200, 'max_depth': 15, 'min_samples_split': 10,
+        'random_state': 42, 'class_weight': 'balanced'
+    }, 'n_jobs'),
+    'Gradient Boosting': (GradientBoostingClassifier, {
+        'n_estimators': 200, 'learning_rate': 0.1, 'max_depth': 7,
+        'min_samples_split': 10, 'random_state': 42
+    }, None),
+    'XGBoost': (XGBClassifier, {
+        'n_estimators': 200, 'max_depth': 7, 'learning_rate': 0.1,
+        'subsample': 0.8, 'colsample_bytree': 0.8,
+        'random_state': 42, 'eval_metric': 'logloss'
+    }, 'n_jobs')
+}
+
+REPORT_FILE = 'training_report.json'
+
+
+def dataset_hash(csv_path, chunk_size=1 << 20):
+    """
+    Hash of the dataset file contents and the feature code version
+
+    Returns:
+        str: Hex digest (first 16 characters of SHA-256)
+    """
+    digest = hashlib.sha256(f"features-v{FEATURE_CACHE_VERSION}".encode())
+    with open(csv_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def engineer_features(df):
+    """
+    Add the engineered time features, encodings and target to a raw dataset
+
+    Args:
+        df: Raw dataset (modified in place)
+
+    Returns:
+        tuple: (df, label_encoders dict)
+    """
+    # Parse timestamp to extract time features
+    timestamps = pd.to_datetime(df['Timestamp'])
+    df['DayOfWeek'] = timestamps.dt.dayofweek  # 0=Monday, 6=Sunday
+    df['Month'] = timestamps.dt.month
+    df['IsWeekend'] = (df['DayOfWeek'] >= 5).astype(int)
+
+    # Use Entry_Time as Hour (already in dataset)
+    df['Hour'] = df['Entry_Time']
+
+    # Cyclical encoding for time features
+    df['Hour_sin'] = np.sin(2 * np.pi * df['Hour'] / 24)
+    df['Hour_cos'] = np.cos(2 * np.pi * df['Hour'] / 24)
+    df['DayOfWeek_sin'] = np.sin(2 * np.pi * df['DayOfWeek'] / 7)
+    df['DayOfWeek_cos'] = np.cos(2 * np.pi * df['DayOfWeek'] / 7)
+
+    # Hour patterns (2=peak, 1=moderate, 0=off-peak), same table the serving pipeline uses
+    df['Hour_Pattern'] = HOUR_PATTERN[df['Hour'].to_numpy(dtype=np.int64) % 24].astype(int)
+
+    # Day patterns (weekday/weekend)
+    df['DayOfWeek_Pattern'] = (df['DayOfWeek'] < 5).astype(int)  # 1=Weekday, 0=Weekend
+
+    # Encode categorical variables
+    label_encoders = {}
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            le = LabelEncoder()
+            df[col + '_encoded'] = le.fit_transform(df[col].astype(str))
+            label_encoders[col] = le
+
+    # Target variable
+    df['Occupancy_Status_encoded'] = LabelEncoder().fit_transform(df['Occupancy_Status'])
+
+    return df, label_encoders
+
+
+def load_features(csv_path=DATASET_PATH, cache_dir=None):
+    """
+    Read the dataset with engineered features, from the cache when possible
+
+    Args:
+        csv_path: Raw dataset CSV
+        cache_dir: Directory of cached feature frames (None disables caching)
+
+    Returns:
+        tuple: (df, label_encoders, info dict with 'hash', 'cache' ('hit', 'miss'
+               or 'disabled') and 'seconds')
+    """
+    started = time.perf_counter()
+    data_hash = dataset_hash(csv_path)
+    cache_path = os.path.join(cache_dir, f"features-{data_hash}.pkl") if cache_dir else None
+
+    if cache_path and os.path.exists(cache_path):
+        try:
+            cached = joblib.load(cache_path)
+            info = {'hash': data_hash, 'cache': 'hit', 'seconds': time.perf_counter() - started}
+            return cached['df'], cached['label_encoders'], info
+        except Exception as e:
+            print(f"[WARNING] Could not read feature cache {cache_path}: {e}")
+
+    df, label_encoders = engineer_features(pd.read_csv(csv_path))
+
+    if cache_path:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            # Write then rename, so an interrupted run never leaves a partial cache file
+            tmp_path = cache_path + '.tmp'
+            joblib.dump({'df': df, 'label_encoders': label_encoders}, tmp_path)
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            print(f"[WARNING] Could not write feature cache {cache_path}: {e}")
+
+    info = {
+        'hash': data_hash,
+        'cache': 'miss' if cache_path else 'disabled',
+        'seconds': time.perf_counter() - started
+    }
+    return df, label_encoders, info
+
+
+def allocate_threads(names, n_cores, n_workers):
+    """
+    Threads per candidate so the concurrently running models share the cores
+
+    Single-threaded models get one thread; when every candidate runs at
+    once the remaining cores are split between the multi-threaded ones.
+
+    Returns:
+        dict: {name: thread count}
+    """
+    if n_workers < len(names):
+        share = max(1, n_cores // n_workers)
+        return {name: share if CANDIDATE_MODELS[name][2] else 1 for name in names}
+
+    threaded = [name for name in names if CANDIDATE_MODELS[name][2]]
+    spare = n_cores - (len(names) - len(threaded))
+    share = max(1, spare // len(threaded)) if threaded else 1
+    return {name: share if name in threaded else 1 for name in names}
+
+
+def train_candidate(name, n_threads, X_train, y_train, X_test, y_test):
+    """
+    Fit one candidate model and score it (runs in a worker process)
+
+    Returns:
+        dict: {'name', 'model', 'train_acc', 'test_acc', 'f1', 'predictions',
+               'fit_seconds', 'n_threads'}
+    """
+    estimator_class, params, thread_param = CANDIDATE_MODELS[name]
+    params = dict(params)
+    if thread_param:
+        params[thread_param] = n_threads
+    model = estimator_class(**params)
+
+    # Also cap OpenMP/BLAS pools the estimator doesn't control through n_jobs
+    try:
+        from threadpoolctl import threadpool_limits
+        limits = threadpool_limits(limits=n_threads)
+    except ImportError:
+        limits = None
+
+    try:
+        started = time.perf_counter()
+        model.fit(X_train, y_train)
+        fit_seconds = time.perf_counter() - started
+
+        y_pred_train = model.predict(X_train)
+        y_pred_test = model.predict(X_test)
+    finally:
+        if limits is not None:
+            limits.restore_original_limits()
+
+    return {
+        'name': name,
+        'model': model,
+        'train_acc': float(accuracy_score(y_train, y_pred_train)),
+        'test_acc': float(accuracy_score(y_test, y_pred_test)),
+        'f1': float(f1_score(y_test, y_pred_test, average='weighted')),
+        'predictions': y_pred_test,
+        'fit_seconds': fit_seconds,
+        'n_threads': n_threads
+    }
+
+
+def train_candidates(X_train, y_train, X_test, y_test, names=None, max_workers=None):
+    """
+    Train candidate models in parallel worker processes
+
+    Falls back to training one after another in this process when
+    max_workers is 1 or the process pool can't be used.
+
+    Args:
+        X_train, y_train, X_test, y_test: Scaled split
+        names: Candidates to train (default: all of CANDIDATE_MODELS)
+        max_workers: Worker processes (default: one per candidate, at most one per core)
+
+    Returns:
+        tuple: ({name: train_candidate result}, 'parallel' or 'sequential')
+    """
+    names = list(names or CANDIDATE_MODELS)
+    n_cores = os.cpu_count() or 1
+    n_workers = max(1, min(len(names), max_workers or n_cores, n_cores))
+    threads = allocate_threads(names, n_cores, n_workers)
+
+    if n_workers > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                futures = {
+                    name: pool.submit(train_candidate, name, threads[name], X_train, y_train, X_test, y_test)
+                    for name in names
+                }
+                return {name: future.result() for name, future in futures.items()}, 'parallel'
+        except (BrokenProcessPool, OSError) as e:
+            print(f"[WARNING] Parallel training unavailable ({e}) - training sequentially")
+
+    # One model at a time can use every core
+    return {
+        name: train_candidate(name, n_cores, X_train, y_train, X_test, y_test)
+        for name in names
+    }, 'sequential'
+
+
+def run_training(csv_path=DATASET_PATH, cache_dir=os.path.join('models', 'feature_cache'),
+                 names=None, max_workers=None, test_size=0.2, random_state=42):
+    """
+    Load features, split, scale and train every candidate
+
+    Args:
+        csv_path: Raw dataset CSV
+        cache_dir: Feature cache directory (None disables caching)
+        names: Candidates to train (default: all of CANDIDATE_MODELS)
+        max_workers: Worker processes for candidate training
+        test_size: Held-out share for evaluation
+        random_state: Split seed
+
+    Returns:
+        dict: {'df', 'features', 'missing_features', 'label_encoders', 'scaler',
+               'X_train_scaled', 'X_test_scaled', 'y_train', 'y_test',
+               'results' ({name: train_candidate result}), 'best_model_name',
+               'report'}
+    """
+    started = time.perf_counter()
+    df, label_encoders, feature_info = load_features(csv_path, cache_dir)
+
+    features = [f for f in FEATURE_COLUMNS if f in df.columns]
+    missing_features = [f for f in FEATURE_COLUMNS if f not in df.columns]
+
+    X = df[features].copy()
+    y = df['Occupancy_Status_encoded'].copy()
+
+    # Handle any missing values
+    X = X.fillna(X.mean())
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, random_state=random_state, stratify=y
+    )
+
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+
+    training_started = time.perf_counter()
+    results, mode = train_candidates(
+        X_train_scaled, y_train.to_numpy(), X_test_scaled, y_test.to_numpy(),
+        names=names, max_workers=max_workers
+    )
+    training_seconds = time.perf_counter() - training_started
+
+    best_model_name = max(results, key=lambda k: results[k]['test_acc'])
+
+    report = {
+        'dataset': {
+            'path': csv_path,
+            'hash': feature_info['hash'],
+            'rows': int(len(df)),
+            'feature_cache': feature_info['cache']
+        },
+        'features': features,
+        'missing_features': missing_features,
+        'split': {
+            'train': int(len(X_train)),
+            'test': int(len(X_test)),
+            'occupied_share': float((y == 1).mean())
+        },
+        'training_mode': mode,
+        'models': {
+            name: {
+                'train_acc': round(result['train_acc'], 4),
+                'test_acc': round(result['test_acc'], 4),
+                'f1': round(result['f1'], 4),
+                'fit_seconds': round(result['fit_seconds'], 3),
+                'n_threads': result['n_threads']
+            }
+            for name, result in results.items()
+        },
+        'best_model': best_model_name,
+        'timings': {
+            'features_s': round(feature_info['seconds'], 3),
+            'training_s': round(training_seconds, 3),
+            'total_s': round(time.perf_counter() - started, 3)
+        }
+    }
+
+    return {
+        'df': df,
+        'features': features,
+        'missing_features': missing_features,
+        'label_encoders': label_encoders,
+        'scaler': scaler,
+        'X_train_scaled': X_train_scaled,
+        'X_test_scaled': X_test_scaled,
+        'y_train': y_train,
+        'y_test': y_test,
+        'results': results,
+        'best_model_name': best_model_name,
+        'report': report
+    }
+
+
+def publish_training(training, model_dir='models', keep=3):
+    """
+    Save the best model and its serving artifacts as a new published version
+
+    Writes the pickles, pattern tables, section forecaster, the distilled
+    student (or the parity-checked NumPy export of the best model) with its
+    compiled feature pipeline, the availability table for the current month
+    and the training report; then publishes the
+    version and prunes old ones (versions leased by running apps are kept,
+    see model_versions.leased_versions).
+
+    Args:
+        training: Result of run_training (its 'report' is extended in place)
+        model_dir: Root model directory
+        keep: Versions kept by prune_versions
+
+    Returns:
+        dict: The training report with 'version', 'files', 'export',
+              'distillation', 'serving_model' and 'removed_versions' added
+    """
+    started = time.perf_counter()
+    report = training['report']
+    best_model_name = training['best_model_name']
+    best = training['results'][best_model_name]
+    best_model = best['model']
+    features = training['features']
+    label_encoders = training['label_encoders']
+    scaler = training['scaler']
+
+    os.makedirs(model_dir, exist_ok=True)
+
+    # Each run writes a new version; the running app picks it up via manifest.json
+    version, version_dir = create_version_dir(model_dir)
+    files = {
+        'model': os.path.join(version_dir, 'parking_predictor.pkl'),
+        'scaler': os.path.join(version_dir, 'scaler.pkl'),
+        'features': os.path.join(version_dir, 'feature_columns.pkl'),
+        'encoders': os.path.join(version_dir, 'label_encoders.pkl'),
+        'patterns': os.path.join(version_dir, 'pattern_tables.npz'),
+        'section_forecast': os.path.join(version_dir, FORECAST_FILE)
+    }
+
+    joblib.dump(best_model, files['model'])
+    joblib.dump(scaler, files['scaler'])
+    joblib.dump(features, files['features'])
+    joblib.dump(label_encoders, files['encoders'])
+
+    # Historical traffic/sensor/weather lookups used at prediction time
+    build_pattern_tables(training['df']).save(files['patterns'])
+
+    # Section x weekday x hour demand curves for the section cards
+    SectionDemandForecaster.fit(training['df']).save(files['section_forecast'])
+
+    # Export for serving without sklearn/xgboost (see tree_export.py)
+    ensemble_path = os.path.join(version_dir, 'tree_ensemble.npz')
+    pipeline_path = os.path.join(version_dir, 'feature_pipeline.npz')
+
+    evaluator = export_tree_ensemble(best_model)
+    parity = check_parity(best_model, evaluator, training['X_test_scaled'])
+
+    # Small student that mimics the best model; served instead of it if it agrees enough
+    student, distillation = distill_model(best_model, training['X_train_scaled'], training['X_test_scaled'])
+
+    if student is not None:
+        # The teacher stays in parking_predictor.pkl for offline use
+        student.save(ensemble_path)
+        serving_model = 'distilled'
+    elif parity['passed']:
+        evaluator.save(ensemble_path)
+        serving_model = 'numpy_export'
+    else:
+        serving_model = 'pickle'
+
+    if serving_model != 'pickle':
+        CompiledFeaturePipeline.from_fitted(features, label_encoders, scaler).save(pipeline_path)
+        files['tree_ensemble'] = ensemble_path
+        files['feature_pipeline'] = pipeline_path
+
+    # Precomputed lookups scored with the model this version serves; if the
+    # build fails the app falls back to live inference
+    table_path = os.path.join(version_dir, TABLE_FILE)
+    try:
+        table_started = time.perf_counter()
+        predictor = PrebookingPredictor(
+            model_dir=version_dir,
+            data_loader=ParkingDataLoader(report['dataset']['path'])
+        )
+        build_availability_table(predictor).save(table_path)
+        files['availability_table'] = table_path
+        report['timings']['availability_table_s'] = round(time.perf_counter() - table_started, 3)
+    except Exception as e:
+        print(f"[WARNING] Availability table not built: {e}")
+
+    report.update({
+        'version': version,
+        'files': files,
+        'export': {
+            'max_abs_diff': float(parity['max_abs_diff']),
+            'label_agreement': float(parity['label_agreement']),
+            'passed': bool(parity['passed'])
+        },
+        'distillation': distillation,
+        'serving_model': serving_model
+    })
+    report['timings']['publish_s'] = round(time.perf_counter() - started, 3)
+
+    report_path = os.path.join(version_dir, REPORT_FILE)
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    files['report'] = report_path
+
+    # Publish only after every file is written so the app never loads a partial version
+    publish_version(model_dir, version, {
+        'model': best_model_name,
+        'test_accuracy': round(float(best['test_acc']), 4),
+        'test_f1': round(float(best['f1']), 4),
+        'numpy_export': bool(parity['passed']),
+        'serving_model': serving_model,
+        'distillation_agreement': (
+            round(distillation['candidates'][distillation['selected']]['agreement'], 4)
+            if student is not None else None
+        )
+    })
+    report['removed_versions'] = prune_versions(model_dir, keep=keep)
+    return report
+
+
+def format_training_report(report):
+    """
+    Render the candidate results of a training report as printable lines
+
+    Returns:
+        list: Lines (header, one per candidate, then timings)
+    """
+    lines = [f"{'model':<28} {'train acc':>9} {'test acc':>9} {'f1':>7} {'fit s':>8} {'threads':>7}"]
+    for name, metrics in report['models'].items():
+        label = f"{name} (best)" if name == report['best_model'] else name
+        lines.append(
+            f"{label:<28} {metrics['train_acc']:>9.3f} {metrics['test_acc']:>9.3f} "
+            f"{metrics['f1']:>7.3f} {metrics['fit_seconds']:>8.2f} {metrics['n_threads']:>7d}"
+        )
+    timings = report['timings']
+    lines.append(
+        f"features {timings['features_s']:.2f}s (cache {report['dataset']['feature_cache']}), "
+        f"training {timings['training_s']:.2f}s ({report['training_mode']})"
+    )
+    return lines
@@ -0,0 +1,362 @@
+"""
+Tree Export Module
+Flattens a trained tree ensemble (RandomForest, GradientBoosting, XGBoost)
+into contiguous node arrays and evaluates them with plain NumPy
+The serving side (TreeEnsembleEvaluator) never imports sklearn or xgboost
+"""
+import json
+import numpy as np
+
+from ml.npz_mmap import load_npz
+
+FOREST = 'forest'        # average of per-tree probability of class 1
+BOOSTING = 'boosting'    # sigmoid(base margin + sum of tree outputs)
+
+
+class TreeEnsembleEvaluator:
+    """
+    Vectorized evaluator over flattened tree arrays
+
+    All trees share one set of node arrays; left/right hold global node
+    indices (-1 for leaves) and roots holds each tree's root index.
+    value holds the output of every node (internal nodes too, which is what
+    path-based feature attributions need).
+    """
+
+    def __init__(self, kind, feature, threshold, left, right, value, roots,
+                 base_margin=0.0, strict_less=False, max_depth=None, walk_arrays=None):
+        """
+        Args:
+            kind: FOREST or BOOSTING
+            feature: Split feature per node (-1 for leaves)
+            threshold: Split threshold per node
+            left / right: Child node indices (-1 for leaves)
+            value: Node output (class-1 probability for forests, margin for boosting)
+            roots: Root node index of each tree
+            base_margin: Starting margin for boosting models
+            strict_less: True if samples go left on x < threshold (XGBoost),
+                         False for x <= threshold (sklearn)
+            max_depth: Deepest path length (computed if omitted)
+            walk_arrays: (safe_feature, walk_left, walk_right) traversal arrays
+                         as written by save() (computed if omitted)
+        """
+        self.kind = str(kind)
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.base_margin = float(base_margin)
+        self.strict_less = bool(strict_less)
+        self.max_depth = int(max_depth) if max_depth is not None else self._compute_max_depth()
+
+        if walk_arrays is None:
+            walk_arrays = self._walk_arrays()
+        self._safe_feature, self._left, self._right = (np.asarray(a, dtype=np.int32) for a in walk_arrays)
+
+    def _walk_arrays(self):
+        """Leaves loop back to themselves so a fixed number of steps is safe"""
+        is_leaf = self.feature < 0
+        node_ids = np.arange(len(self.feature), dtype=np.int32)
+        return (
+            np.where(is_leaf, 0, self.feature),
+            np.where(is_leaf, node_ids, self.left),
+            np.where(is_leaf, node_ids, self.right)
+        )
+
+    def _compute_max_depth(self):
+        depth = 0
+        frontier = self.roots
+        while True:
+            internal = frontier[self.feature[frontier] >= 0]
+            if len(internal) == 0:
+                return depth
+            frontier = np.concatenate([self.left[internal], self.right[internal]])
+            depth += 1
+
+    def _descend(self, X):
+        """
+        Walk every row down every tree at once
+
+        Returns:
+            np.ndarray: (n_rows, n_trees) leaf node indices
+        """
+        nodes = np.repeat(self.roots[None, :], X.shape[0], axis=0)
+        rows = np.arange(X.shape[0])[:, None]
+        for _ in range(self.max_depth):
+            x = X[rows, self._safe_feature[nodes]]
+            if self.strict_less:
+                go_left = x < self.threshold[nodes]
+            else:
+                go_left = x <= self.threshold[nodes]
+            nodes = np.where(go_left, self._left[nodes], self._right[nodes])
+        return nodes
+
+    def _link(self, margin_or_mean):
+        if self.kind == FOREST:
+            return margin_or_mean
+        return 1.0 / (1.0 + np.exp(-margin_or_mean))
+
+    def predict_proba(self, X):
+        """
+        Predict class probabilities
+
+        Args:
+            X: (n_rows, n_features) scaled feature matrix
+
+        Returns:
+            np.ndarray: (n_rows, 2) array of [prob_class_0, prob_class_1]
+        """
+        X = np.asarray(X, dtype=np.float32)
+        leaf_values = self.value[self._descend(X)]
+        if self.kind == FOREST:
+            prob_1 = leaf_values.mean(axis=1)
+        else:
+            prob_1 = self._link(self.base_margin + leaf_values.sum(axis=1))
+        return np.column_stack([1.0 - prob_1, prob_1])
+
+    def predict_proba_with_contributions(self, X):
+        """
+        Predict class probabilities plus path-based feature contributions
+
+        Walking down a tree, each split adds value[child] - value[parent]
+        to the split feature (Saabas attribution), so for every row
+        bias + contributions.sum() equals the model output: the class-1
+        probability for forests, the log-odds margin for boosting. All rows
+        and trees are walked together in the same fixed number of steps as
+        predict_proba.
+
+        Args:
+            X: (n_rows, n_features) scaled feature matrix
+
+        Returns:
+            tuple: (probabilities (n_rows, 2), contributions (n_rows, n_features)
+                    toward class 1, bias)
+        """
+        X = np.asarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        nodes = np.repeat(self.roots[None, :], n_rows, axis=0)
+        rows = np.arange(n_rows)[:, None]
+        contributions = np.zeros(n_rows * n_features)
+
+        for _ in range(self.max_depth):
+            split_feature = self._safe_feature[nodes]
+            x = X[rows, split_feature]
+            if self.strict_less:
+                go_left = x < self.threshold[nodes]
+            else:
+                go_left = x <= self.threshold[nodes]
+            children = np.where(go_left, self._left[nodes], self._right[nodes])
+
+            # Leaves step onto themselves, so their delta is zero
+            delta = self.value[children] - self.value[nodes]
+            contributions += np.bincount(
+                (rows * n_features + split_feature).ravel(),
+                weights=delta.ravel(),
+                minlength=n_rows * n_features
+            )
+            nodes = children
+
+        contributions = contributions.reshape(n_rows, n_features)
+        leaf_values = self.value[nodes]
+        root_values = self.value[self.roots]
+
+        if self.kind == FOREST:
+            prob_1 = leaf_values.mean(axis=1)
+            contributions /= len(self.roots)
+            bias = float(root_values.mean())
+        else:
+            prob_1 = self._link(self.base_margin + leaf_values.sum(axis=1))
+            bias = self.base_margin + float(root_values.sum())
+
+        return np.column_stack([1.0 - prob_1, prob_1]), contributions, bias
+
+    def predict(self, X):
+        """Predict class labels (0 or 1)"""
+        probabilities = self.predict_proba(X)
+        return (probabilities[:, 1] > probabilities[:, 0]).astype(np.int64)
+
+    def save(self, path):
+        """
+        Save the flattened ensemble as an uncompressed .npz file
+
+        The traversal arrays are saved too, so load(mmap_mode='r') maps
+        everything evaluation touches instead of rebuilding it per process.
+        """
+        np.savez(
+            path,
+            kind=np.array(self.kind),
+            feature=self.feature,
+            threshold=self.threshold,
+            left=self.left,
+            right=self.right,
+            value=self.value,
+            roots=self.roots,
+            base_margin=np.array(self.base_margin),
+            strict_less=np.array(self.strict_less),
+            max_depth=np.array(self.max_depth),
+            safe_feature=self._safe_feature,
+            walk_left=self._left,
+            walk_right=self._right
+        )
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        """
+        Load an ensemble saved with save()
+
+        Args:
+            path: .npz file path
+            mmap_mode: Memory-map the node arrays (e.g. 'r') so worker
+                       processes share them instead of each reading a copy
+
+        Returns:
+            TreeEnsembleEvaluator
+        """
+        data = load_npz(path, mmap_mode=mmap_mode)
+        walk_names = ['safe_feature', 'walk_left', 'walk_right']
+        walk_arrays = [data[name] for name in walk_names] if all(name in data for name in walk_names) else None
+        return cls(
+            kind=data['kind'].item(),
+            feature=data['feature'],
+            threshold=data['threshold'],
+            left=data['left'],
+            right=data['right'],
+            value=data['value'],
+            roots=data['roots'],
+            base_margin=data['base_margin'].item(),
+            strict_less=data['strict_less'].item(),
+            max_depth=data['max_depth'].item(),
+            walk_arrays=walk_arrays
+        )
+
+
+def _append_sklearn_tree(arrays, tree, node_value):
+    """Append one sklearn Tree_ to the flat arrays, shifting child indices"""
+    offset = len(arrays['feature'])
+    is_leaf = tree.children_left < 0
+    arrays['roots'].append(offset)
+    arrays['feature'].extend(np.where(is_leaf, -1, tree.feature))
+    arrays['threshold'].extend(tree.threshold)
+    arrays['left'].extend(np.where(is_leaf, -1, tree.children_left + offset))
+    arrays['right'].extend(np.where(is_leaf, -1, tree.children_right + offset))
+    arrays['value'].extend(node_value)
+
+
+def _append_xgboost_tree(arrays, tree):
+    """
+    Append one tree from XGBoost's JSON model to the flat arrays
+    Internal node values are the cover-weighted mean of their children
+    """
+    offset = len(arrays['feature'])
+    left = np.asarray(tree['left_children'], dtype=np.int64)
+    right = np.asarray(tree['right_children'], dtype=np.int64)
+    # XGBoost compares in float32, so keep thresholds at float32 precision
+    conditions = np.asarray(tree['split_conditions'], dtype=np.float32).astype(np.float64)
+    cover = np.asarray(tree['sum_hessian'], dtype=np.float64)
+    is_leaf = left < 0
+
+    # Children always have larger ids than their parent, so fill bottom-up
+    value = np.where(is_leaf, conditions, 0.0)
+    for node in range(len(left) - 1, -1, -1):
+        if not is_leaf[node]:
+            weights = cover[[left[node], right[node]]]
+            children = value[[left[node], right[node]]]
+            value[node] = np.average(children, weights=weights) if weights.sum() > 0 else children.mean()
+
+    arrays['roots'].append(offset)
+    arrays['feature'].extend(np.where(is_leaf, -1, tree['split_indices']))
+    arrays['threshold'].extend(np.where(is_leaf, 0.0, conditions))
+    arrays['left'].extend(np.where(is_leaf, -1, left + offset))
+    arrays['right'].extend(np.where(is_leaf, -1, right + offset))
+    arrays['value'].extend(value)
+
+
+def export_tree_ensemble(model):
+    """
+    Flatten a fitted binary tree ensemble
+
+    Supports RandomForestClassifier, GradientBoostingClassifier and
+    XGBClassifier (binary:logistic). A GradientBoostingRegressor is read
+    as a log-odds model (e.g. a distilled student, see distillation.py).
+
+    Args:
+        model: Fitted classifier
+
+    Returns:
+        TreeEnsembleEvaluator
+    """
+    arrays = {'feature': [], 'threshold': [], 'left': [], 'right': [], 'value': [], 'roots': []}
+    model_type = type(model).__name__
+
+    if model_type in ('RandomForestClassifier', 'ExtraTreesClassifier'):
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            counts = tree.value[:, 0, :]
+            totals = counts.sum(axis=1)
+            _append_sklearn_tree(arrays, tree, counts[:, 1] / np.where(totals > 0, totals, 1))
+        return TreeEnsembleEvaluator(FOREST, **arrays)
+
+    if model_type == 'GradientBoostingClassifier':
+        if model.estimators_.shape[1] != 1:
+            raise ValueError("Only binary GradientBoostingClassifier models can be exported")
+
+        if model.init_ == 'zero':
+            base_margin = 0.0
+        else:
+            prior = model.init_.predict_proba(np.zeros((1, model.n_features_in_)))[0, 1]
+            prior = min(max(prior, 1e-15), 1 - 1e-15)
+            base_margin = float(np.log(prior / (1 - prior)))
+
+        for estimator in model.estimators_[:, 0]:
+            tree = estimator.tree_
+            _append_sklearn_tree(arrays, tree, model.learning_rate * tree.value[:, 0, 0])
+        return TreeEnsembleEvaluator(BOOSTING, base_margin=base_margin, **arrays)
+
+    if model_type == 'GradientBoostingRegressor':
+        base_margin = float(np.ravel(model.init_.predict(np.zeros((1, model.n_features_in_))))[0])
+        for estimator in model.estimators_[:, 0]:
+            tree = estimator.tree_
+            _append_sklearn_tree(arrays, tree, model.learning_rate * tree.value[:, 0, 0])
+        return TreeEnsembleEvaluator(BOOSTING, base_margin=base_margin, **arrays)
+
+    if model_type == 'XGBClassifier':
+        learner = json.loads(model.get_booster().save_raw('json'))['learner']
+        objective = learner['objective']['name']
+        if objective != 'binary:logistic':
+            raise ValueError(f"Unsupported XGBoost objective: {objective}")
+
+        base_score = float(learner['learner_model_param']['base_score'].strip('[]'))
+        base_margin = float(np.log(base_score / (1 - base_score)))
+
+        for tree in learner['gradient_booster']['model']['trees']:
+            _append_xgboost_tree(arrays, tree)
+        return TreeEnsembleEvaluator(BOOSTING, base_margin=base_margin, strict_less=True, **arrays)
+
+    raise ValueError(f"Unsupported model type for export: {model_type}")
+
+
+def check_parity(model, evaluator, X, atol=1e-5):
+    """
+    Compare the exported evaluator against the original model
+
+    Args:
+        model: Original fitted classifier
+        evaluator: TreeEnsembleEvaluator from export_tree_ensemble
+        X: Sample of scaled feature rows
+        atol: Largest allowed probability difference
+
+    Returns:
+        dict: {'max_abs_diff', 'label_agreement', 'passed'}
+    """
+    X = np.asarray(X, dtype=np.float32)
+    expected = model.predict_proba(X)
+    actual = evaluator.predict_proba(X)
+    max_abs_diff = float(np.abs(expected - actual).max())
+    agreement = float((expected.argmax(axis=1) == actual.argmax(axis=1)).mean())
+    return {
+        'max_abs_diff': max_abs_diff,
+        'label_agreement': agreement,
+        'passed': max_abs_diff <= atol
+    }
@@ -0,0 +1,213 @@
+"""
+Weather Provider Module
+Weather context for predictions as a dense (month, weekday, hour) table
+Historical averages form the base layer; pluggable forecast sources
+(e.g. a local forecast feed standing in for a weather API) overlay it
+"""
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+# Local forecast feed picked up when no sources are configured
+DEFAULT_FEED_PATH = os.path.join('resources', 'weather_forecast.csv')
+
+HISTORICAL_SOURCE = 'historical_average'
+
+
+def _valid_cells(rows):
+    """
+    Table cells of the feed rows that can be applied
+
+    Rows with a month, weekday or hour outside the table (or not a whole
+    number) or with a missing temperature/precipitation are dropped.
+
+    Returns:
+        tuple: ((month index, weekday, hour) arrays, boolean mask of kept rows)
+    """
+    month = np.asarray(rows['month'], dtype=np.float64)
+    day_of_week = np.asarray(rows['day_of_week'], dtype=np.float64)
+    hour = np.asarray(rows['hour'], dtype=np.float64)
+    valid = (
+        (month >= 1) & (month <= 12) & (month == np.round(month)) &
+        (day_of_week >= 0) & (day_of_week <= 6) & (day_of_week == np.round(day_of_week)) &
+        (hour >= 0) & (hour <= 23) & (hour == np.round(hour)) &
+        np.isfinite(np.asarray(rows['temperature'], dtype=np.float64)) &
+        np.isfinite(np.asarray(rows['precipitation'], dtype=np.float64))
+    )
+    cell = (
+        month[valid].astype(np.int64) - 1,
+        day_of_week[valid].astype(np.int64),
+        hour[valid].astype(np.int64)
+    )
+    return cell, valid
+
+
+class FileForecastSource:
+    """
+    Forecast feed read from a local CSV file
+
+    Columns: either `timestamp` or `month`, `day_of_week` (0=Monday), `hour`,
+    plus `temperature` and `precipitation`. Missing file = no forecast.
+    Any object with a `name` attribute and a `fetch()` method returning the
+    same dict of arrays can be used as a source.
+    """
+
+    name = 'forecast_feed'
+
+    def __init__(self, path=DEFAULT_FEED_PATH):
+        """
+        Args:
+            path: CSV file written by the forecast job
+        """
+        self.path = path
+
+    def fetch(self):
+        """
+        Read every forecast row in one pass
+
+        Returns:
+            dict or None: {'month', 'day_of_week', 'hour', 'temperature', 'precipitation'} arrays
+        """
+        if not os.path.exists(self.path):
+            return None
+
+        feed = pd.read_csv(self.path)
+        if 'timestamp' in feed.columns:
+            timestamps = pd.to_datetime(feed['timestamp'])
+            feed['month'] = timestamps.dt.month
+            feed['day_of_week'] = timestamps.dt.dayofweek
+            feed['hour'] = timestamps.dt.hour
+
+        return {
+            column: feed[column].to_numpy()
+            for column in ['month', 'day_of_week', 'hour', 'temperature', 'precipitation']
+        }
+
+
+class WeatherProvider:
+    """
+    Array-indexed weather lookups with a TTL-refreshed forecast overlay
+
+    The base table (historical averages) never changes. Each refresh
+    fetches every source once, writes all of their rows into a copy of
+    the table in one vectorized assignment and swaps it in, so lookups
+    never scan data and never see a half-applied refresh.
+    """
+
+    def __init__(self, base_table, sources=None, ttl_seconds=600):
+        """
+        Args:
+            base_table: float (12, 7, 24, 2) [temperature, precipitation] historical averages
+            sources: Forecast sources in increasing priority (later ones win)
+            ttl_seconds: Seconds before source data is refreshed
+        """
+        self.base_table = np.asarray(base_table, dtype=np.float64)
+        self.sources = list(sources or [])
+        self.ttl_seconds = ttl_seconds
+        self.source_names = [HISTORICAL_SOURCE] + [source.name for source in self.sources]
+
+        # (table, source code per cell), replaced as one tuple on refresh
+        self._state = (self.base_table, np.zeros(self.base_table.shape[:3], dtype=np.int8))
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._expires_at = 0.0
+
+        if self.sources:
+            self.refresh()
+
+    def add_listener(self, callback):
+        """Call callback() after every refresh that changed the table"""
+        self._listeners.append(callback)
+
+    def refresh(self):
+        """
+        Fetch all sources and rebuild the overlay (one batch per source)
+
+        A failing source or invalid rows are skipped; the refresh flag is
+        always cleared, so a bad feed never stops later refreshes.
+
+        Returns:
+            bool: True if any cell changed
+        """
+        try:
+            table = self.base_table.copy()
+            source_codes = np.zeros(self.base_table.shape[:3], dtype=np.int8)
+
+            for code, source in enumerate(self.sources, start=1):
+                try:
+                    rows = source.fetch()
+                    if not rows or len(rows['hour']) == 0:
+                        continue
+
+                    cell, valid = _valid_cells(rows)
+                    if not valid.all():
+                        print(f"[WARNING] Weather source {source.name}: skipped {int((~valid).sum())} invalid rows")
+                    table[cell + (0,)] = np.asarray(rows['temperature'], dtype=np.float64)[valid]
+                    table[cell + (1,)] = np.asarray(rows['precipitation'], dtype=np.float64)[valid]
+                    source_codes[cell] = code
+                except Exception as e:
+                    print(f"[ERROR] Weather source {source.name} failed: {e}")
+
+            with self._lock:
+                changed = not np.array_equal(table, self._state[0], equal_nan=True)
+                self._state = (table, source_codes)
+        finally:
+            with self._lock:
+                self._expires_at = time.monotonic() + self.ttl_seconds
+                self._refreshing = False
+
+        if changed:
+            for callback in self._listeners:
+                callback()
+        return changed
+
+    def _refresh_if_stale(self):
+        """Start a background refresh once the TTL has passed (lookups never wait)"""
+        if not self.sources or time.monotonic() < self._expires_at:
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self.refresh, name="weather-refresh", daemon=True).start()
+
+    def forecast(self, month, day_of_week, hour):
+        """
+        Weather for a month, weekday and hour
+
+        Returns:
+            dict or None: {'temperature', 'precipitation', 'source'}, None if unknown
+        """
+        self._refresh_if_stale()
+        table, source_codes = self._state
+        temperature, precipitation = table[month - 1, day_of_week, hour]
+        if np.isnan(temperature):
+            return None
+        return {
+            'temperature': float(temperature),
+            'precipitation': float(precipitation),
+            'source': self.source_names[source_codes[month - 1, day_of_week, hour]]
+        }
+
+    def historical(self, month, day_of_week, hour):
+        """
+        Historical average weather, ignoring the forecast overlay
+
+        Returns:
+            dict or None: {'temperature', 'precipitation', 'source'}, None if unknown
+        """
+        temperature, precipitation = self.base_table[month - 1, day_of_week, hour]
+        if np.isnan(temperature):
+            return None
+        return {
+            'temperature': float(temperature),
+            'precipitation': float(precipitation),
+            'source': HISTORICAL_SOURCE
+        }
+
+    def is_forecast(self, month, day_of_week, hour):
+        """True if a forecast source (not the historical average) covers this cell"""
+        return bool(self._state[1][month - 1, day_of_week, hour])
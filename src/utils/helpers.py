@@ -2,6 +2,7 @@
 Helper Utilities
 Common utility functions for the parking app
 """
+import uuid
 import streamlit as st
 
 def initialize_session_state():
@@ -24,6 +25,10 @@ def initialize_session_state():
     if 'user_inputs' not in st.session_state:
         st.session_state.user_inputs = {}
     
+    # Profile key for personalized predictions (a guest ID until there are accounts)
+    if 'user_id' not in st.session_state:
+        st.session_state.user_id = f"guest-{uuid.uuid4().hex[:12]}"
+    
     # Note: booking_system is initialized separately in app.py
     # to ensure it persists throughout the session
 
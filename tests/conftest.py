@@ -0,0 +1,90 @@
+"""
+Shared test fixtures
+Tests run from the repository root (the app's relative resources/ paths)
+with src/ on sys.path, like app.py. Model tests use a small forest trained
+and published once per session, never the local models/ directory.
+"""
+import os
+import sys
+from datetime import datetime
+
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+os.chdir(ROOT)
+
+from data.data_loader import ParkingDataLoader
+from data.booking_system import BookingSystem
+from ml import training_pipeline
+from ml.availability_table import build_availability_table
+from ml.model_versions import resolve_model_path
+from ml.predictor_prebooking import PrebookingPredictor
+from ml.traffic_context import FileTrafficFeed
+
+# Few shallow trees: training and publishing take seconds
+TEST_CANDIDATES = {
+    'Random Forest': (RandomForestClassifier, {
+        'n_estimators': 20, 'max_depth': 8, 'random_state': 42, 'class_weight': 'balanced'
+    }, 'n_jobs')
+}
+
+
+@pytest.fixture(scope='session')
+def data_loader():
+    """The bundled parking dataset (read-only, shared by all tests)"""
+    return ParkingDataLoader()
+
+
+@pytest.fixture
+def booking_system(data_loader):
+    """Fresh booking system with the seeded dummy bookings"""
+    return BookingSystem(data_loader, seed=42)
+
+
+@pytest.fixture(scope='session')
+def model_dir(tmp_path_factory):
+    """Root model directory with one version published by the training pipeline"""
+    model_dir = str(tmp_path_factory.mktemp('models'))
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(training_pipeline, 'CANDIDATE_MODELS', TEST_CANDIDATES)
+        training = training_pipeline.run_training(cache_dir=None, max_workers=1)
+        training_pipeline.publish_training(training, model_dir=model_dir)
+    return model_dir
+
+
+@pytest.fixture
+def make_predictor(model_dir, data_loader, tmp_path):
+    """
+    Build predictors on the published version
+
+    No forecast sources and an empty traffic feed, so predictions use the
+    historical context only; no availability table unless a path is given.
+    """
+    def make(**kwargs):
+        kwargs.setdefault('weather_sources', [])
+        kwargs.setdefault('traffic_feed', FileTrafficFeed(str(tmp_path / 'traffic_feed.csv')))
+        kwargs.setdefault('availability_table_path', str(tmp_path / 'no_table.npz'))
+        return PrebookingPredictor(
+            model_dir=resolve_model_path(model_dir)[1], data_loader=data_loader, **kwargs
+        )
+    return make
+
+
+@pytest.fixture
+def predictor(make_predictor):
+    """Predictor that always runs the model (no availability table)"""
+    return make_predictor()
+
+
+@pytest.fixture(scope='session')
+def availability_table(model_dir, data_loader, tmp_path_factory):
+    """Availability table of the published version for the current month"""
+    tmp_path = tmp_path_factory.mktemp('table')
+    predictor = PrebookingPredictor(
+        model_dir=resolve_model_path(model_dir)[1], data_loader=data_loader, weather_sources=[],
+        traffic_feed=FileTrafficFeed(str(tmp_path / 'traffic_feed.csv')),
+        availability_table_path=str(tmp_path / 'no_table.npz')
+    )
+    return build_availability_table(predictor, months=[datetime.now().month])
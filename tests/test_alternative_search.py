@@ -0,0 +1,107 @@
+"""
+Tests for the lot-wide top-k alternative search
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+import ml.predictor_prebooking as predictor_module
+from ml.alternative_search import INCOMPATIBLE_PENALTY, OCCUPANCY_BOUND_MARGIN, find_top_alternatives
+
+
+def in_this_month(hour, day_of_week):
+    """A datetime in the current month (the one the table is built for)"""
+    first = datetime.now().replace(day=1, hour=hour, minute=0, second=0, microsecond=0)
+    return first + timedelta(days=(day_of_week - first.weekday()) % 7)
+
+
+def brute_force(predictor, booking_system, when, vehicle_type, is_ev, exclude=None):
+    """Score every free spot; (score, spot) pairs, best first"""
+    hour, day_of_week = when.hour, when.weekday()
+    scored = []
+    for section in booking_system.cube_sections:
+        spot_ids = [
+            spot_id for spot_id in booking_system.get_available_spots_in_section(section, hour, day_of_week)
+            if (spot_id, section) != exclude
+        ]
+        if not spot_ids:
+            continue
+        rows = predictor.predict_many(spot_ids, section, when, vehicle_types=vehicle_type, is_ev=is_ev)
+        for spot_id, row in zip(spot_ids, rows):
+            penalty = 1.0 if row['size_compatible'] else INCOMPATIBLE_PENALTY
+            scored.append((float(row['probability_vacant']) * penalty, (int(spot_id), section)))
+    return sorted(scored, key=lambda item: -item[0])
+
+
+@pytest.mark.parametrize('hour, day_of_week, vehicle_type', [(9, 0, 'Sedan'), (13, 3, 'SUV'), (18, 5, 'Motorcycle')])
+def test_exact_with_a_table_and_historical_context(predictor, booking_system, availability_table,
+                                                  hour, day_of_week, vehicle_type):
+    predictor.availability_table = availability_table
+    when = in_this_month(hour, day_of_week)
+    exclude = (booking_system.get_available_spots_in_section(booking_system.cube_sections[0], hour, day_of_week)[0],
+               booking_system.cube_sections[0])
+
+    found = find_top_alternatives(predictor, booking_system, when, vehicle_type, k=5, exclude=exclude)
+    expected = brute_force(predictor, booking_system, when, vehicle_type, False, exclude)
+
+    assert [spot['score'] for spot in found] == pytest.approx([score for score, _ in expected[:5]])
+    assert exclude not in {(spot['spot_id'], spot['section']) for spot in found}
+
+
+def test_results_are_free_and_ranked(predictor, booking_system):
+    when = in_this_month(10, 2)
+    found = find_top_alternatives(predictor, booking_system, when, 'Truck', is_ev=True, k=4)
+
+    assert len(found) == 4
+    assert [spot['score'] for spot in found] == sorted((spot['score'] for spot in found), reverse=True)
+    for spot in found:
+        assert not booking_system.is_spot_booked(spot['spot_id'], spot['section'], 10, 2)
+        single = predictor.predict_for_prebooking(spot['spot_id'], spot['section'], when, 'Truck', True)
+        assert spot['probability_vacant'] == pytest.approx(single['probability_vacant'])
+
+
+def test_section_bounds_prune_without_a_table(predictor, booking_system):
+    when = in_this_month(10, 2)
+    free_spots = sum(
+        len(booking_system.get_available_spots_in_section(section, 10, 2)) for section in booking_system.cube_sections
+    )
+
+    find_top_alternatives(predictor, booking_system, when, 'Sedan', k=1, batch_size=4)
+    assert predictor.cache_stats()['model_runs'] < free_spots
+
+
+def test_full_sections_are_visited_last(predictor, booking_system, monkeypatch):
+    full = booking_system.cube_sections[0]
+    forecaster = predictor.section_forecaster
+    monkeypatch.setattr(
+        forecaster, 'occupancy', lambda section, day_of_week, hours: 1.0 if section == full else 0.0
+    )
+    visited = []
+    predict_many = predictor.predict_many
+
+    def record(spot_ids, section, *args, **kwargs):
+        visited.append(section)
+        return predict_many(spot_ids, section, *args, **kwargs)
+
+    monkeypatch.setattr(predictor, 'predict_many', record)
+    found = find_top_alternatives(predictor, booking_system, in_this_month(10, 2), 'Sedan', k=1)
+
+    # The full section's bound is the margin alone, below any decent spot elsewhere
+    assert found[0]['score'] > OCCUPANCY_BOUND_MARGIN
+    assert full not in visited
+
+
+def test_user_id_reaches_the_predictions(predictor, booking_system, monkeypatch):
+    # No profile store: the user falls back to vehicle defaults
+    monkeypatch.setattr(predictor_module, 'get_user_profile_store', lambda data_loader: None)
+    user_ids = []
+    predict_many = predictor.predict_many
+
+    def record(*args, **kwargs):
+        user_ids.append(kwargs.get('user_id'))
+        return predict_many(*args, **kwargs)
+
+    monkeypatch.setattr(predictor, 'predict_many', record)
+    find_top_alternatives(predictor, booking_system, in_this_month(10, 2), 'Sedan', k=2, user_id='U123')
+
+    assert user_ids and set(user_ids) == {'U123'}
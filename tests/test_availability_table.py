@@ -0,0 +1,125 @@
+"""
+Tests for the precomputed availability table
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from ml.availability_table import AvailabilityTable, TABLE_FILE, TABLE_VEHICLE_TYPES, build_availability_table
+from ml.predictor_prebooking import VEHICLE_TYPE_MAP
+
+# Table probabilities are stored as float32
+TOLERANCE = 1e-6
+MONTH = datetime.now().month
+
+
+class StormSource:
+    """Forecast source covering every hour of the current month"""
+
+    name = 'test_storm'
+
+    def fetch(self):
+        day_of_week, hour = np.indices((7, 24)).reshape(2, -1)
+        return {
+            'month': np.full(day_of_week.shape, MONTH), 'day_of_week': day_of_week, 'hour': hour,
+            'temperature': np.full(day_of_week.shape, 41.0), 'precipitation': np.full(day_of_week.shape, 60.0)
+        }
+
+
+def booking_datetime(hour, day_of_week):
+    """A datetime in the current month at this hour on this weekday"""
+    first = datetime.now().replace(day=1, hour=hour, minute=0, second=0, microsecond=0)
+    return first + timedelta(days=(day_of_week - first.weekday()) % 7)
+
+
+@pytest.fixture
+def table(availability_table):
+    return availability_table
+
+
+def test_table_shape_and_range(table, data_loader):
+    n_spots = len(data_loader.get_spot_table())
+    assert table.probabilities.shape == (n_spots, 1, 7, 24, len(TABLE_VEHICLE_TYPES), 2)
+    assert np.all((table.probabilities >= 0) & (table.probabilities <= 1))
+
+
+@pytest.mark.parametrize('mmap_mode', [None, 'r'])
+def test_saved_table_reloads_identically(table, tmp_path, mmap_mode):
+    path = str(tmp_path / TABLE_FILE)
+    table.save(path)
+    loaded = AvailabilityTable.load(path, mmap_mode=mmap_mode)
+
+    assert np.array_equal(np.asarray(loaded.probabilities), table.probabilities)
+    assert np.array_equal(loaded.spot_ids, table.spot_ids)
+    assert np.array_equal(loaded.sections, table.sections)
+
+
+@pytest.mark.parametrize('vehicle_type', ['Sedan', 'Motorcycle', 'Electric Vehicle'])
+def test_lookups_match_the_model(table, predictor, data_loader, vehicle_type):
+    vehicle_mapped = VEHICLE_TYPE_MAP.get(vehicle_type, 'Car')
+    for section in data_loader.get_all_sections():
+        spot_ids = data_loader.get_spots_by_section(section)[:5]
+        for day_of_week in (0, 3, 6):
+            for hour in (0, 8, 13, 18, 23):
+                for is_ev in (False, True):
+                    live = predictor.predict_many(
+                        spot_ids, section, booking_datetime(hour, day_of_week), vehicle_types=vehicle_type, is_ev=is_ev
+                    )
+                    looked_up = [
+                        table.lookup(spot_id, section, hour, day_of_week, vehicle_mapped, is_ev, MONTH)
+                        for spot_id in spot_ids
+                    ]
+                    many = table.lookup_many(spot_ids, section, hour, day_of_week, vehicle_mapped, is_ev, MONTH)
+
+                    assert np.allclose(looked_up, live['probability_vacant'], atol=TOLERANCE)
+                    assert np.array_equal(many, looked_up)
+
+
+def test_unknown_keys(table, data_loader):
+    section = data_loader.get_all_sections()[0]
+    assert table.lookup(99999, section, 8, 0, 'Car', False, MONTH) is None
+    assert table.lookup(1, section, 8, 0, 'Car', False, MONTH % 12 + 1) is None
+    assert np.isnan(table.lookup_many([99999], section, 8, 0, 'Car', False, MONTH)).all()
+
+
+def test_predictor_serves_from_the_table(table, predictor, data_loader):
+    section = data_loader.get_all_sections()[0]
+    spot_ids = data_loader.get_spots_by_section(section)[:10]
+    when = booking_datetime(9, 2)
+    predictor.availability_table = table
+    before = predictor.cache_stats()
+
+    served = predictor.predict_many(spot_ids, section, when, vehicle_types='SUV')
+    repeat = predictor.predict_many(spot_ids, section, when, vehicle_types='SUV')
+    after = predictor.cache_stats()
+
+    expected = table.lookup_many(spot_ids, section, 9, 2, VEHICLE_TYPE_MAP['SUV'], False, MONTH)
+    assert np.allclose(served['probability_vacant'], expected, atol=TOLERANCE)
+    assert np.array_equal(repeat['probability_vacant'], served['probability_vacant'])
+    # Table answers are as cheap as a cache hit, so they don't take LRU slots
+    assert after['table_hits'] - before['table_hits'] == 2 * len(spot_ids)
+    assert after['model_runs'] == before['model_runs']
+
+
+def test_live_context_bypasses_the_table(table, make_predictor, data_loader):
+    predictor = make_predictor(weather_sources=[StormSource()])
+    predictor.availability_table = table
+    section = data_loader.get_all_sections()[0]
+
+    predictor.predict_many(data_loader.get_spots_by_section(section)[:5], section, booking_datetime(9, 2))
+    assert predictor.cache_stats()['table_hits'] == 0
+
+
+def test_table_ignores_live_weather_and_traffic(table, make_predictor):
+    predictor = make_predictor(weather_sources=[StormSource()])
+    days, hours = np.indices((7, 24)).reshape(2, -1)
+    for code in range(3):
+        predictor.traffic_context.ingest(np.repeat(days, 200), np.repeat(hours, 200), np.full(200 * 168, code))
+        if predictor.traffic_context.has_drifted(9, 2):
+            break
+    assert predictor.weather_provider.is_forecast(MONTH, 2, 9)
+    assert predictor.traffic_context.has_drifted(9, 2)
+
+    rebuilt = build_availability_table(predictor, months=[MONTH])
+    assert np.array_equal(rebuilt.probabilities, table.probabilities)
@@ -0,0 +1,102 @@
+"""
+Tests for the batch spot allocator
+"""
+import pytest
+
+from data.batch_allocator import BatchAllocator, SPOT_SIZE_RANK, VEHICLE_SIZE_NEEDS
+
+VEHICLES = ['Sedan', 'SUV', 'Motorcycle', 'Truck']
+
+
+def _requests(n=60):
+    """Overlapping stays with mixed vehicle sizes and EV needs"""
+    return [
+        {'request_id': i, 'start_hour': 6 + i % 10, 'end_hour': 8 + i % 10 + i % 3,
+         'vehicle_type': VEHICLES[i % 4], 'needs_ev': i % 7 == 0}
+        for i in range(n)
+    ]
+
+
+def _free_for(booking_system, spot_id, section, start_hour, end_hour):
+    blocked = booking_system.get_blocked_hours(spot_id, section)
+    return not any(blocked >> hour & 1 for hour in range(start_hour, end_hour))
+
+
+@pytest.fixture
+def allocator(data_loader, booking_system):
+    return BatchAllocator(data_loader, booking_system)
+
+
+def test_every_request_is_assigned_or_unassigned(allocator):
+    requests = _requests() + [{'request_id': 'bad', 'start_hour': 20, 'end_hour': 18}]
+    result = allocator.allocate(requests)
+
+    assert 'bad' in result['unassigned']
+    assert len(result['assignments']) + len(result['unassigned']) == len(requests)
+    assert 0.0 < result['utilization'] <= 1.0
+
+
+def test_assignments_never_overlap(allocator, booking_system):
+    requests = _requests()
+    result = allocator.allocate(requests)
+
+    taken = {}
+    for assignment in result['assignments'].values():
+        key = (assignment['spot_id'], assignment['section'])
+        hours = set(range(assignment['start_hour'], assignment['end_hour']))
+        assert not taken.get(key, set()) & hours
+        taken.setdefault(key, set()).update(hours)
+        # Existing bookings (and recurring rules) are respected
+        assert _free_for(booking_system, *key, assignment['start_hour'], assignment['end_hour'])
+
+
+def test_spots_fit_the_vehicle_and_ev_needs(allocator, data_loader):
+    requests = {r['request_id']: r for r in _requests()}
+    spot_table = data_loader.get_spot_table().set_index(['Parking_Spot_ID', 'Parking_Lot_Section'])
+    result = allocator.allocate(list(requests.values()))
+
+    for request_id, assignment in result['assignments'].items():
+        spot = spot_table.loc[(assignment['spot_id'], assignment['section'])]
+        request = requests[request_id]
+        assert SPOT_SIZE_RANK.get(spot['Spot_Size'], 1) >= SPOT_SIZE_RANK[VEHICLE_SIZE_NEEDS[request['vehicle_type']]]
+        if request['needs_ev']:
+            assert spot['Electric_Vehicle'] == 1
+
+
+def test_section_restriction(allocator, data_loader):
+    section = data_loader.get_all_sections()[1]
+    result = allocator.allocate([{'request_id': 1, 'start_hour': 3, 'end_hour': 5, 'section': section}])
+    assert result['assignments'][1]['section'] == section
+
+
+def test_commit_books_every_hour(allocator, booking_system):
+    result = allocator.allocate(_requests(20), commit=True)
+
+    assert result['assignments']
+    for assignment in result['assignments'].values():
+        for hour in range(assignment['start_hour'], assignment['end_hour']):
+            assert booking_system.is_spot_booked(assignment['spot_id'], assignment['section'], hour)
+
+
+def test_rejected_commit_is_rolled_back(allocator, booking_system, monkeypatch):
+    requests = _requests(20)
+    rejected = next(iter(allocator.allocate(requests)['assignments'].items()))
+    rejected_id, rejected_stay = rejected
+
+    real_book_interval = booking_system.book_interval
+
+    def book_interval(spot_id, section, start_hour, end_hour, **kwargs):
+        if (spot_id, section, start_hour) == (rejected_stay['spot_id'], rejected_stay['section'],
+                                              rejected_stay['start_hour']):
+            return False
+        return real_book_interval(spot_id, section, start_hour, end_hour, **kwargs)
+
+    monkeypatch.setattr(booking_system, 'book_interval', book_interval)
+    result = allocator.allocate(requests, commit=True)
+
+    assert rejected_id in result['unassigned']
+    assert rejected_id not in result['assignments']
+    assert _free_for(booking_system, rejected_stay['spot_id'], rejected_stay['section'],
+                     rejected_stay['start_hour'], rejected_stay['end_hour'])
+    expected_distance = sum(a['distance_to_exit'] for a in result['assignments'].values())
+    assert result['total_walking_distance'] == pytest.approx(expected_distance, abs=0.01)
@@ -0,0 +1,266 @@
+"""
+Tests for the booking system's indexes, checked against a brute-force
+scan of the hourly bookings
+"""
+from datetime import date, timedelta
+
+import pytest
+
+import data.booking_system as booking_module
+
+WINDOWS = [(0, 2), (7, 9), (8, 12), (12, 13), (17, 20), (22, 24)]
+
+
+def free_for(booking_system, spot_id, section, start_hour, end_hour):
+    """Brute force: no blocked hour in [start_hour, end_hour)"""
+    blocked = booking_system.get_blocked_hours(spot_id, section)
+    return not any(blocked >> hour & 1 for hour in range(start_hour, end_hour))
+
+
+def free_gap(booking_system, spot_id, section, start_hour, end_hour):
+    """Brute force: the free interval around a window (None if not free)"""
+    if not free_for(booking_system, spot_id, section, start_hour, end_hour):
+        return None
+    blocked = booking_system.get_blocked_hours(spot_id, section)
+    gap_start, gap_end = start_hour, end_hour
+    while gap_start > 0 and not blocked >> (gap_start - 1) & 1:
+        gap_start -= 1
+    while gap_end < 24 and not blocked >> gap_end & 1:
+        gap_end += 1
+    return gap_start, gap_end
+
+
+# Best-fit placement
+
+@pytest.mark.parametrize('start_hour, end_hour', WINDOWS)
+def test_best_fit_picks_the_tightest_free_gap(booking_system, data_loader, start_hour, end_hour):
+    for section in data_loader.get_all_sections():
+        gaps = {
+            spot_id: free_gap(booking_system, spot_id, section, start_hour, end_hour)
+            for spot_id in data_loader.get_spots_by_section(section)
+        }
+        gaps = {spot_id: gap for spot_id, gap in gaps.items() if gap is not None}
+        best = booking_system.find_best_fit_spot(section, start_hour, end_hour)
+
+        if not gaps:
+            assert best is None
+            continue
+        assert best in gaps
+        assert gaps[best][1] - gaps[best][0] == min(gap[1] - gap[0] for gap in gaps.values())
+
+
+def test_invalid_window_has_no_best_fit(booking_system, data_loader):
+    section = data_loader.get_all_sections()[0]
+    assert booking_system.find_best_fit_spot(section, 5, 5) is None
+    assert booking_system.find_best_fit_spot(section, 20, 25) is None
+
+
+def test_book_interval_updates_the_gap_index(booking_system, data_loader):
+    section = data_loader.get_all_sections()[0]
+    spot_id = booking_system.find_best_fit_spot(section, 9, 11)
+
+    assert booking_system.book_interval(spot_id, section, 9, 11)
+    assert not booking_system.book_interval(spot_id, section, 10, 12)
+    assert spot_id not in booking_system._best_fit_candidates(section, 9, 11)
+    assert booking_system.free_intervals[(spot_id, section)] == \
+        booking_system._compute_free_intervals(spot_id, section)
+
+
+def test_book_best_fit_falls_through_to_the_next_candidate(booking_system, data_loader, monkeypatch):
+    section = data_loader.get_all_sections()[0]
+    candidates = list(booking_system._best_fit_candidates(section, 14, 16))
+    real_book_interval = booking_system.book_interval
+
+    def book_interval(spot_id, *args, **kwargs):
+        return False if spot_id == candidates[0] else real_book_interval(spot_id, *args, **kwargs)
+
+    monkeypatch.setattr(booking_system, 'book_interval', book_interval)
+    assert len(candidates) > 1
+    assert booking_system.book_best_fit(section, 14, 16) == candidates[1]
+
+
+# Occupancy cube
+
+def _booked_count(booking_system, data_loader, section, hour, day_of_week):
+    return sum(
+        booking_system.is_spot_booked(spot_id, section, hour, day_of_week)
+        for spot_id in data_loader.get_spots_by_section(section)
+    )
+
+
+@pytest.mark.parametrize('day_of_week', [0, 3, 6])
+def test_section_occupancy_matches_the_bookings(booking_system, data_loader, day_of_week):
+    for section in data_loader.get_all_sections():
+        total = len(data_loader.get_spots_by_section(section))
+        for hour in (0, 8, 13, 18, 23):
+            occupancy = booking_system.get_section_occupancy(section, hour, day_of_week)
+            booked = _booked_count(booking_system, data_loader, section, hour, day_of_week)
+            assert occupancy['total_spots'] == total
+            assert occupancy['booked_spots'] == booked
+            assert occupancy['available_spots'] == total - booked
+            assert occupancy['occupancy_percentage'] == pytest.approx(round(booked / total * 100, 1))
+
+
+def test_cube_slices_add_up(booking_system, data_loader):
+    section = data_loader.get_all_sections()[0]
+    by_size_and_ev = booking_system.get_occupancy_slice(section=section, day_of_week=2, hour=9)
+    by_ev = booking_system.get_occupancy_slice(section=section, day_of_week=2, hour=9, spot_size='Standard')
+
+    assert by_size_and_ev.shape == (3, 2)
+    assert by_size_and_ev.sum() == booking_system.get_section_occupancy(section, 9, 2)['booked_spots']
+    assert list(by_ev) == list(by_size_and_ev[1])
+    assert booking_system.get_occupancy_slice(section=section, day_of_week='Wednesday', hour=9).sum() == \
+        by_size_and_ev.sum()
+
+
+def test_booking_updates_the_cube(booking_system, data_loader):
+    section = data_loader.get_all_sections()[0]
+    spot_id = booking_system.find_best_fit_spot(section, 4, 6)
+    before = [booking_system.get_section_occupancy(section, 4, day)['booked_spots'] for day in range(7)]
+
+    assert booking_system.book_interval(spot_id, section, 4, 6)
+    after = [booking_system.get_section_occupancy(section, 4, day)['booked_spots'] for day in range(7)]
+    # Daily bookings count on every weekday
+    assert after == [count + 1 for count in before]
+
+
+def test_least_occupied_section(booking_system, data_loader):
+    section, percentage = booking_system.get_least_occupied_section(12, 4)
+    percentages = {s: o['occupancy_percentage'] for s, o in booking_system.get_all_sections_occupancy(12, 4).items()}
+    assert percentage == min(percentages.values())
+    assert percentages[section] == percentage
+
+
+# Availability bitmaps and adjacent-spot search
+
+def _bitmaps_match(booking_system, data_loader):
+    return all(
+        bool(booking_system._free_bitmaps[section][hour] >> int(spot_id) & 1) ==
+        free_for(booking_system, spot_id, section, hour, hour + 1)
+        for section in data_loader.get_all_sections()
+        for spot_id in data_loader.get_spots_by_section(section)
+        for hour in range(24)
+    )
+
+
+def test_bitmaps_match_the_blocked_hours(booking_system, data_loader):
+    assert _bitmaps_match(booking_system, data_loader)
+
+    section = data_loader.get_all_sections()[0]
+    spot_id = booking_system.find_best_fit_spot(section, 9, 11)
+    booking_system.book_interval(spot_id, section, 9, 11)
+    assert _bitmaps_match(booking_system, data_loader)
+
+
+@pytest.mark.parametrize('group_size, start_hour, end_hour', [(1, 5, 6), (2, 8, 10), (3, 13, 15), (4, 0, 3)])
+def test_adjacent_spots_match_brute_force(booking_system, data_loader, group_size, start_hour, end_hour):
+    found = booking_system.find_adjacent_spots(group_size, start_hour, end_hour)
+
+    for section in data_loader.get_all_sections():
+        spots = set(data_loader.get_spots_by_section(section))
+        expected = [
+            list(range(first, first + group_size))
+            for first in sorted(spots)
+            if all(
+                spot_id in spots and free_for(booking_system, spot_id, section, start_hour, end_hour)
+                for spot_id in range(first, first + group_size)
+            )
+        ]
+        assert found.get(section, []) == expected
+
+
+def test_adjacent_spots_in_one_section(booking_system, data_loader):
+    section = data_loader.get_all_sections()[2]
+    assert set(booking_system.find_adjacent_spots(2, 1, 3, section=section)) <= {section}
+    assert booking_system.find_adjacent_spots(0, 1, 3) == {}
+    assert booking_system.find_adjacent_spots(2, 3, 3) == {}
+
+
+# Recurring bookings
+
+class _Tomorrow(date):
+    """date whose today() is tomorrow (the booking system rolls its rules forward)"""
+
+    @classmethod
+    def today(cls):
+        return date.today() + timedelta(days=1)
+
+
+@pytest.fixture
+def section(data_loader):
+    return data_loader.get_all_sections()[0]
+
+
+def test_recurring_rule_books_its_weekday_only(booking_system, section):
+    today = date.today()
+    other_day = (today.weekday() + 1) % 7
+    spot_id = booking_system.find_best_fit_spot(section, 6, 8)
+    booked_before = booking_system.get_section_occupancy(section, 6, today.weekday())['booked_spots']
+
+    rule_id = booking_system.add_recurring_booking(spot_id, section, [today.weekday()], 6, 8)
+
+    assert rule_id is not None
+    assert booking_system.is_spot_booked(spot_id, section, 6)
+    assert booking_system.is_spot_booked(spot_id, section, 7)
+    assert not booking_system.is_spot_booked(spot_id, section, 6, other_day)
+    assert booking_system.get_blocked_hours(spot_id, section) & 0b11000000 == 0b11000000
+    assert spot_id not in booking_system._best_fit_candidates(section, 6, 8)
+    assert booking_system.get_section_occupancy(section, 6, today.weekday())['booked_spots'] == booked_before + 1
+
+
+def test_conflicting_and_ended_rules_are_rejected(booking_system, section):
+    today = date.today()
+    spot_id = booking_system.find_best_fit_spot(section, 6, 8)
+    booking_system.add_recurring_booking(spot_id, section, [today.weekday()], 6, 8)
+
+    assert booking_system.add_recurring_booking(spot_id, section, [today.weekday()], 7, 9) is None
+    assert booking_system.add_recurring_booking(
+        spot_id, section, [today.weekday()], 20, 22, end_date=today - timedelta(days=1)
+    ) is None
+    assert not booking_system.book_interval(spot_id, section, 7, 8)
+
+
+def test_rules_expand_lazily_per_date(booking_system, section):
+    today = date.today()
+    spot_id = booking_system.find_best_fit_spot(section, 6, 8)
+    rule_id = booking_system.add_recurring_booking(spot_id, section, [today.weekday()], 6, 8)
+
+    occurrences = booking_system.expand_recurring_bookings(today, today + timedelta(days=13))
+    dates = [day for day, items in occurrences.items() if any(o['rule_id'] == rule_id for o in items)]
+    assert dates == [today, today + timedelta(days=7)]
+    assert len(occurrences) == 14
+
+
+def test_future_rule_blocks_daily_bookings_but_not_today(booking_system, section):
+    today = date.today()
+    spot_id = booking_system.find_best_fit_spot(section, 3, 5)
+    rule_id = booking_system.add_recurring_booking(
+        spot_id, section, [today.weekday()], 3, 5, start_date=today + timedelta(days=7)
+    )
+
+    assert rule_id is not None
+    assert not booking_system.is_spot_booked(spot_id, section, 3)
+    assert not booking_system.book_interval(spot_id, section, 3, 4)
+
+
+def test_cancel_frees_the_spot(booking_system, section):
+    today = date.today()
+    spot_id = booking_system.find_best_fit_spot(section, 6, 8)
+    rule_id = booking_system.add_recurring_booking(spot_id, section, [today.weekday()], 6, 8)
+
+    assert booking_system.cancel_recurring_booking(rule_id)
+    assert not booking_system.cancel_recurring_booking(rule_id)
+    assert not booking_system.is_spot_booked(spot_id, section, 6)
+    assert spot_id in booking_system._best_fit_candidates(section, 6, 8)
+    assert _bitmaps_match(booking_system, booking_system.data_loader)
+
+
+def test_expired_rule_is_dropped_when_the_date_changes(booking_system, section, monkeypatch):
+    today = date.today()
+    spot_id = booking_system.find_best_fit_spot(section, 6, 8)
+    rule_id = booking_system.add_recurring_booking(spot_id, section, [today.weekday()], 6, 8, end_date=today)
+    assert spot_id not in booking_system._best_fit_candidates(section, 6, 8)
+
+    monkeypatch.setattr(booking_module, 'date', _Tomorrow)
+    assert spot_id in booking_system._best_fit_candidates(section, 6, 8)
+    assert rule_id not in booking_system.recurring_rules
@@ -0,0 +1,72 @@
+"""
+Tests for distilling the trained model into a small exported student
+"""
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from ml.distillation import STUDENT_CONFIGS, distill_model, format_report
+from ml.training_pipeline import DATASET_PATH, FEATURE_COLUMNS, load_features
+
+# The smallest students keep the tests fast; on the small held-out split they
+# agree with a shallow boosted teacher on roughly nine labels in ten
+TEST_CONFIGS = STUDENT_CONFIGS[:2]
+TEST_AGREEMENT = 0.9
+
+
+@pytest.fixture(scope='module')
+def teacher_and_rows():
+    """(fitted teacher, scaled training rows, scaled held-out rows)"""
+    df, _, _ = load_features(DATASET_PATH, cache_dir=None)
+    features = [f for f in FEATURE_COLUMNS if f in df.columns]
+    X = df[features].fillna(df[features].mean())
+    y = df['Occupancy_Status_encoded']
+    X_train, X_test, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    teacher = GradientBoostingClassifier(n_estimators=20, max_depth=2, random_state=42).fit(X_train_scaled, y_train)
+    return teacher, X_train_scaled, scaler.transform(X_test)
+
+
+def test_first_student_that_agrees_is_selected(teacher_and_rows):
+    teacher, X_train, X_eval = teacher_and_rows
+    student, report = distill_model(
+        teacher, X_train, X_eval, configs=TEST_CONFIGS, min_agreement=TEST_AGREEMENT, synthetic_rows=1000
+    )
+
+    assert report['passed'] and report['selected'] == 0
+    # Larger students aren't fitted once one clears the bar
+    assert len(report['candidates']) == 1
+    candidate = report['candidates'][0]
+    assert candidate['agreement'] >= TEST_AGREEMENT
+    assert candidate['mean_abs_diff'] < 0.1
+
+    # The reported agreement is what the exported student actually achieves
+    student_labels = student.predict_proba(X_eval)[:, 1] > 0.5
+    teacher_labels = teacher.predict_proba(X_eval)[:, 1] > 0.5
+    assert candidate['agreement'] == pytest.approx((student_labels == teacher_labels).mean())
+
+
+def test_no_student_is_exported_below_the_agreement_bar(teacher_and_rows):
+    teacher, X_train, X_eval = teacher_and_rows
+    configs = [dict(config, n_estimators=5) for config in STUDENT_CONFIGS[:2]]
+    student, report = distill_model(teacher, X_train, X_eval, configs=configs, min_agreement=1.01, synthetic_rows=0)
+
+    assert student is None
+    assert not report['passed'] and report['selected'] is None
+    assert [candidate['config'] for candidate in report['candidates']] == configs
+
+
+def test_report_lists_the_teacher_and_every_student(teacher_and_rows):
+    teacher, X_train, X_eval = teacher_and_rows
+    _, report = distill_model(
+        teacher, X_train, X_eval, configs=TEST_CONFIGS, min_agreement=TEST_AGREEMENT, synthetic_rows=0
+    )
+    lines = format_report(report)
+
+    assert len(lines) == 2 + len(report['candidates'])
+    assert lines[1].startswith('teacher')
+    assert lines[2].startswith('student d2 x50 (selected)')
+    assert np.all([len(line) == len(lines[0]) for line in lines[1:]])
@@ -0,0 +1,65 @@
+"""
+Tests for the compiled feature pipeline, checked against the pandas
+feature engineering + LabelEncoder + StandardScaler it replaces
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from ml.feature_pipeline import CompiledFeaturePipeline
+from ml.training_pipeline import DATASET_PATH, FEATURE_COLUMNS, engineer_features
+
+RAW_COLUMNS = [
+    'Hour', 'DayOfWeek', 'Month', 'Electric_Vehicle', 'Parking_Spot_ID', 'Parking_Lot_Section', 'Vehicle_Type',
+    'Proximity_To_Exit', 'Reserved_Status', 'Weather_Temperature', 'Weather_Precipitation',
+    'Nearby_Traffic_Level', 'Sensor_Reading_Proximity', 'Sensor_Reading_Pressure',
+    'Sensor_Reading_Ultrasonic', 'Vehicle_Type_Weight', 'Vehicle_Type_Height', 'User_Parking_History'
+]
+
+
+@pytest.fixture(scope='module')
+def fitted():
+    df, label_encoders = engineer_features(pd.read_csv(DATASET_PATH, nrows=500))
+    features = [f for f in FEATURE_COLUMNS if f in df.columns]
+    scaler = StandardScaler().fit(df[features])
+    return df, features, label_encoders, scaler
+
+
+def test_transform_matches_the_fitted_encoders_and_scaler(fitted):
+    df, features, label_encoders, scaler = fitted
+    pipeline = CompiledFeaturePipeline.from_fitted(features, label_encoders, scaler)
+    rows = df[RAW_COLUMNS].to_dict('records')
+
+    assert np.allclose(pipeline.transform(rows), scaler.transform(df[features]), atol=1e-5)
+
+
+def test_saved_pipeline_reloads_identically(fitted, tmp_path):
+    df, features, label_encoders, scaler = fitted
+    pipeline = CompiledFeaturePipeline.from_fitted(features, label_encoders, scaler)
+    path = str(tmp_path / 'feature_pipeline.npz')
+    pipeline.save(path)
+    loaded = CompiledFeaturePipeline.load(path)
+    rows = df[RAW_COLUMNS].head(50).to_dict('records')
+
+    assert loaded.feature_columns == pipeline.feature_columns
+    assert np.array_equal(loaded.transform(rows), pipeline.transform(rows))
+
+
+def test_unseen_category_raises_like_label_encoder(fitted):
+    df, features, label_encoders, scaler = fitted
+    pipeline = CompiledFeaturePipeline.from_fitted(features, label_encoders, scaler)
+    row = dict(df[RAW_COLUMNS].iloc[0], Parking_Lot_Section='Nowhere')
+
+    with pytest.raises(ValueError):
+        pipeline.transform([row])
+
+
+def test_out_buffer_is_written_in_place(fitted):
+    df, features, label_encoders, scaler = fitted
+    pipeline = CompiledFeaturePipeline.from_fitted(features, label_encoders, scaler)
+    rows = df[RAW_COLUMNS].head(10).to_dict('records')
+    out = np.zeros((10, len(features)), dtype=np.float32)
+
+    assert pipeline.transform(rows, out=out) is out
+    assert np.allclose(out, scaler.transform(df[features].head(10)), atol=1e-5)
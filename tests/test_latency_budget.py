@@ -0,0 +1,88 @@
+"""
+Tests for the deadline-bounded live prediction runner
+"""
+import threading
+
+import pytest
+
+from ml.latency_budget import LatencyBudget
+
+
+def cached():
+    return {'probability_vacant': 0.5}
+
+
+@pytest.fixture
+def gate():
+    """Holds live calls until the test releases them"""
+    gate = threading.Event()
+    yield gate
+    gate.set()
+
+
+def test_live_result_within_the_budget():
+    budget = LatencyBudget(budget_seconds=1.0)
+    result = budget.run('spot', lambda: {'probability_vacant': 0.9}, cached)
+
+    assert result == {'probability_vacant': 0.9}
+    assert budget.stats()['requests'] == 1
+    assert budget.stats()['timeouts'] == 0
+
+
+def test_slow_call_is_answered_by_the_fallback(gate):
+    budget = LatencyBudget(budget_seconds=0.05)
+
+    def live():
+        gate.wait()
+        return {'probability_vacant': 0.9}
+
+    result = budget.run('spot', live, cached)
+    assert result == {'probability_vacant': 0.5, 'fallback': True, 'fallback_reason': 'timeout'}
+    assert budget.stats()['timeouts'] == 1
+
+
+def test_failing_call_is_answered_by_the_fallback():
+    budget = LatencyBudget(budget_seconds=1.0)
+
+    def live():
+        raise RuntimeError('model unavailable')
+
+    result = budget.run('spot', live, cached)
+    assert result['fallback'] and result['fallback_reason'] == 'error'
+    assert budget.stats()['errors'] == 1
+
+
+def test_identical_in_flight_calls_are_joined(gate):
+    budget = LatencyBudget(budget_seconds=0.05)
+    calls = []
+
+    def live():
+        calls.append(1)
+        gate.wait()
+        return {'probability_vacant': 0.9}
+
+    budget.run('spot', live, cached)
+    budget.run('spot', live, cached)
+    budget.run('other spot', live, cached)
+    assert len(calls) == 2
+
+    # The stalled call finishes on the pool; the next request starts afresh
+    gate.set()
+    budget._executor.shutdown(wait=True)
+    assert budget._in_flight == {}
+
+
+def test_late_result_is_served_by_the_next_request(gate):
+    budget = LatencyBudget(budget_seconds=0.05)
+    stored = {}
+
+    def live():
+        gate.wait()
+        stored['spot'] = {'probability_vacant': 0.9}
+        return stored['spot']
+
+    assert budget.run('spot', live, lambda: stored.get('spot', cached()))['fallback']
+    gate.set()
+    result = budget.run('spot', live, lambda: stored.get('spot', cached()), budget_seconds=1.0)
+    assert result == {'probability_vacant': 0.9}
+    assert budget.stats()['requests'] == 2
@@ -0,0 +1,171 @@
+"""
+Tests for the process-wide model registry
+"""
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from ml.model_registry import ModelRegistry, PredictorHandle
+from ml.model_versions import (
+    LEASES_DIR, VERSIONS_DIR, create_version_dir, leased_versions, prune_versions, publish_version,
+    release_lease, resolve_model_path, write_lease
+)
+
+
+@pytest.fixture
+def registry():
+    registry = ModelRegistry()
+    yield registry
+    registry.clear()
+
+
+def test_each_directory_is_loaded_once(registry, model_dir, data_loader):
+    predictor = registry.get_predictor(model_dir, data_loader)
+
+    assert predictor.is_loaded
+    assert registry.get_predictor(model_dir) is predictor
+    with registry.acquire(model_dir) as pinned:
+        assert pinned is predictor
+
+
+def test_concurrent_first_access_loads_once(registry, model_dir, data_loader, monkeypatch):
+    loads = []
+    real_load_version = registry._load_version
+
+    def load_version(*args):
+        loads.append(args)
+        return real_load_version(*args)
+
+    monkeypatch.setattr(registry, '_load_version', load_version)
+    predictors = []
+    threads = [
+        threading.Thread(target=lambda: predictors.append(registry.get_predictor(model_dir, data_loader)))
+        for _ in range(6)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert len(predictors) == 6 and all(p is predictors[0] for p in predictors)
+
+
+def test_handles_load_lazily_and_forward_to_the_live_predictor(registry, model_dir, data_loader):
+    handle = registry.get_handle(model_dir, data_loader)
+
+    assert isinstance(handle, PredictorHandle)
+    assert not registry.is_loaded(model_dir)
+    assert handle.is_loaded
+    assert handle.predictor is registry.get_predictor(model_dir)
+    assert handle.cache_stats() == handle.predictor.cache_stats()
+
+
+def test_preload_loads_in_the_background(registry, model_dir, data_loader):
+    registry.preload(model_dir, data_loader)
+
+    deadline = time.monotonic() + 60
+    while not registry.is_loaded(model_dir) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert registry.is_loaded(model_dir)
+    assert registry.current_version(model_dir) is not None
+
+
+def test_clear_drops_loaded_predictors(registry, model_dir, data_loader):
+    predictor = registry.get_predictor(model_dir, data_loader)
+    registry.clear()
+
+    assert not registry.is_loaded(model_dir)
+    assert registry.get_predictor(model_dir) is not predictor
+
+
+# Version rollout
+
+@pytest.fixture
+def versioned_dir(model_dir, tmp_path):
+    """Private copy of the published model directory (tests publish more versions)"""
+    root = str(tmp_path / 'models')
+    shutil.copytree(model_dir, root, ignore=shutil.ignore_patterns(LEASES_DIR))
+    return root
+
+
+def publish_copy(model_dir, version):
+    """Publish a copy of the current version's artifacts as a new version"""
+    _, current_path = resolve_model_path(model_dir)
+    _, path = create_version_dir(model_dir, version)
+    for name in os.listdir(current_path):
+        shutil.copy2(os.path.join(current_path, name), path)
+    publish_version(model_dir, version)
+
+
+def test_refresh_swaps_in_a_new_version(registry, versioned_dir, data_loader):
+    old = registry.get_predictor(versioned_dir, data_loader)
+    assert not registry.refresh(versioned_dir)
+
+    publish_copy(versioned_dir, 'v-next')
+    assert registry.refresh(versioned_dir)
+
+    new = registry.get_predictor(versioned_dir)
+    assert registry.current_version(versioned_dir) == 'v-next'
+    assert new is not old and new.is_loaded
+    assert new.model_dir.endswith('v-next')
+    # The section forecaster is swapped together with the model
+    assert new.section_forecaster is not old.section_forecaster
+
+
+def test_pinned_version_outlives_a_swap(registry, versioned_dir, data_loader):
+    old_version = registry.current_version(versioned_dir) or resolve_model_path(versioned_dir)[0]
+    with registry.acquire(versioned_dir, data_loader) as pinned:
+        publish_copy(versioned_dir, 'v-next')
+        assert registry.refresh(versioned_dir)
+
+        assert pinned.is_loaded
+        assert registry.get_predictor(versioned_dir) is not pinned
+        assert registry._held_versions(registry._key(versioned_dir)) == {old_version, 'v-next'}
+        assert old_version in leased_versions(versioned_dir)
+
+    assert registry._held_versions(registry._key(versioned_dir)) == {'v-next'}
+    assert leased_versions(versioned_dir) == {'v-next'}
+
+
+def test_broken_version_is_never_swapped_in(registry, versioned_dir, data_loader):
+    live = registry.get_predictor(versioned_dir, data_loader)
+    version, _ = create_version_dir(versioned_dir, 'v-broken')
+    publish_version(versioned_dir, version)
+
+    assert not registry.refresh(versioned_dir)
+    assert registry.get_predictor(versioned_dir) is live
+
+
+def test_prune_keeps_leased_versions(versioned_dir):
+    first, _ = resolve_model_path(versioned_dir)
+    for version in ('v-2', 'v-3'):
+        publish_copy(versioned_dir, version)
+    write_lease(versioned_dir, {first})
+
+    assert prune_versions(versioned_dir, keep=1) == ['v-2']
+    assert os.path.isdir(os.path.join(versioned_dir, VERSIONS_DIR, first))
+
+    release_lease(versioned_dir)
+    assert prune_versions(versioned_dir, keep=1) == [first]
+    assert sorted(os.listdir(os.path.join(versioned_dir, VERSIONS_DIR))) == ['v-3']
+
+
+def test_leases_of_exited_processes_lapse(versioned_dir):
+    finished = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                              capture_output=True, text=True, check=True)
+    lease_dir = os.path.join(versioned_dir, LEASES_DIR)
+    os.makedirs(lease_dir, exist_ok=True)
+    stale = os.path.join(lease_dir, 'stale.json')
+    with open(stale, 'w') as f:
+        json.dump({'host': socket.gethostname(), 'pid': int(finished.stdout), 'versions': ['v-gone']}, f)
+
+    assert 'v-gone' not in leased_versions(versioned_dir)
+    assert not os.path.exists(stale)
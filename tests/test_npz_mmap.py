@@ -0,0 +1,72 @@
+"""
+Tests for memory-mapping .npz members
+"""
+import os
+
+import numpy as np
+
+from ml.model_versions import resolve_model_path
+from ml.npz_mmap import load_npz
+from ml.tree_export import TreeEnsembleEvaluator
+
+ARRAYS = {
+    'floats': np.arange(12, dtype=np.float64).reshape(3, 4),
+    'ints': np.arange(5, dtype=np.int32),
+    'fortran': np.asfortranarray(np.arange(6, dtype=np.float32).reshape(2, 3)),
+    'scalar': np.array(3.5),
+    'names': np.array(['a', 'bc'])
+}
+
+
+def is_mapped(array):
+    """True if the array's memory comes from an np.memmap (views drop the subclass)"""
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = getattr(array, 'base', None)
+    return False
+
+
+def test_stored_members_are_memory_mapped(tmp_path):
+    path = str(tmp_path / 'arrays.npz')
+    np.savez(path, **ARRAYS)
+    loaded = load_npz(path, mmap_mode='r')
+
+    assert set(loaded) == set(ARRAYS)
+    for name in ('floats', 'ints', 'fortran', 'names'):
+        assert isinstance(loaded[name], np.memmap)
+    # 0-d members are read into memory
+    assert not isinstance(loaded['scalar'], np.memmap)
+    for name, array in ARRAYS.items():
+        assert np.array_equal(loaded[name], array)
+        assert loaded[name].dtype == array.dtype
+
+
+def test_compressed_members_are_read_into_memory(tmp_path):
+    path = str(tmp_path / 'arrays.npz')
+    np.savez_compressed(path, **ARRAYS)
+    loaded = load_npz(path, mmap_mode='r')
+
+    for name, array in ARRAYS.items():
+        assert not isinstance(loaded[name], np.memmap)
+        assert np.array_equal(loaded[name], array)
+
+
+def test_no_mmap_mode_reads_everything(tmp_path):
+    path = str(tmp_path / 'arrays.npz')
+    np.savez(path, **ARRAYS)
+    loaded = load_npz(path)
+
+    assert not any(isinstance(array, np.memmap) for array in loaded.values())
+    assert all(np.array_equal(loaded[name], array) for name, array in ARRAYS.items())
+
+
+def test_tree_export_maps_its_node_arrays(model_dir):
+    path = os.path.join(resolve_model_path(model_dir)[1], 'tree_ensemble.npz')
+    in_memory = TreeEnsembleEvaluator.load(path)
+    mapped = TreeEnsembleEvaluator.load(path, mmap_mode='r')
+    X = np.random.default_rng(0).normal(size=(50, in_memory.feature.max() + 1)).astype(np.float32)
+
+    assert is_mapped(mapped.value) and is_mapped(mapped._left)
+    assert not is_mapped(in_memory.value)
+    assert np.array_equal(mapped.predict_proba(X), in_memory.predict_proba(X))
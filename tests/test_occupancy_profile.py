@@ -0,0 +1,86 @@
+"""
+Tests for the sweep-line occupancy profile, checked against counting
+every stay hour by hour
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.occupancy_profile import HOURS_PER_WEEK, OccupancyProfile, build_occupancy_profile, stay_counts
+
+
+def brute_force_counts(section_codes, days, entry_hours, durations, n_sections):
+    """Walk every hour of every stay on the weekly timeline"""
+    counts = np.zeros((n_sections, HOURS_PER_WEEK), dtype=np.int64)
+    for section, day, entry, duration in zip(section_codes, days, entry_hours, durations):
+        start = day * 24 + int(np.floor(entry))
+        for offset in range(min(max(int(np.ceil(duration)), 1), HOURS_PER_WEEK)):
+            counts[section, (start + offset) % HOURS_PER_WEEK] += 1
+    return counts.reshape(n_sections, 7, 24)
+
+
+def test_counts_match_brute_force():
+    rng = np.random.default_rng(0)
+    n = 500
+    stays = (
+        rng.integers(0, 3, n), rng.integers(0, 7, n),
+        rng.uniform(0, 24, n), rng.uniform(0, 30, n)
+    )
+    assert np.array_equal(stay_counts(*stays, 3), brute_force_counts(*stays, 3))
+
+
+@pytest.mark.parametrize('day, entry, duration, expected_hours', [
+    (0, 9.0, 2.0, [(0, 9), (0, 10)]),
+    (0, 9.5, 0.2, [(0, 9)]),                      # fractions: start rounds down, length rounds up
+    (6, 23.0, 3.0, [(6, 23), (0, 0), (0, 1)]),    # Sunday night wraps to Monday
+])
+def test_single_stays(day, entry, duration, expected_hours):
+    counts = stay_counts([0], [day], np.array([entry]), np.array([duration]), 1)
+
+    assert counts.sum() == len(expected_hours)
+    for hour_day, hour in expected_hours:
+        assert counts[0, hour_day, hour] == 1
+
+
+def test_week_long_stays_are_capped_at_one_week():
+    counts = stay_counts([0], [2], np.array([5.0]), np.array([500.0]), 1)
+    assert np.all(counts == 1)
+
+
+def test_no_stays():
+    assert stay_counts(np.array([], dtype=np.int64), np.array([], dtype=np.int64),
+                       np.array([]), np.array([]), 2).sum() == 0
+
+
+def test_profile_matches_each_sections_occupied_share(data_loader):
+    profile = build_occupancy_profile(data_loader.df)
+    df = data_loader.df
+    assert profile.sections == sorted(df['Parking_Lot_Section'].unique())
+    assert np.all((profile.rates >= 0) & (profile.rates <= 1))
+
+    for i, section in enumerate(profile.sections):
+        share = (df.loc[df['Parking_Lot_Section'] == section, 'Occupancy_Status'] == 'Occupied').mean()
+        # Scaled so the section's average hour is its occupied share (unless clipped at 1)
+        if profile.rates[i].max() < 1.0:
+            assert profile.rates[i].mean() == pytest.approx(share)
+
+
+def test_missing_durations_use_exit_time(data_loader):
+    df = data_loader.df.head(200).copy()
+    without_duration = df.assign(Parking_Duration=np.nan)
+    # Same stays, overnight ones wrapping past midnight
+    df['Parking_Duration'] = (df['Exit_Time'] - df['Entry_Time']) % 24
+    before = without_duration.copy()
+
+    assert np.allclose(build_occupancy_profile(without_duration).rates, build_occupancy_profile(df).rates)
+    pd.testing.assert_frame_equal(without_duration, before)
+
+
+def test_lookups():
+    rates = np.random.default_rng(1).uniform(size=(2, 7, 24))
+    profile = OccupancyProfile(['Zone A', 'Zone B'], rates)
+
+    assert profile.rate('Zone B', 9, 3) == rates[1, 3, 9]
+    assert profile.rate('Zone B', 9) == pytest.approx(rates[1, :, 9].mean())
+    assert np.array_equal(profile.hourly_curve('Zone A', 6), rates[0, 6])
+    assert profile.rate('Nowhere', 9) is None and profile.hourly_curve('Nowhere') is None
@@ -0,0 +1,112 @@
+"""
+Tests for the dense historical pattern tables, checked against pandas
+groupbys over the raw dataset
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml.pattern_tables import (
+    SENSOR_COLUMNS, TRAFFIC_LEVELS, WEATHER_COLUMNS, WEATHER_SHRINKAGE, PatternTables, build_pattern_tables
+)
+
+
+@pytest.fixture(scope='module')
+def frame(data_loader):
+    """Raw dataset plus parsed weekday and month"""
+    df = data_loader.df.copy()
+    timestamps = pd.to_datetime(df['Timestamp'])
+    df['DayOfWeek'] = timestamps.dt.dayofweek
+    df['Month'] = timestamps.dt.month
+    return df
+
+
+@pytest.fixture(scope='module')
+def tables(data_loader):
+    return build_pattern_tables(data_loader.df)
+
+
+def test_build_leaves_the_frame_unchanged(data_loader):
+    before = data_loader.df.copy()
+    build_pattern_tables(data_loader.df)
+    pd.testing.assert_frame_equal(data_loader.df, before)
+
+
+def test_traffic_level_is_the_mode(tables, frame):
+    modes = frame.groupby(['Entry_Time', 'DayOfWeek'])['Nearby_Traffic_Level'].agg(lambda s: s.mode()[0])
+    hour_modes = frame.groupby('Entry_Time')['Nearby_Traffic_Level'].agg(lambda s: s.mode()[0])
+
+    for hour in range(24):
+        for day_of_week in range(7):
+            expected = modes.get((hour, day_of_week), hour_modes.get(hour))
+            assert tables.traffic_level(hour, day_of_week) == expected
+
+
+def test_traffic_counts_match_the_crosstab(tables, frame):
+    counts = frame.groupby(['Entry_Time', 'DayOfWeek', 'Nearby_Traffic_Level']).size()
+    for (hour, day_of_week, level), count in counts.items():
+        assert tables.traffic_counts[hour, day_of_week, TRAFFIC_LEVELS.index(level)] == count
+    assert tables.traffic_counts.sum() == len(frame)
+
+
+def test_sensor_means_per_hour(tables, frame):
+    means = frame.groupby('Entry_Time')[list(SENSOR_COLUMNS.values())].mean()
+    for hour in range(24):
+        average = tables.sensor_average(hour)
+        for name, column in SENSOR_COLUMNS.items():
+            if hour in means.index:
+                assert average[name] == pytest.approx(means.loc[hour, column])
+            else:
+                assert np.isnan(average[name])
+
+
+def test_weather_is_shrunk_toward_the_hour_mean(tables, frame):
+    cells = frame.groupby(['Month', 'DayOfWeek', 'Entry_Time'])[WEATHER_COLUMNS].agg(['sum', 'count'])
+    hour_means = frame.groupby('Entry_Time')[WEATHER_COLUMNS].mean()
+
+    for (month, day_of_week, hour), row in cells.head(200).iterrows():
+        for k, column in enumerate(WEATHER_COLUMNS):
+            expected = (row[(column, 'sum')] + WEATHER_SHRINKAGE * hour_means.loc[hour, column]) / \
+                (row[(column, 'count')] + WEATHER_SHRINKAGE)
+            assert tables.weather[month - 1, day_of_week, hour, k] == pytest.approx(expected)
+
+    # Cells without data fall back to the hour's mean
+    hour = hour_means.index[0]
+    empty = [(m, d) for m in range(1, 13) for d in range(7) if (m, d, hour) not in cells.index]
+    assert empty
+    for month, day_of_week in empty:
+        assert np.allclose(tables.weather[month - 1, day_of_week, hour], hour_means.loc[hour])
+
+
+def test_saved_tables_reload_identically(tables, tmp_path):
+    path = str(tmp_path / 'pattern_tables.npz')
+    tables.save(path)
+    loaded = PatternTables.load(path)
+
+    assert np.array_equal(loaded.traffic_counts, tables.traffic_counts)
+    assert np.array_equal(loaded.traffic_codes, tables.traffic_codes)
+    assert np.array_equal(loaded.sensor_means, tables.sensor_means, equal_nan=True)
+    assert np.array_equal(loaded.weather, tables.weather, equal_nan=True)
+
+
+def test_other_format_versions_are_rejected(tables, tmp_path):
+    path = str(tmp_path / 'pattern_tables.npz')
+    np.savez(path, traffic_counts=tables.traffic_counts, sensor_means=tables.sensor_means, weather=tables.weather)
+
+    with pytest.raises(ValueError):
+        PatternTables.load(path)
+
+
+def test_predictor_rebuilds_outdated_pattern_tables(make_predictor, tables, monkeypatch):
+    loads = []
+
+    def load(path):
+        loads.append(path)
+        raise ValueError('pattern tables format 1, expected 2')
+
+    monkeypatch.setattr(PatternTables, 'load', staticmethod(load))
+    predictor = make_predictor()
+
+    assert loads
+    assert np.array_equal(predictor.pattern_tables.traffic_counts, tables.traffic_counts)
+    assert predictor.weather_provider is not None and predictor.traffic_context is not None
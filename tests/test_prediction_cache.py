@@ -0,0 +1,82 @@
+"""
+Tests for the LRU + TTL prediction cache
+"""
+import pytest
+
+import ml.prediction_cache as cache_module
+from ml.prediction_cache import PredictionCache
+
+
+class FakeClock:
+    """Stands in for time.monotonic"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module.time, 'monotonic', clock)
+    return clock
+
+
+def test_hit_and_miss_counters():
+    cache = PredictionCache(maxsize=4)
+    assert cache.get('a') is None
+    cache.put('a', 1)
+    assert cache.get('a') == 1
+
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'size': 1, 'hit_rate': 0.5}
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = PredictionCache(maxsize=4, ttl_seconds=10)
+    cache.put('a', 1)
+
+    clock.now += 9.9
+    assert cache.get('a') == 1
+    clock.now += 0.2
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_put_refreshes_the_ttl(clock):
+    cache = PredictionCache(maxsize=4, ttl_seconds=10)
+    cache.put('a', 1)
+    clock.now += 8
+    cache.put('a', 2)
+    clock.now += 8
+    assert cache.get('a') == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(maxsize=3)
+    for key in 'abc':
+        cache.put(key, key)
+
+    cache.get('a')      # 'b' is now the least recently used
+    cache.put('d', 'd')
+
+    assert cache.get('b') is None
+    assert [cache.get(key) for key in 'acd'] == ['a', 'c', 'd']
+    assert len(cache) == 3
+
+
+def test_clear():
+    cache = PredictionCache()
+    cache.put('a', 1)
+    cache.clear()
+    assert cache.get('a') is None
+
+
+def test_predictor_keys_normalize_equivalent_inputs(predictor, data_loader):
+    section = data_loader.get_all_sections()[0]
+    sedan = predictor._prediction_key(3, section, 9, 2, 'Sedan', True, 10)
+    assert predictor._prediction_key(3, section, 9.0, 2, 'SUV', 1, 10) == sedan
+    assert predictor._prediction_key(3, section, 9, 2, 'Motorcycle', True, 10) != sedan
+    assert predictor._prediction_key(3, section, 9, 2, 'Sedan', False, 10) != sedan
+    assert predictor._prediction_key(3, section, 9, 2, 'Sedan', True, 11) != sedan
@@ -0,0 +1,173 @@
+"""
+Tests for PrebookingPredictor's batched scoring and window predictions
+"""
+import copy
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from ml.predictor_prebooking import PREDICTION_DTYPE
+
+
+def at(hour, day_offset=1):
+    """A booking datetime day_offset days ahead at the given hour"""
+    return (datetime.now() + timedelta(days=day_offset)).replace(hour=hour, minute=0, second=0, microsecond=0)
+
+
+@pytest.fixture
+def section_spots(data_loader):
+    section = data_loader.get_all_sections()[1]
+    return section, data_loader.get_spots_by_section(section)[:8]
+
+
+def test_predict_many_matches_single_predictions(predictor, section_spots):
+    section, spot_ids = section_spots
+    when = at(9)
+    singles = [
+        predictor.predict_for_prebooking(spot_id, section, when, vehicle_type='SUV', is_ev=True)
+        for spot_id in spot_ids
+    ]
+    predictor.invalidate_cache()
+
+    batch = predictor.predict_many(spot_ids, section, when, vehicle_types='SUV', is_ev=True)
+
+    assert batch.dtype == PREDICTION_DTYPE
+    assert list(batch['spot_id']) == list(spot_ids)
+    assert np.allclose(batch['probability_vacant'], [s['probability_vacant'] for s in singles])
+    assert np.allclose(batch['probability_vacant'] + batch['probability_occupied'], 1.0)
+    assert list(batch['size_compatible']) == [s['size_compatible'] for s in singles]
+
+
+def test_predict_many_broadcasts_scalars_over_sequences(predictor, section_spots):
+    section, spot_ids = section_spots
+    hours = [at(hour) for hour in (7, 12, 19)]
+
+    one_spot_many_hours = predictor.predict_many(spot_ids[0], section, hours)
+    assert len(one_spot_many_hours) == 3
+    assert list(one_spot_many_hours['hour']) == [7, 12, 19]
+    assert set(one_spot_many_hours['spot_id']) == {spot_ids[0]}
+
+    mixed = predictor.predict_many(
+        spot_ids[:3], section, hours, vehicle_types=['Sedan', 'Motorcycle', 'Truck'], is_ev=[False, True, False]
+    )
+    for row, when, vehicle_type, is_ev in zip(mixed, hours, ['Sedan', 'Motorcycle', 'Truck'], [False, True, False]):
+        single = predictor.predict_for_prebooking(int(row['spot_id']), section, when, vehicle_type, is_ev)
+        assert row['probability_vacant'] == pytest.approx(single['probability_vacant'])
+        assert row['day_of_week'] == when.weekday()
+
+
+def test_predict_many_fills_the_cache(predictor, section_spots):
+    section, spot_ids = section_spots
+    predictor.predict_many(spot_ids, section, at(10))
+    runs = predictor.cache_stats()['model_runs']
+
+    predictor.predict_many(spot_ids, section, at(10))
+    stats = predictor.cache_stats()
+    assert stats['model_runs'] == runs
+    assert stats['hits'] >= len(spot_ids)
+
+
+def test_booking_month_drives_the_month_feature(predictor, section_spots, monkeypatch):
+    section, spot_ids = section_spots
+    months = []
+    build = predictor._build_prebooking_features
+
+    def build_prebooking_features(*args, **kwargs):
+        features = build(*args, **kwargs)
+        months.append(features['Month'])
+        return features
+
+    monkeypatch.setattr(predictor, '_build_prebooking_features', build_prebooking_features)
+    march, july = datetime(2030, 3, 6, 9), datetime(2030, 7, 3, 9)
+    assert march.weekday() == july.weekday()
+
+    predictor.predict_many(spot_ids[0], section, [march, july])
+    predictor.predict_for_prebooking(spot_ids[1], section, july)
+
+    assert months == [3, 7, 7]
+    # Same spot, hour and weekday in another month is another cache entry
+    assert predictor.cache_stats()['model_runs'] == 3
+
+
+def test_unloaded_predictor_returns_neutral_rows(predictor, section_spots):
+    section, spot_ids = section_spots
+    predictor.is_loaded = False
+    rows = predictor.predict_many(spot_ids, section, at(10))
+    assert np.all(rows['probability_vacant'] == 0.5)
+    assert predictor.predict_for_prebooking(spot_ids[0], section, at(10))['prediction'] == 'Unknown'
+
+
+# Whole-stay predictions
+
+def test_window_covers_every_hour_of_the_stay(predictor, section_spots):
+    section, spot_ids = section_spots
+    entry = at(9).replace(minute=30)
+    window = predictor.predict_window(spot_ids[0], section, entry, at(12).replace(minute=15), vehicle_type='SUV')
+
+    assert [when.hour for when in window['hour_starts']] == [9, 10, 11, 12]
+    assert list(window['hourly']['hour']) == [9, 10, 11, 12]
+    hourly = window['hourly']['probability_vacant']
+    for when, probability in zip(window['hour_starts'], hourly):
+        single = predictor.predict_for_prebooking(spot_ids[0], section, when, vehicle_type='SUV')
+        assert probability == pytest.approx(single['probability_vacant'])
+
+    assert window['probability_stay'] == pytest.approx(np.prod(hourly))
+    assert window['weakest_probability'] == pytest.approx(hourly.min())
+    assert window['weakest_hour'] == window['hour_starts'][int(np.argmin(hourly))]
+
+
+def test_overnight_window_wraps_to_the_next_day(predictor, section_spots):
+    section, spot_ids = section_spots
+    entry = at(22)
+    window = predictor.predict_window(spot_ids[0], section, entry, entry.replace(hour=2))
+
+    assert [when.hour for when in window['hour_starts']] == [22, 23, 0, 1]
+    assert window['hour_starts'][2].date() == (entry + timedelta(days=1)).date()
+    assert list(window['hourly']['day_of_week'][2:]) == [(entry.weekday() + 1) % 7] * 2
+
+
+def test_window_is_capped_at_a_day(predictor, section_spots):
+    section, spot_ids = section_spots
+    window = predictor.predict_window(spot_ids[0], section, at(8), at(8) + timedelta(days=2))
+    assert len(window['hour_starts']) == 24
+
+
+# Feature contributions
+
+@pytest.fixture
+def scored_with_contributions(predictor, monkeypatch):
+    """with_contributions flag of every _score_feature_rows call"""
+    calls = []
+    score = predictor._score_feature_rows
+
+    def score_feature_rows(feature_rows, with_contributions=False):
+        calls.append(with_contributions)
+        return score(feature_rows, with_contributions=with_contributions)
+
+    monkeypatch.setattr(predictor, '_score_feature_rows', score_feature_rows)
+    return calls
+
+
+def test_numpy_export_caches_contributions_from_the_same_walk(predictor, section_spots, scored_with_contributions):
+    section, spot_ids = section_spots
+    assert predictor.explainer is predictor.model
+    predictor.predict_many(spot_ids, section, at(10))
+
+    assert scored_with_contributions == [True]
+    assert predictor.contribution_cache.stats()['size'] == len(spot_ids)
+
+
+def test_separate_explainer_only_runs_when_explaining(predictor, section_spots, scored_with_contributions):
+    section, spot_ids = section_spots
+    # As for a pickled model: the explainer is an export walked on its own
+    predictor.explainer = copy.copy(predictor.model)
+
+    predictor.predict_many(spot_ids, section, at(10))
+    assert scored_with_contributions == [False]
+    assert predictor.contribution_cache.stats()['size'] == 0
+
+    # Prefetching fills the contribution cache for rows already answered
+    predictor.predict_many(spot_ids, section, at(10), explain=True)
+    assert scored_with_contributions == [False, True]
+    assert predictor.contribution_cache.stats()['size'] == len(spot_ids)
@@ -0,0 +1,159 @@
+"""
+Tests for background prediction prefetching
+"""
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+
+import ml.prefetcher as prefetcher_module
+from ml.prefetcher import PREFETCH_CHUNK, PredictionPrefetcher
+
+WHEN = datetime(2030, 3, 6, 9)
+
+
+class FakePredictor:
+    """Records predict_many calls; each call waits until `gate` is set"""
+
+    is_loaded = True
+
+    def __init__(self):
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.started = threading.Event()
+
+    def predict_many(self, spot_ids, section, booking_datetime, **kwargs):
+        self.started.set()
+        self.gate.wait(5)
+        self.calls.append((list(spot_ids), section, kwargs))
+
+    @contextmanager
+    def acquire(self):
+        yield self
+
+
+class StaticHandle:
+    """Predictor handle that always pins the same predictor"""
+
+    def __init__(self, predictor):
+        self._predictor = predictor
+
+    @contextmanager
+    def acquire(self):
+        yield self._predictor
+
+
+@pytest.fixture
+def prefetcher():
+    prefetcher = PredictionPrefetcher(max_workers=1)
+    yield prefetcher
+    prefetcher._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def wait_for(prefetcher, session_id):
+    prefetcher._jobs[session_id]['future'].result(timeout=5)
+
+
+def test_work_is_scored_in_chunks(prefetcher):
+    fake = FakePredictor()
+    spot_ids = list(range(PREFETCH_CHUNK * 2 + 3))
+
+    assert prefetcher.prefetch('s1', fake, [('Zone A', WHEN, spot_ids)], 'SUV', True, user_id='U1')
+    wait_for(prefetcher, 's1')
+
+    assert [len(call[0]) for call in fake.calls] == [PREFETCH_CHUNK, PREFETCH_CHUNK, 3]
+    assert sum((call[0] for call in fake.calls), []) == spot_ids
+    assert fake.calls[0][2] == {'vehicle_types': 'SUV', 'is_ev': True, 'explain': True, 'user_id': 'U1'}
+
+
+def test_same_context_reuses_the_job(prefetcher):
+    fake = FakePredictor()
+    work = [('Zone A', WHEN, [1, 2, 3])]
+
+    assert prefetcher.prefetch('s1', fake, work)
+    wait_for(prefetcher, 's1')
+    assert not prefetcher.prefetch('s1', fake, work)
+    assert len(fake.calls) == 1
+    # Another session, vehicle or user is another job
+    assert prefetcher.prefetch('s2', fake, work)
+    assert prefetcher.prefetch('s1', fake, work, vehicle_type='Truck')
+
+
+def test_new_context_cancels_the_running_job(prefetcher):
+    fake = FakePredictor()
+    fake.gate.clear()
+    spot_ids = list(range(PREFETCH_CHUNK * 4))
+
+    prefetcher.prefetch('s1', fake, [('Zone A', WHEN, spot_ids)])
+    assert fake.started.wait(5)
+    assert prefetcher.is_running('s1')
+    first = prefetcher._jobs['s1']
+
+    prefetcher.prefetch('s1', fake, [('Zone B', WHEN, [7])])
+    assert first['cancelled'].is_set()
+    fake.gate.set()
+    first['future'].result(timeout=5)
+    wait_for(prefetcher, 's1')
+
+    # The running chunk finishes; the rest of the old job is dropped
+    assert [(call[0], call[1]) for call in fake.calls] == [(spot_ids[:PREFETCH_CHUNK], 'Zone A'), ([7], 'Zone B')]
+
+
+def test_cancel_drops_queued_work(prefetcher):
+    blocker = FakePredictor()
+    blocker.gate.clear()
+    queued = FakePredictor()
+
+    prefetcher.prefetch('busy', blocker, [('Zone A', WHEN, [1])])
+    assert blocker.started.wait(5)
+    prefetcher.prefetch('s1', queued, [('Zone A', WHEN, [2])])
+    future = prefetcher._jobs['s1']['future']
+
+    prefetcher.cancel('s1')
+    blocker.gate.set()
+    wait_for(prefetcher, 'busy')
+
+    assert future.cancelled()
+    assert not prefetcher.is_running('s1')
+    assert queued.calls == []
+
+
+def test_finished_jobs_expire(prefetcher, monkeypatch):
+    fake = FakePredictor()
+    work = [('Zone A', WHEN, [1])]
+    prefetcher.prefetch('s1', fake, work)
+    wait_for(prefetcher, 's1')
+    finished_at = prefetcher._jobs['s1']['finished_at']
+
+    monkeypatch.setattr(prefetcher_module.time, 'monotonic', lambda: finished_at + prefetcher.job_ttl + 1)
+    assert prefetcher.prefetch('s1', fake, work)
+    prefetcher._jobs['s1']['future'].result(timeout=5)
+    assert len(fake.calls) == 2
+
+
+def test_old_sessions_are_forgotten_beyond_max_jobs():
+    prefetcher = PredictionPrefetcher(max_workers=1, max_jobs=3)
+    fake = FakePredictor()
+    for i in range(6):
+        prefetcher.prefetch(f's{i}', fake, [('Zone A', WHEN, [i])])
+        wait_for(prefetcher, f's{i}')
+    prefetcher.prefetch('last', fake, [('Zone A', WHEN, [9])])
+
+    assert len(prefetcher._jobs) <= 4
+    assert 's0' not in prefetcher._jobs and 'last' in prefetcher._jobs
+    prefetcher._executor.shutdown(wait=True)
+
+
+def test_prefetched_rows_are_cache_hits(prefetcher, predictor, data_loader):
+    section = data_loader.get_all_sections()[0]
+    spot_ids = data_loader.get_spots_by_section(section)[:20]
+    prefetcher.prefetch('s1', StaticHandle(predictor), [(section, WHEN, spot_ids)])
+    wait_for(prefetcher, 's1')
+    runs = predictor.cache_stats()['model_runs']
+
+    predictor.predict_many(spot_ids, section, WHEN)
+    assert predictor.cache_stats()['model_runs'] == runs
+    # explain=True also cached the drivers for a later click
+    assert predictor.predict_for_prebooking(spot_ids[0], section, WHEN)['drivers'] is not None
@@ -0,0 +1,74 @@
+"""
+Tests for the section demand forecaster
+"""
+import os
+
+import numpy as np
+import pytest
+
+from data.occupancy_profile import build_occupancy_profile
+from ml.model_versions import resolve_model_path
+from ml.section_forecaster import FORECAST_FILE, RIDGE_ALPHAS, SectionDemandForecaster
+
+
+@pytest.fixture(scope='module')
+def forecaster(data_loader):
+    return SectionDemandForecaster.fit(data_loader.df)
+
+
+@pytest.fixture(scope='module')
+def profile(data_loader):
+    return build_occupancy_profile(data_loader.df)
+
+
+def test_curves_cover_every_section_weekday_and_hour(forecaster, data_loader):
+    assert forecaster.sections == sorted(data_loader.get_all_sections())
+    assert forecaster.curves.shape == (len(forecaster.sections), 7, 24)
+    assert np.all((forecaster.curves >= 0) & (forecaster.curves <= 1))
+    assert np.allclose(forecaster.forecast_all(), forecaster.curves)
+
+
+def test_fit_smooths_the_occupancy_profile(forecaster, profile):
+    assert forecaster.sections == profile.sections
+    assert np.abs(forecaster.curves - profile.rates).mean() < 0.1
+    # Each section keeps its own level
+    assert np.corrcoef(forecaster.curves.mean(axis=(1, 2)), profile.rates.mean(axis=(1, 2)))[0, 1] > 0.9
+
+
+def test_lookups_index_the_curves(forecaster):
+    section = forecaster.sections[1]
+    assert forecaster.occupancy(section, 2, 9) == pytest.approx(forecaster.curves[1, 2, 9])
+    assert forecaster.occupancy(section, 2, [9, 10, 11]) == pytest.approx(forecaster.curves[1, 2, 9:12].mean())
+    assert forecaster.occupancy('Nowhere', 2, 9) is None
+
+    by_section = forecaster.all_sections(4, [17, 18])
+    assert set(by_section) == set(forecaster.sections)
+    for i, section in enumerate(forecaster.sections):
+        assert by_section[section] == pytest.approx(forecaster.curves[i, 4, 17:19].mean())
+
+
+def test_as_profile_matches_the_curves(forecaster):
+    as_profile = forecaster.as_profile()
+    section = forecaster.sections[0]
+    assert np.array_equal(as_profile.hourly_curve(section, 3), forecaster.curves[0, 3])
+    assert as_profile.rate(section, 12) == pytest.approx(forecaster.curves[0, :, 12].mean())
+
+
+def test_stronger_ridge_flattens_the_sections(data_loader):
+    weak = SectionDemandForecaster.fit(data_loader.df, ridge_alpha=RIDGE_ALPHAS[0])
+    strong = SectionDemandForecaster.fit(data_loader.df, ridge_alpha=1e6)
+    assert strong.curves.mean(axis=(1, 2)).std() < weak.curves.mean(axis=(1, 2)).std()
+
+
+def test_saved_forecaster_reloads_identically(forecaster, tmp_path):
+    path = str(tmp_path / FORECAST_FILE)
+    forecaster.save(path)
+    loaded = SectionDemandForecaster.load(path)
+
+    assert loaded.sections == forecaster.sections
+    assert np.array_equal(loaded.curves, forecaster.curves)
+
+
+def test_predictor_serves_its_version_forecaster(predictor, model_dir):
+    saved = SectionDemandForecaster.load(os.path.join(resolve_model_path(model_dir)[1], FORECAST_FILE))
+    assert np.array_equal(predictor.section_forecaster.curves, saved.curves)
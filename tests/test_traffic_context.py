@@ -0,0 +1,111 @@
+"""
+Tests for the streaming traffic context (EWMA level distributions)
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml.pattern_tables import TRAFFIC_LEVELS, build_pattern_tables
+from ml.traffic_context import FileTrafficFeed, TrafficContext, observations_from_frame
+
+HIGH, LOW, MEDIUM = (TRAFFIC_LEVELS.index(level) for level in ('High', 'Low', 'Medium'))
+
+
+@pytest.fixture(scope='module')
+def traffic_counts(data_loader):
+    return build_pattern_tables(data_loader.df).traffic_counts
+
+
+def observations(n, seed=0):
+    """Random observations with many repeated cells"""
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 2, n), rng.integers(8, 11, n), rng.integers(0, 3, n)
+
+
+def test_starts_at_the_historical_level(traffic_counts):
+    context = TrafficContext(traffic_counts)
+    for day_of_week in range(7):
+        for hour in range(24):
+            assert context.level(hour, day_of_week) == context.historical_level(hour, day_of_week)
+            assert not context.has_drifted(hour, day_of_week)
+
+
+def test_batch_ingest_equals_sequential_updates(traffic_counts):
+    days, hours, codes = observations(300)
+    batched = TrafficContext(traffic_counts, alpha=0.1)
+    sequential = TrafficContext(traffic_counts, alpha=0.1)
+
+    batched.ingest(days, hours, codes)
+    for day_of_week, hour, code in zip(days, hours, codes):
+        sequential.ingest([day_of_week], [hour], [code])
+
+    assert np.allclose(batched.distributions, sequential.distributions)
+    assert np.array_equal(batched._codes, sequential._codes)
+
+
+def test_single_update_is_an_ewma(traffic_counts):
+    context = TrafficContext(traffic_counts, alpha=0.2)
+    before = context.distributions[3, 9].copy()
+    context.ingest([3], [9], [LOW])
+
+    expected = 0.8 * before
+    expected[LOW] += 0.2
+    assert np.allclose(context.distributions[3, 9], expected)
+    assert context.distributions[3, 9].sum() == pytest.approx(1.0)
+
+
+def test_sustained_observations_drift_the_level(traffic_counts):
+    context = TrafficContext(traffic_counts, alpha=0.1)
+    historical = context.historical_level(9, 2)
+    target = next(code for code in (HIGH, LOW, MEDIUM) if TRAFFIC_LEVELS[code] != historical)
+    changes = []
+    context.add_listener(lambda: changes.append(True))
+
+    assert context.ingest([2] * 40, [9] * 40, [target] * 40)
+    assert context.level(9, 2) == TRAFFIC_LEVELS[target]
+    assert context.historical_level(9, 2) == historical
+    assert context.has_drifted(9, 2)
+    assert not context.has_drifted(10, 2)
+    assert changes == [True]
+
+    # Observations that don't move any level don't notify
+    assert not context.ingest([2], [9], [target])
+    assert changes == [True]
+
+
+def test_feed_rows_are_read_once(tmp_path, traffic_counts):
+    path = tmp_path / 'traffic_feed.csv'
+    pd.DataFrame({
+        'timestamp': ['2026-03-04 09:15'] * 40, 'traffic_level': ['Low'] * 40
+    }).to_csv(path, index=False)
+    feed = FileTrafficFeed(str(path))
+    context = TrafficContext(traffic_counts, alpha=0.1, feed=feed)
+
+    context.poll()
+    assert context.level(9, 2) == 'Low'
+    assert feed.fetch() is None
+    assert FileTrafficFeed(str(tmp_path / 'missing.csv')).fetch() is None
+
+
+def test_observations_from_dataset_rows(data_loader):
+    days, hours, codes = observations_from_frame(data_loader.df)
+    assert len(days) == len(data_loader.df)
+    assert set(np.unique(codes)) <= {HIGH, LOW, MEDIUM}
+    assert np.array_equal(hours, data_loader.df['Entry_Time'].to_numpy())
+
+    invalid = pd.DataFrame({'timestamp': ['not a time', '2026-03-04 09:00'], 'traffic_level': ['Low', 'Gridlock']})
+    assert all(len(array) == 0 for array in observations_from_frame(invalid))
+
+
+def test_drift_invalidates_the_predictor_cache(predictor, data_loader):
+    section = data_loader.get_all_sections()[0]
+    when = datetime(2026, 3, 4, 9)
+    predictor.predict_many(data_loader.get_spots_by_section(section)[:3], section, when)
+    assert len(predictor.prediction_cache) > 0
+
+    historical = predictor.traffic_context.historical_level(9, 2)
+    target = next(code for code in (HIGH, LOW, MEDIUM) if TRAFFIC_LEVELS[code] != historical)
+    predictor.traffic_context.ingest([2] * 200, [9] * 200, [target] * 200)
+    assert len(predictor.prediction_cache) == 0
@@ -0,0 +1,77 @@
+"""
+Tests for the training pipeline's feature cache and candidate scheduling
+"""
+import os
+
+import pandas as pd
+import pytest
+
+from ml import training_pipeline
+from ml.training_pipeline import DATASET_PATH, allocate_threads, dataset_hash, load_features
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    """A small copy of the dataset"""
+    path = str(tmp_path / 'parking.csv')
+    pd.read_csv(DATASET_PATH, nrows=300).to_csv(path, index=False)
+    return path
+
+
+def test_cache_disabled_miss_then_hit(csv_path, tmp_path):
+    cache_dir = str(tmp_path / 'feature_cache')
+
+    df, _, info = load_features(csv_path, cache_dir=None)
+    assert info['cache'] == 'disabled'
+    assert not os.path.exists(cache_dir)
+
+    missed, _, info = load_features(csv_path, cache_dir)
+    assert info['cache'] == 'miss'
+    assert os.listdir(cache_dir) == [f"features-{info['hash']}.pkl"]
+
+    hit, label_encoders, info = load_features(csv_path, cache_dir)
+    assert info['cache'] == 'hit'
+    pd.testing.assert_frame_equal(hit, df)
+    pd.testing.assert_frame_equal(missed, df)
+    assert set(label_encoders) >= {'Parking_Lot_Section', 'Vehicle_Type'}
+
+
+def test_changed_dataset_misses_the_cache(csv_path, tmp_path):
+    cache_dir = str(tmp_path / 'feature_cache')
+    load_features(csv_path, cache_dir)
+    before = dataset_hash(csv_path)
+
+    pd.read_csv(csv_path).head(200).to_csv(csv_path, index=False)
+    df, _, info = load_features(csv_path, cache_dir)
+
+    assert info['hash'] != before
+    assert info['cache'] == 'miss'
+    assert len(df) == 200
+
+
+def test_corrupt_cache_is_rebuilt(csv_path, tmp_path, capsys):
+    cache_dir = str(tmp_path / 'feature_cache')
+    _, _, info = load_features(csv_path, cache_dir)
+    with open(os.path.join(cache_dir, f"features-{info['hash']}.pkl"), 'wb') as f:
+        f.write(b'not a pickle')
+
+    df, _, info = load_features(csv_path, cache_dir)
+    assert '[WARNING] Could not read feature cache' in capsys.readouterr().out
+    assert info['cache'] == 'miss'
+    assert len(df) == 300
+    assert load_features(csv_path, cache_dir)[2]['cache'] == 'hit'
+
+
+@pytest.mark.parametrize('n_cores, n_workers', [(8, 3), (8, 2), (2, 3), (1, 1)])
+def test_threads_share_the_cores(n_cores, n_workers):
+    names = list(training_pipeline.CANDIDATE_MODELS)
+    threads = allocate_threads(names, n_cores, n_workers)
+
+    assert set(threads) == set(names)
+    assert all(count >= 1 for count in threads.values())
+    # Models without a thread parameter always get one thread
+    for name in names:
+        if not training_pipeline.CANDIDATE_MODELS[name][2]:
+            assert threads[name] == 1
+    if n_workers >= len(names):
+        assert sum(threads.values()) <= max(n_cores, len(names))
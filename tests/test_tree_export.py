@@ -0,0 +1,90 @@
+"""
+Tests for the NumPy tree-ensemble export, checked against the fitted
+sklearn / XGBoost models on the real features
+"""
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from ml.training_pipeline import CANDIDATE_MODELS, DATASET_PATH, FEATURE_COLUMNS, load_features
+from ml.tree_export import FOREST, TreeEnsembleEvaluator, check_parity, export_tree_ensemble
+
+# Small ensembles keep the tests fast; depth still matches the real candidates
+TEST_ESTIMATORS = 20
+STUDENT = 'Student (GBM regressor)'
+
+
+@pytest.fixture(scope='module')
+def fitted_models():
+    """({name: fitted model}, float32 held-out rows)"""
+    df, _, _ = load_features(DATASET_PATH, cache_dir=None)
+    features = [f for f in FEATURE_COLUMNS if f in df.columns]
+    X = df[features].fillna(df[features].mean())
+    y = df['Occupancy_Status_encoded']
+    X_train, X_test, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+
+    models = {
+        name: estimator_class(**dict(params, n_estimators=TEST_ESTIMATORS)).fit(X_train_scaled, y_train)
+        for name, (estimator_class, params, _) in CANDIDATE_MODELS.items()
+    }
+    # Distilled students are log-odds regressors (see distillation.py)
+    teacher = np.clip(models['Random Forest'].predict_proba(X_train_scaled)[:, 1], 1e-3, 1 - 1e-3)
+    models[STUDENT] = GradientBoostingRegressor(
+        n_estimators=TEST_ESTIMATORS, max_depth=3, random_state=42
+    ).fit(X_train_scaled, np.log(teacher / (1 - teacher)))
+
+    return models, np.asarray(scaler.transform(X_test), dtype=np.float32)
+
+
+@pytest.mark.parametrize('name', list(CANDIDATE_MODELS))
+def test_export_matches_the_classifier(fitted_models, name):
+    models, X = fitted_models
+    evaluator = export_tree_ensemble(models[name])
+
+    parity = check_parity(models[name], evaluator, X)
+    assert parity['passed'], parity
+    assert parity['label_agreement'] == 1.0
+    assert np.array_equal(evaluator.predict(X), models[name].predict(X))
+
+
+def test_student_margins_match_the_regressor(fitted_models):
+    models, X = fitted_models
+    evaluator = export_tree_ensemble(models[STUDENT])
+
+    margin = evaluator.base_margin + evaluator.value[evaluator._descend(X)].sum(axis=1)
+    assert np.allclose(margin, models[STUDENT].predict(X), atol=1e-5)
+
+
+@pytest.mark.parametrize('name', list(CANDIDATE_MODELS))
+def test_saved_export_reloads_identically(fitted_models, tmp_path, name):
+    models, X = fitted_models
+    evaluator = export_tree_ensemble(models[name])
+    path = str(tmp_path / 'tree_ensemble.npz')
+    evaluator.save(path)
+
+    loaded = TreeEnsembleEvaluator.load(path)
+    assert loaded.kind == evaluator.kind
+    assert np.array_equal(loaded.predict_proba(X), evaluator.predict_proba(X))
+
+
+def test_unsupported_model_is_rejected():
+    with pytest.raises(ValueError):
+        export_tree_ensemble(StandardScaler())
+
+
+@pytest.mark.parametrize('name', list(CANDIDATE_MODELS))
+def test_contributions_add_up_to_the_model_output(fitted_models, name):
+    models, X = fitted_models
+    evaluator = export_tree_ensemble(models[name])
+    probabilities, contributions, bias = evaluator.predict_proba_with_contributions(X)
+
+    assert np.allclose(probabilities, evaluator.predict_proba(X), atol=1e-6)
+    # Forests add up to the class-1 probability, boosting to its log-odds margin
+    output = probabilities[:, 1]
+    if evaluator.kind != FOREST:
+        output = np.log(output / (1 - output))
+    assert np.allclose(bias + contributions.sum(axis=1), output, atol=1e-4)
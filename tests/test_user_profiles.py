@@ -0,0 +1,119 @@
+"""
+Tests for the SQLite + LRU user profile store and profile-personalized predictions
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+import ml.predictor_prebooking as predictor_module
+from data.user_profiles import HISTORY_RATE, UserProfileStore, build_history_bounds, build_vehicle_defaults
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'user_profiles.db')
+
+
+@pytest.fixture
+def store(db_path, data_loader):
+    store = UserProfileStore(db_path=db_path, data_loader=data_loader)
+    yield store
+    store.close()
+
+
+def test_unknown_user_gets_vehicle_type_defaults(store, data_loader):
+    defaults = build_vehicle_defaults(data_loader.df)
+    profile = store.get_profile('nobody', 'SUV')
+
+    assert profile['source'] == 'vehicle_default'
+    assert {field: profile[field] for field in defaults['Car']} == defaults['Car']
+    assert store.get_profile('nobody', 'Motorcycle')['Vehicle_Type_Weight'] == defaults['Motorcycle']['Vehicle_Type_Weight']
+    assert store.get_profile(None, 'SUV') == profile
+
+
+def test_vehicle_specs_only_apply_to_the_same_vehicle_type(store):
+    store.set_vehicle('u1', 'SUV', weight=2100.0, height=5.5)
+
+    suv = store.get_profile('u1', 'SUV')
+    assert suv['source'] == 'user'
+    assert (suv['Vehicle_Type_Weight'], suv['Vehicle_Type_Height']) == (2100.0, 5.5)
+
+    motorcycle = store.get_profile('u1', 'Motorcycle')
+    assert motorcycle['source'] == 'user'
+    assert motorcycle['Vehicle_Type_Weight'] == store.default_profile('Motorcycle')['Vehicle_Type_Weight']
+
+
+def test_parking_history_approaches_the_target_within_bounds(store, data_loader):
+    low, high, target = build_history_bounds(data_loader.df)
+    assert store.history_bounds == (low, high, target)
+
+    start = store.default_profile('Sedan')['User_Parking_History']
+    store.record_booking('u2', 'Sedan', hours=2)
+    first = store.get_profile('u2', 'Sedan')['User_Parking_History']
+    assert first == pytest.approx(start + HISTORY_RATE * (target - start))
+
+    for _ in range(200):
+        store.record_booking('u2', 'Sedan')
+    history = store.get_profile('u2', 'Sedan')['User_Parking_History']
+    assert low <= history <= high
+    assert history == pytest.approx(target)
+
+
+def test_new_vehicle_forgets_the_old_specs(store):
+    store.set_vehicle('u3', 'SUV', weight=2100.0, height=5.5)
+    store.record_booking('u3', 'Truck')
+
+    truck = store.get_profile('u3', 'Truck')
+    assert truck['Vehicle_Type_Weight'] == store.default_profile('Truck')['Vehicle_Type_Weight']
+    assert store.get_profile('u3', 'SUV')['Vehicle_Type_Weight'] == store.default_profile('SUV')['Vehicle_Type_Weight']
+
+
+def test_lru_evicts_and_sqlite_still_answers(db_path, data_loader):
+    store = UserProfileStore(db_path=db_path, cache_size=2, data_loader=data_loader)
+    for user_id in ('a', 'b', 'c'):
+        store.set_vehicle(user_id, 'SUV', weight=2000.0 + len(user_id))
+
+    assert list(store._cache) == ['b', 'c']
+    assert store.get_profile('a', 'SUV')['Vehicle_Type_Weight'] == 2001.0
+    assert list(store._cache) == ['c', 'a']
+    store.close()
+
+
+def test_profiles_defaults_and_bounds_persist(db_path, data_loader):
+    store = UserProfileStore(db_path=db_path, data_loader=data_loader)
+    store.set_vehicle('u4', 'SUV', weight=2100.0)
+    store.record_booking('u4')
+    expected = store.get_profile('u4', 'SUV')
+    defaults, bounds = store.vehicle_defaults, store.history_bounds
+    store.close()
+
+    # No data loader: defaults and bounds come back from SQLite too
+    reopened = UserProfileStore(db_path=db_path)
+    assert reopened.get_profile('u4', 'SUV') == expected
+    assert reopened.vehicle_defaults == defaults
+    assert reopened.history_bounds == bounds
+    reopened.close()
+
+
+def test_out_of_range_stored_history_is_clipped(store):
+    store._write('u5', ('Sedan', None, None, 1e6, 3, 6.0))
+    assert store.get_profile('u5', 'Sedan')['User_Parking_History'] == store.history_bounds[1]
+
+
+def test_predictions_use_stored_profiles(predictor, store, data_loader, monkeypatch):
+    monkeypatch.setattr(predictor_module, 'get_user_profile_store', lambda data_loader: store)
+    store.set_vehicle('heavy', 'SUV', weight=4000.0, height=7.0)
+    section = data_loader.get_all_sections()[0]
+    spot_ids = data_loader.get_spots_by_section(section)[:5]
+    when = (datetime.now() + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+
+    anonymous = predictor.predict_many(spot_ids, section, when, vehicle_types='SUV')
+    runs = predictor.cache_stats()['model_runs']
+    # Users without a profile share the vehicle default entries
+    unknown = predictor.predict_many(spot_ids, section, when, vehicle_types='SUV', user_id='nobody')
+    assert predictor.cache_stats()['model_runs'] == runs
+    assert list(unknown['probability_vacant']) == list(anonymous['probability_vacant'])
+
+    predictor.predict_many(spot_ids, section, when, vehicle_types='SUV', user_id='heavy')
+    assert predictor.cache_stats()['model_runs'] > runs
+    assert predictor._user_profile('heavy', 'SUV')['Vehicle_Type_Weight'] == 4000.0
@@ -0,0 +1,156 @@
+"""
+Tests for the weather provider's forecast overlay
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import ml.weather_provider as weather_module
+from ml.weather_provider import HISTORICAL_SOURCE, FileForecastSource, WeatherProvider
+
+
+class ListSource:
+    """Forecast source serving fixed rows (or raising)"""
+
+    def __init__(self, name, rows=None, error=None):
+        self.name = name
+        self.rows = rows
+        self.error = error
+        self.fetches = 0
+
+    def fetch(self):
+        self.fetches += 1
+        if self.error:
+            raise self.error
+        return self.rows
+
+
+def rows(*cells):
+    """Feed rows from (month, day_of_week, hour, temperature, precipitation) tuples"""
+    month, day_of_week, hour, temperature, precipitation = (list(column) for column in zip(*cells))
+    return {'month': month, 'day_of_week': day_of_week, 'hour': hour,
+            'temperature': temperature, 'precipitation': precipitation}
+
+
+@pytest.fixture
+def base_table():
+    table = np.zeros((12, 7, 24, 2))
+    table[..., 0] = 15.0
+    table[0, 0, 0] = np.nan
+    return table
+
+
+class FakeClock:
+    """Stands in for time.monotonic"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_historical_averages_without_sources(base_table):
+    provider = WeatherProvider(base_table)
+
+    assert provider.forecast(3, 2, 9) == {'temperature': 15.0, 'precipitation': 0.0, 'source': HISTORICAL_SOURCE}
+    assert provider.forecast(1, 0, 0) is None
+    assert not provider.is_forecast(3, 2, 9)
+
+
+def test_forecast_rows_overlay_the_table(base_table):
+    feed = ListSource('feed', rows((3, 2, 9, 30.0, 4.0), (3, 2, 10, 31.0, 0.0)))
+    provider = WeatherProvider(base_table, sources=[feed])
+
+    assert provider.forecast(3, 2, 9) == {'temperature': 30.0, 'precipitation': 4.0, 'source': 'feed'}
+    assert provider.is_forecast(3, 2, 10)
+    assert provider.forecast(3, 2, 11)['source'] == HISTORICAL_SOURCE
+    assert provider.historical(3, 2, 9)['temperature'] == 15.0
+    assert np.all(provider.base_table[..., 0][~np.isnan(provider.base_table[..., 0])] == 15.0)
+
+
+def test_later_sources_win(base_table):
+    first = ListSource('first', rows((3, 2, 9, 30.0, 4.0), (3, 2, 10, 31.0, 0.0)))
+    second = ListSource('second', rows((3, 2, 9, 5.0, 1.0)))
+    provider = WeatherProvider(base_table, sources=[first, second])
+
+    assert provider.forecast(3, 2, 9)['source'] == 'second'
+    assert provider.forecast(3, 2, 9)['temperature'] == 5.0
+    assert provider.forecast(3, 2, 10)['source'] == 'first'
+
+
+def test_invalid_rows_are_skipped(base_table, capsys):
+    feed = ListSource('feed', rows(
+        (3, 2, 9, 30.0, 4.0), (13, 2, 9, 1.0, 1.0), (3, 7, 9, 1.0, 1.0), (3, 2, 24, 1.0, 1.0),
+        (3, 2, 9.5, 1.0, 1.0), (3, 2, 11, np.nan, 1.0)
+    ))
+    provider = WeatherProvider(base_table, sources=[feed])
+
+    assert 'skipped 5 invalid rows' in capsys.readouterr().out
+    assert provider.forecast(3, 2, 9)['temperature'] == 30.0
+    assert int(np.count_nonzero(provider._state[1])) == 1
+
+
+def test_failing_source_does_not_block_the_others(base_table):
+    broken = ListSource('broken', error=RuntimeError('feed down'))
+    feed = ListSource('feed', rows((3, 2, 9, 30.0, 4.0)))
+    provider = WeatherProvider(base_table, sources=[broken, feed])
+
+    assert provider.forecast(3, 2, 9)['source'] == 'feed'
+    assert not provider._refreshing
+
+
+def test_overlay_expires_and_refreshes(base_table, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(weather_module.time, 'monotonic', clock)
+    feed = ListSource('feed', rows((3, 2, 9, 30.0, 4.0)))
+    provider = WeatherProvider(base_table, sources=[feed], ttl_seconds=60)
+    changes = []
+    provider.add_listener(lambda: changes.append(True))
+
+    feed.rows = rows((3, 2, 9, 20.0, 0.0))
+    clock.now += 59
+    assert provider.forecast(3, 2, 9)['temperature'] == 30.0
+    assert feed.fetches == 1
+
+    # Past the TTL the lookup answers from the old overlay and refreshes in the background
+    clock.now += 2
+    provider.forecast(3, 2, 9)
+    for thread in weather_module.threading.enumerate():
+        if thread.name == 'weather-refresh':
+            thread.join()
+    assert feed.fetches == 2
+    assert provider.forecast(3, 2, 9)['temperature'] == 20.0
+    assert changes == [True]
+
+    # An unchanged feed doesn't notify listeners
+    assert not provider.refresh()
+    assert changes == [True]
+
+
+def test_file_source_reads_timestamps(tmp_path):
+    path = tmp_path / 'weather_forecast.csv'
+    pd.DataFrame({
+        'timestamp': ['2026-03-04 09:00', '2026-03-04 10:00'],
+        'temperature': [30.0, 31.0], 'precipitation': [4.0, 0.0]
+    }).to_csv(path, index=False)
+
+    fetched = FileForecastSource(str(path)).fetch()
+    assert list(fetched['month']) == [3, 3]
+    assert list(fetched['day_of_week']) == [2, 2]
+    assert list(fetched['hour']) == [9, 10]
+    assert FileForecastSource(str(tmp_path / 'missing.csv')).fetch() is None
+
+
+def test_forecast_changes_invalidate_the_predictor_cache(make_predictor, data_loader):
+    feed = ListSource('feed', rows((3, 2, 9, 30.0, 4.0)))
+    predictor = make_predictor(weather_sources=[feed])
+    section = data_loader.get_all_sections()[0]
+    predictor.predict_many(data_loader.get_spots_by_section(section)[:3], section, datetime(2026, 3, 4, 12))
+    assert len(predictor.prediction_cache) > 0
+
+    feed.rows = rows((3, 2, 9, 10.0, 0.0))
+    assert predictor.weather_provider.refresh()
+    assert len(predictor.prediction_cache) == 0